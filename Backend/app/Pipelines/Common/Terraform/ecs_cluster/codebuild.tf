@@ -70,6 +70,12 @@ resource "aws_codebuild_project" "main" {
     }
   }
 
+  // Keep Docker layers on the build host between builds; the buildspec also uses a registry cache in ECR
+  cache {
+    type  = "LOCAL"
+    modes = ["LOCAL_DOCKER_LAYER_CACHE", "LOCAL_SOURCE_CACHE"]
+  }
+
   source {
     type            = "NO_SOURCE"
     buildspec       = file("buildspec.yml")
@@ -16,8 +16,14 @@ terraform {
   }
 }
 
+# Under STS tenancy resources are created with the tenant's tag-scoped session. IAM-user keys
+# cannot create the CodeBuild project, buckets or IAM resources, so they are not passed and the
+# provider falls back to the platform's ambient credentials, which the S3 backend above uses too
 provider "aws" {
-  region = var.aws_region
+  region     = var.aws_region
+  access_key = var.aws_access_key != "" ? var.aws_access_key : null
+  secret_key = var.aws_secret_access_key != "" ? var.aws_secret_access_key : null
+  token      = var.aws_session_token != "" ? var.aws_session_token : null
 }
 
   resource "aws_ecs_cluster" "ecs_cluster" {
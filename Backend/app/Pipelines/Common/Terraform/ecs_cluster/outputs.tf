@@ -11,3 +11,15 @@ output "load_balancer_dns" {
 output "instance_id" {
   value = aws_autoscaling_group.ecs_asg.id
 }
+
+output "ecs_cluster_name" {
+  value = aws_ecs_cluster.ecs_cluster.name
+}
+
+output "ecs_service_name" {
+  value = aws_ecs_service.ecs_service.name
+}
+
+output "ecs_container_name" {
+  value = var.aws_ecs_task_container_name
+}
@@ -47,12 +47,19 @@ variable "private_key_path" {
   type        = string
 }
 variable "aws_access_key" {
-  description = "AWS Access Key"
+  description = "AWS Access Key of the tenant's STS session; empty to use the platform credentials"
   type        = string
+  default     = ""
 }
 variable "aws_secret_access_key" {
-  description = "AWS Secret Access Key"
+  description = "AWS Secret Access Key of the tenant's STS session; empty to use the platform credentials"
   type        = string
+  default     = ""
+}
+variable "aws_session_token" {
+  description = "AWS session token when deploying under an assumed platform role"
+  type        = string
+  default     = ""
 }
 
 variable "key_pair_name" {
@@ -189,6 +196,7 @@ locals {
   user_github_id = var.user_github_id
   aws_access_key = var.aws_access_key
   aws_secret_access_key = var.aws_secret_access_key
+  aws_session_token = var.aws_session_token
 
   
   public_key = var.public_key
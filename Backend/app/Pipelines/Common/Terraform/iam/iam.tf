@@ -3,14 +3,15 @@ resource "aws_iam_user" "user" {
   name = "github-${var.user_github_id}"
 }
 
-resource "aws_iam_group" "user_group" {
-  name = "users-group"
+# The group is shared by every tenant, so it is looked up rather than owned by a tenant's state,
+# and membership is managed per user instead of exclusively per group.
+data "aws_iam_group" "user_group" {
+  group_name = var.user_group_name
 }
 
-resource "aws_iam_group_membership" "user_membership" {
-  name = "github-${var.user_github_id}-membership"
-  users = [aws_iam_user.user.name]
-  group = aws_iam_group.user_group.name
+resource "aws_iam_user_group_membership" "user_membership" {
+  user   = aws_iam_user.user.name
+  groups = [data.aws_iam_group.user_group.group_name]
 }
 
 resource "aws_iam_role" "user_role" {
@@ -68,11 +69,6 @@ resource "aws_iam_policy" "ecs_access_policy" {
   })
 }
 
-resource "aws_iam_group_policy_attachment" "attach_policy_to_group" {
-  group      = aws_iam_group.user_group.name
-  policy_arn = aws_iam_policy.ecs_access_policy.arn
-}
-
 resource "aws_iam_access_key" "user_key" {
   user = aws_iam_user.user.name
 }
@@ -7,9 +7,13 @@ output "aws_access_key" {
   sensitive = true
 }
 output "user_group_name" {
-  value = aws_iam_group.user_group.name
+  value = data.aws_iam_group.user_group.group_name
 }
 output "aws_secret_access_key" {
   value = aws_iam_access_key.user_key.secret
   sensitive = true
 }
+
+output "aws_account_id" {
+  value = data.aws_caller_identity.current.account_id
+}
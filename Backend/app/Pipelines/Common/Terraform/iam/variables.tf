@@ -6,3 +6,9 @@ variable "user_github_id" {
   type        = string
   description = "GitHub ID of the user"
 }
+
+variable "user_group_name" {
+  type        = string
+  description = "Existing IAM group every provisioned user joins"
+  default     = "users-group"
+}
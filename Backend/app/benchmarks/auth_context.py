@@ -0,0 +1,105 @@
+"""
+Microbenchmark for request authentication.
+
+Compares the CPU cost of the old per-request pattern (router-level get_current_user,
+endpoint-level get_current_user and get_access_key_from_token_payload each decoding the
+JWT) with the request-scoped AuthContext, which decodes once. It also drives an
+authenticated route through the ASGI stack and counts decodes per request.
+
+Run from Backend/app:
+
+    python -m benchmarks.auth_context [--requests 2000]
+"""
+import argparse
+import time
+
+from config.settings import settings
+
+settings.JWT_SECRET_KEY = settings.JWT_SECRET_KEY or "benchmark-secret"
+settings.JWT_ALGORITHM = settings.JWT_ALGORITHM or "HS256"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import dependencies.security as security
+from dependencies.services import get_git_repository_service, get_user_service
+from routers import git_repositories
+from schemas.user_schema import UserSchema
+from services.jwt import create_access_token, decode_access_token
+
+LEGACY_DECODES_PER_REQUEST = 3
+
+
+class StubUserService:
+    async def get_user_by_github_id(self, github_id):
+        return UserSchema(github_id=github_id, login="octocat", name="The Octocat")
+
+
+class StubGitRepositoryService:
+    async def get_latest_commit(self, owner, repo_name, branch, access_token):
+        return {"sha": "0" * 40}
+
+
+def cpu_per_call(function, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - start) / iterations
+
+
+def legacy_decodes(token: str) -> None:
+    decode_access_token(token)  # router-level get_current_user
+    decode_access_token(token)  # endpoint-level get_current_user
+    jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])  # get_access_key_from_token_payload
+
+
+def request_path(requests: int, token: str) -> dict:
+    app = FastAPI()
+    app.include_router(git_repositories.router)
+    app.dependency_overrides[get_user_service] = StubUserService
+    app.dependency_overrides[get_git_repository_service] = StubGitRepositoryService
+
+    decodes = 0
+    original = security.decode_access_token
+
+    def counting_decode(value):
+        nonlocal decodes
+        decodes += 1
+        return original(value)
+
+    security.decode_access_token = counting_decode
+    try:
+        with TestClient(app) as client:
+            headers = {"Authorization": f"Bearer {token}"}
+            url = "/git/repository/octocat/hello-world/commits/main"
+            assert client.get(url, headers=headers).status_code == 200
+            decodes = 0
+            start = time.process_time()
+            for _ in range(requests):
+                client.get(url, headers=headers)
+            elapsed = time.process_time() - start
+    finally:
+        security.decode_access_token = original
+    return {"cpu_us_per_request": elapsed / requests * 1e6, "decodes_per_request": decodes / requests}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "1", "name": "octocat", "access_key": "gho_benchmark"})
+    legacy = cpu_per_call(lambda: legacy_decodes(token), args.requests)
+    single = cpu_per_call(lambda: decode_access_token(token), args.requests)
+    end_to_end = request_path(args.requests, token)
+
+    print(f"legacy token handling:  {legacy * 1e6:8.1f} us CPU/request ({LEGACY_DECODES_PER_REQUEST} decodes)")
+    print(f"AuthContext:            {single * 1e6:8.1f} us CPU/request (1 decode)")
+    print(f"saved:                  {(legacy - single) * 1e6:8.1f} us CPU/request")
+    print(f"end-to-end request:     {end_to_end['cpu_us_per_request']:8.1f} us CPU/request, "
+          f"{end_to_end['decodes_per_request']:.2f} decodes/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+End-to-end load test of the app against local stand-ins.
+
+The app runs under uvicorn in a background thread with MongoDB replaced by mongomock
+(or a local server given with --mongo-url), GitHub by a fake HTTP server backed by
+local bare repositories, AWS by moto and Terraform by a stub binary. Scripted
+workloads then drive it over HTTP: GitHub logins, repository listing, deploy creation,
+webhook bursts and dashboard polling. Each workload reports throughput, latency
+percentiles and the lag of the app's event loop while it ran, and the whole run is
+saved as JSON so runs can be compared with --compare.
+
+Run from Backend/app after `pip install -r requirements-dev.txt`:
+
+    python -m benchmarks.load_test [--users 4] [--repos 2] [--concurrency 16] [--compare benchmarks/results/<run>.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks import standins
+
+WORKLOADS = ("login", "repos", "deploy", "webhook", "dashboard")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 3)
+
+
+class LoopLagProbe:
+    """Sleep for a fixed interval on the app's event loop and record how late each wakeup is."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []
+
+    async def run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append((time.perf_counter(), max(0.0, time.perf_counter() - started - self.interval)))
+
+    def window(self, start: float, end: float) -> Dict:
+        lags = [lag for at, lag in self.samples if start <= at <= end]
+        return {
+            "samples": len(lags),
+            "p50_ms": _ms(percentile(lags, 0.5)),
+            "p99_ms": _ms(percentile(lags, 0.99)),
+            "max_ms": _ms(max(lags) if lags else None),
+        }
+
+
+class AppServer:
+    """Run the FastAPI app under uvicorn on its own thread and event loop, with a lag probe beside it."""
+
+    def __init__(self, app, probe: LoopLagProbe):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.probe = probe
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_config=None, lifespan="on"))
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), name="app-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _serve(self) -> None:
+        probe = asyncio.create_task(self.probe.run())
+        try:
+            await self.server.serve()
+        finally:
+            probe.cancel()
+
+    def start(self, timeout: float = 30) -> None:
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("The app did not start")
+            time.sleep(0.05)
+        # The health check turns 200 once startup warmup is done
+        while httpx.get(self.url + "/").status_code != 200:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("The app did not become ready")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+RequestFactory = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def drive(client: httpx.AsyncClient, name: str, requests: List[RequestFactory], concurrency: int, probe: LoopLagProbe) -> Tuple[Dict, List[Optional[httpx.Response]]]:
+    """Send the requests with at most `concurrency` in flight and summarize the latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def send(request: RequestFactory) -> Optional[httpx.Response]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await request(client)
+                key = str(response.status_code)
+            except httpx.HTTPError as e:
+                response, key = None, type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[key] = statuses.get(key, 0) + 1
+            return response
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(send(request) for request in requests))
+    elapsed = time.perf_counter() - started
+    errors = sum(count for key, count in statuses.items() if not key.isdigit() or int(key) >= 400)
+    summary = {
+        "requests": len(requests),
+        "errors": errors,
+        "statuses": statuses,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": _ms(statistics.fmean(latencies) if latencies else None),
+            "p50": _ms(percentile(latencies, 0.5)),
+            "p90": _ms(percentile(latencies, 0.9)),
+            "p95": _ms(percentile(latencies, 0.95)),
+            "p99": _ms(percentile(latencies, 0.99)),
+            "max": _ms(max(latencies) if latencies else None),
+        },
+        "event_loop_lag": probe.window(started, started + elapsed),
+    }
+    print(f"{name:<10} {summary['requests']:>6} req  {summary['throughput_rps'] or 0:>8.1f} req/s  "
+          f"p50 {summary['latency_ms']['p50'] or 0:>8.1f} ms  p99 {summary['latency_ms']['p99'] or 0:>8.1f} ms  "
+          f"lag p99 {summary['event_loop_lag']['p99_ms'] or 0:>7.1f} ms  errors {errors}")
+    return summary, list(responses)
+
+
+# === Workloads ===
+
+class Tenant:
+    def __init__(self, user: standins.FakeUser, repo_name: str):
+        self.user = user
+        self.repo_name = repo_name
+        self.resources = standins.tenant_resources(user.github_id, user.login, repo_name)
+
+
+def _auth(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login_workload(client, probe, users: List[standins.FakeUser], rounds: int, concurrency: int, tokens: Dict[str, str]) -> Dict:
+    requests = [
+        (lambda client, user=user: client.get("/auth/github/callback", params={"code": user.code}))
+        for _ in range(rounds) for user in users
+    ]
+    summary, responses = await drive(client, "login", requests, concurrency, probe)
+    for response in responses:
+        if response is not None and response.status_code == 200:
+            body = response.json()
+            tokens[body["user"]["github_id"]] = body["token"]
+    return summary
+
+
+async def repos_workload(client, probe, users: List[standins.FakeUser], count: int, concurrency: int, tokens: Dict[str, str]) -> Dict:
+    requests = [
+        (lambda client, user=users[i % len(users)]: client.get(f"/git/repository/{user.login}", headers=_auth(tokens[user.github_id])))
+        for i in range(count)
+    ]
+    summary, _ = await drive(client, "repos", requests, concurrency, probe)
+    return summary
+
+
+async def deploy_workload(client, probe, tenants: List[Tenant], concurrency: int, tokens: Dict[str, str]) -> Dict:
+    def create(tenant: Tenant) -> RequestFactory:
+        body = {
+            "repo_name": tenant.repo_name,
+            "owner": tenant.user.login,
+            "branch": "main",
+            "framework": "fastapi",
+            "environment_variables": {"APP_ENV": "load-test"},
+            "exclude_paths": ["docs/**", "**/*.md"],
+        }
+        return lambda client: client.post("/deploy/", json=body, headers=_auth(tokens[tenant.user.github_id]))
+
+    summary, responses = await drive(client, "deploy", [create(tenant) for tenant in tenants], concurrency, probe)
+    deploy_statuses: Dict[str, int] = {}
+    for response in responses:
+        if response is not None and response.status_code == 200:
+            status = response.json().get("status") or "unknown"
+            deploy_statuses[status] = deploy_statuses.get(status, 0) + 1
+    summary["deploy_statuses"] = deploy_statuses
+    return summary
+
+
+async def webhook_workload(client, probe, github: standins.FakeGitHub, tenants: List[Tenant], bursts: int, concurrency: int) -> Dict:
+    """Push to every repository, then deliver all the webhooks at once; odd bursts only touch excluded docs."""
+    summaries = []
+    actions: Dict[str, int] = {}
+    for burst in range(bursts):
+        path = "docs/index.md" if burst % 2 else "main.py"
+        payloads = await asyncio.to_thread(
+            lambda: [github.push(tenant.user.login, tenant.repo_name, path) for tenant in tenants]
+        )
+        requests = [(lambda client, payload=payload: client.post("/git/repository/webhook/", json=payload)) for payload in payloads]
+        summary, responses = await drive(client, f"webhook#{burst}", requests, concurrency, probe)
+        summaries.append(summary)
+        for response in responses:
+            if response is not None and response.status_code == 200:
+                for deploy in response.json().get("deploys") or []:
+                    action = deploy.get("action", "unknown")
+                    actions[action] = actions.get(action, 0) + 1
+    return {"bursts": summaries, "rebuild_actions": actions}
+
+
+async def dashboard_workload(client, probe, tenants: List[Tenant], count: int, concurrency: int, tokens: Dict[str, str]) -> Dict:
+    def poll(i: int) -> RequestFactory:
+        tenant = tenants[i % len(tenants)]
+        headers = _auth(tokens[tenant.user.github_id])
+        login, resources = tenant.user.login, tenant.resources
+        paths = (
+            f"/deploy/owner/{login}",
+            f"/deploy/statistics/{login}",
+            f"/deploy/repository/{login}/{tenant.repo_name}",
+            f"/monitoring/service/{resources['ecs_cluster_name']}/{resources['ecs_service_name']}/status",
+        )
+        return lambda client: client.get(paths[i % len(paths)], headers=headers)
+
+    summary, _ = await drive(client, "dashboard", [poll(i) for i in range(count)], concurrency, probe)
+    return summary
+
+
+async def run_workloads(args, server: AppServer, github: standins.FakeGitHub, users: List[standins.FakeUser], tenants: List[Tenant]) -> Dict:
+    results: Dict = {}
+    tokens: Dict[str, str] = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=server.url, timeout=args.timeout, limits=limits) as client:
+        # Every other workload needs the tokens a login hands out
+        results["login"] = await login_workload(client, server.probe, users, args.login_rounds, args.concurrency, tokens)
+        if "repos" in args.workloads:
+            results["repos"] = await repos_workload(client, server.probe, users, args.requests, args.concurrency, tokens)
+        if "deploy" in args.workloads:
+            results["deploy"] = await deploy_workload(client, server.probe, tenants, args.concurrency, tokens)
+        if "webhook" in args.workloads:
+            results["webhook"] = await webhook_workload(client, server.probe, github, tenants, args.webhook_bursts, args.concurrency)
+        if "dashboard" in args.workloads:
+            results["dashboard"] = await dashboard_workload(client, server.probe, tenants, args.requests, args.concurrency, tokens)
+    return results
+
+
+# === Setup ===
+
+def configure_environment(workdir: str, github: standins.FakeGitHub, args) -> Optional[str]:
+    """Point the app's settings at the stand-ins; must run before any app module is imported."""
+    bin_dir = os.path.join(workdir, "bin")
+    standins.write_stub_terraform(bin_dir)
+    database_name = f"easy_deploy_load_test_{int(time.time())}"
+    os.environ.update({
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "DIR_BASE": os.path.join(workdir, "repos"),
+        "TERRAFORM_WORKSPACE_DIR": os.path.join(workdir, "terraform"),
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "LOG_CONSOLE_FORMAT": "off",
+        "DATABASE_NAME": database_name,
+        "CLIENT_ID": "load-test",
+        "CLIENT_SECRET": "load-test",
+        "REDIRECT_URI": "http://localhost/auth/github/callback",
+        "JWT_SECRET_KEY": "load-test-secret",
+        "JWT_ALGORITHM": "HS256",
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_SECURITY_TOKEN": "testing",
+        "AWS_SESSION_TOKEN": "testing",
+        "AWS_DEFAULT_REGION": standins.AWS_REGION,
+        "AWS_ACCOUNT_ID": standins.AWS_ACCOUNT_ID,
+        "AWS_TENANCY_MODE": "sts",
+        "AWS_PLATFORM_ROLE_ARN": standins.PLATFORM_ROLE_ARN,
+        "STUB_TERRAFORM_APPLY_SECONDS": str(args.terraform_seconds),
+        **standins.git_rewrite_environment(github),
+    })
+    if args.mongo_url:
+        os.environ["CONNECTION_STRING"] = args.mongo_url
+        return database_name
+    return None
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["workloads"]
+
+    def flatten(workloads: Dict) -> Dict[str, Dict]:
+        flat = {}
+        for name, summary in workloads.items():
+            for index, burst in enumerate(summary.get("bursts", [])):
+                flat[f"{name}#{index}"] = burst
+            if "bursts" not in summary:
+                flat[name] = summary
+        return flat
+
+    def change(new, old) -> str:
+        if new is None or not old:
+            return "     n/a"
+        return f"{(new - old) / old * 100:+7.1f}%"
+
+    print(f"\ncompared with {baseline_path}")
+    old_runs = flatten(baseline)
+    for name, summary in flatten(results).items():
+        old = old_runs.get(name)
+        if old is None:
+            continue
+        print(f"{name:<10} throughput {change(summary['throughput_rps'], old['throughput_rps'])}  "
+              f"p95 {change(summary['latency_ms']['p95'], old['latency_ms']['p95'])}  "
+              f"lag p99 {change(summary['event_loop_lag']['p99_ms'], old['event_loop_lag']['p99_ms'])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--repos", type=int, default=2, help="repositories per user; each gets one deploy")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="requests in the repos and dashboard workloads")
+    parser.add_argument("--login-rounds", type=int, default=5)
+    parser.add_argument("--webhook-bursts", type=int, default=4)
+    parser.add_argument("--workloads", type=lambda value: value.split(","), default=list(WORKLOADS),
+                        help="comma-separated subset of " + ",".join(WORKLOADS) + "; login always runs")
+    parser.add_argument("--github-latency-ms", type=float, default=20, help="added to every fake GitHub response")
+    parser.add_argument("--terraform-seconds", type=float, default=0.5, help="how long a stub terraform apply takes")
+    parser.add_argument("--mongo-url", help="use this MongoDB instead of mongomock; a scratch database is dropped afterwards")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="where to write the JSON results (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="a previous results file to compare against")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="easy-deploy-load-")
+    github = standins.FakeGitHub(os.path.join(workdir, "github"), latency_seconds=args.github_latency_ms / 1000)
+    os.makedirs(github.root)
+    # moto rejects CodeBuild project names that start with a digit, which CodeBuild allows, so ids get a prefix
+    users = [github.add_user(f"lt{100000 + i}", f"load-user-{i}") for i in range(args.users)]
+    tenants = [Tenant(user, f"service-{j}") for user in users for j in range(args.repos)]
+    for tenant in tenants:
+        github.add_repository(tenant.user.login, tenant.repo_name)
+    github.start()
+    scratch_database = configure_environment(workdir, github, args)
+
+    from moto import mock_aws
+
+    aws = mock_aws()
+    aws.start()
+    server = None
+    try:
+        standins.seed_aws([(tenant.user.github_id, tenant.user.login, tenant.repo_name) for tenant in tenants])
+
+        import main as app_main
+        from dependencies.database_connection import DatabaseConnection
+
+        standins.redirect_github_requests(github.url)
+        if not args.mongo_url:
+            from mongomock_motor import AsyncMongoMockClient
+            DatabaseConnection().client = AsyncMongoMockClient()
+
+        server = AppServer(app_main.app, LoopLagProbe())
+        server.start()
+        started_at = datetime.now(timezone.utc)
+        workloads = asyncio.run(run_workloads(args, server, github, users, tenants))
+    finally:
+        if server is not None:
+            server.stop()
+        if scratch_database:
+            from pymongo import MongoClient
+            with MongoClient(args.mongo_url) as client:
+                client.drop_database(scratch_database)
+        aws.stop()
+        github.stop()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "started_at": started_at.isoformat(),
+        "revision": _git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "keep_workdir")},
+        "database": "mongodb" if args.mongo_url else "mongomock",
+        "workloads": workloads,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {output}")
+    if args.compare:
+        compare(workloads, args.compare)
+
+
+if __name__ == "__main__":
+    main()
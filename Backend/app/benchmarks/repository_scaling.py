@@ -0,0 +1,350 @@
+"""
+Repository query benchmarks at growing collection sizes.
+
+For each size, seeds that many synthetic users, AWS users, repositories and deploys into
+a scratch database, then times DeployRepository.get_deploys, get_deploys_for_owner,
+get_deployment_statistics, User.get_user_by_github_id and AWSUserRepository.get_user,
+first without indexes and then with the repositories' INDEXES. Each query is timed
+through the driver alone and through the repository method, and building Deploy models
+from the fetched documents is timed on its own, so query time and Pydantic cost are
+reported apart. An indexed median above its budget fails the run.
+
+Every owner has the same number of deploys at every size, so result sizes stay constant
+and only the collection grows.
+
+Run from Backend/app against a local mongod; the scratch database is dropped afterwards:
+
+    python -m benchmarks.repository_scaling [--mongo-url mongodb://localhost:27017] [--sizes 10000,100000,1000000]
+
+--mongomock runs the same code without a server, as a quick check of the suite itself;
+mongomock ignores indexes, so its timings say nothing about them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+
+from config.settings import settings
+from dependencies.database_connection import DatabaseConnection
+from repositories.aws_user import AWSUserRepository, aws_user_cache
+from repositories.deploy import DeployRepository
+from repositories.user import User, user_cache
+
+DEPLOYS_PER_OWNER = 50
+REPOS_PER_OWNER = 10
+STATUSES = ("success", "success", "success", "failed", "in_progress", "pending")
+FRAMEWORKS = ("fastapi", "flask", "django")
+SEED_BATCH_SIZE = 10_000
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Median latency budgets with indexes, in milliseconds
+BUDGETS_MS = {
+    "get_deploys": 5,
+    "get_deploys_for_owner": 25,
+    "get_deployment_statistics": 15,
+    "get_user_by_github_id": 2,
+    "aws_user.get_user": 2,
+}
+
+
+def github_id(index: int) -> str:
+    return str(10_000_000 + index)
+
+
+def login(index: int) -> str:
+    return f"user-{index}"
+
+
+def user_document(index: int) -> Dict:
+    return {
+        "_id": ObjectId(),
+        "github_id": github_id(index),
+        "login": login(index),
+        "name": f"User {index}",
+        "email": f"user-{index}@example.com",
+        "bio": None,
+        "repos_urls": f"https://api.github.com/users/{login(index)}/repos",
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{github_id(index)}",
+        "hashed_access_key": f"{index:064x}",
+    }
+
+
+def aws_user_document(index: int) -> Dict:
+    return {
+        "user_github_id": github_id(index),
+        "iam_role_arn": f"arn:aws:iam::123456789012:role/user-{index}",
+        "aws_access_key_id": f"AKIA{index:016d}",
+        "aws_user_group": "deployment-users",
+        "aws_secret_access_key": f"{index:040x}",
+        "aws_account_id": "123456789012",
+        "created_at": datetime(2025, 1, 1).isoformat(),
+    }
+
+
+def repository_document(index: int) -> Dict:
+    owner = index // REPOS_PER_OWNER
+    return {
+        "owner": login(owner),
+        "name": f"repo-{index % REPOS_PER_OWNER}",
+        "private": False,
+        "html_url": f"https://github.com/{login(owner)}/repo-{index % REPOS_PER_OWNER}",
+        "default_branch": "main",
+        "language": "Python",
+    }
+
+
+def deploy_document(index: int, rng: random.Random) -> Dict:
+    owner = index // DEPLOYS_PER_OWNER
+    repo_name = f"repo-{index % REPOS_PER_OWNER}"
+    framework = FRAMEWORKS[index % len(FRAMEWORKS)]
+    created_at = datetime(2025, 1, 1) + timedelta(minutes=index)
+    ecr_repo_url = f"123456789012.dkr.ecr.us-east-1.amazonaws.com/{login(owner)}-{repo_name}"
+    commit_sha = f"{rng.getrandbits(160):040x}"
+    return {
+        "user_github_id": github_id(owner),
+        "owner": login(owner),
+        "repo_name": repo_name,
+        "branch": "main",
+        "framework": framework,
+        "pipeline_path": f"Pipelines/Backend/{framework.capitalize()}",
+        "root_folder_path": "",
+        "absolute_path": f"/tmp/mnt/repos/{login(owner)}/{repo_name}",
+        "build_command": "pip install -r requirements.txt",
+        "run_command": "uvicorn",
+        "entry_point": "main.py",
+        "port": 8000,
+        "environment_variables": {"APP_ENV": "production", "LOG_LEVEL": "info"},
+        "status": rng.choice(STATUSES),
+        "webhook_id": None,
+        "ecr_repo_url": ecr_repo_url,
+        "load_balancer_url": f"http://{repo_name}-{owner}.elb.amazonaws.com",
+        "terraform_fingerprint": f"{rng.getrandbits(256):064x}",
+        "terraform_outputs": {"load_balancer_dns": f"{repo_name}-{owner}.elb.amazonaws.com", "ecr_repo_url": ecr_repo_url},
+        "terraform_skipped": bool(index % 2),
+        "codebuild_build_id": f"{github_id(owner)}-{repo_name}-codebuild:{rng.getrandbits(128):032x}",
+        "build_status": "SUCCEEDED",
+        "build_phase": "COMPLETED",
+        "build_duration_seconds": 95.0,
+        "commit_sha": commit_sha,
+        "image_tag": f"{commit_sha[:12]}-{rng.getrandbits(48):012x}",
+        "build_cache_hit": index % 5 == 0,
+        "created_at": created_at,
+        "updated_at": created_at + timedelta(minutes=2),
+    }
+
+
+async def seed(db, size: int) -> None:
+    rng = random.Random(size)
+    generators = {
+        "users": user_document,
+        "aws_users": aws_user_document,
+        "repositories": repository_document,
+        "deploys": lambda index: deploy_document(index, rng),
+    }
+    for collection_name, generate in generators.items():
+        collection = db[collection_name]
+        for start in range(0, size, SEED_BATCH_SIZE):
+            await collection.insert_many([generate(index) for index in range(start, min(start + SEED_BATCH_SIZE, size))], ordered=False)
+
+
+async def set_indexes(db, indexed: bool) -> None:
+    for collection_name, indexes in (("deploys", DeployRepository.INDEXES), ("users", User.INDEXES), ("aws_users", AWSUserRepository.INDEXES)):
+        if indexed:
+            await db[collection_name].create_indexes(indexes)
+        else:
+            await db[collection_name].drop_indexes()
+
+
+async def time_calls(call: Callable[[int], Awaitable], targets: List[int], warmup: int, before: Optional[Callable[[], None]] = None) -> Dict:
+    """Await `call(target)` for every target and summarize the timings the way pytest-benchmark does."""
+    timings = []
+    for round_index, target in enumerate(targets):
+        if before:
+            before()
+        started = time.perf_counter()
+        await call(target)
+        if round_index >= warmup:
+            timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {
+        "rounds": len(timings),
+        "min_ms": round(min(timings) * 1000, 3),
+        "median_ms": round(median * 1000, 3),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "stddev_ms": round(statistics.pstdev(timings) * 1000, 3),
+        "ops": round(1 / median, 1) if median else None,
+    }
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages += _plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+async def explain(db, collection_name: str, query: Dict) -> Optional[Dict]:
+    """Winning plan stages and documents examined for a find; None where explain is unsupported."""
+    try:
+        result = await db.command("explain", {"find": collection_name, "filter": query}, verbosity="executionStats")
+    except Exception:
+        return None
+    return {
+        "plan": "+".join(_plan_stages(result["queryPlanner"]["winningPlan"])),
+        "docs_examined": result["executionStats"]["totalDocsExamined"],
+    }
+
+
+async def measure(db, size: int, rounds: int, warmup: int) -> Dict:
+    connection = DatabaseConnection()
+    deploys, users, aws_users = DeployRepository(connection), User(connection), AWSUserRepository(connection)
+    rng = random.Random(0)
+    owners = [rng.randrange(max(1, size // DEPLOYS_PER_OWNER)) for _ in range(rounds + warmup)]
+    user_ids = [rng.randrange(size) for _ in range(rounds + warmup)]
+
+    def clear_caches():
+        user_cache.clear()
+        aws_user_cache.clear()
+
+    async def count_statuses(owner: int):
+        for query in ({}, {"status": "success"}, {"status": "failed"}, {"status": "pending"}, {"status": "in_progress"}, {"build_cache_hit": True}):
+            await db.deploys.count_documents({"owner": login(owner), **query})
+
+    queries = {
+        "get_deploys": (
+            lambda owner: db.deploys.find({"owner": login(owner), "repo_name": "repo-0"}).to_list(length=None),
+            lambda owner: deploys.get_deploys(login(owner), "repo-0"),
+            owners, ("deploys", {"owner": login(owners[0]), "repo_name": "repo-0"}),
+        ),
+        "get_deploys_for_owner": (
+            lambda owner: db.deploys.find({"owner": login(owner)}).to_list(length=None),
+            lambda owner: deploys.get_deploys_for_owner(login(owner)),
+            owners, ("deploys", {"owner": login(owners[0])}),
+        ),
+        "get_deployment_statistics": (
+            count_statuses,
+            lambda owner: deploys.get_deployment_statistics(login(owner)),
+            owners, ("deploys", {"owner": login(owners[0]), "status": "success"}),
+        ),
+        "get_user_by_github_id": (
+            lambda index: db.users.find_one({"github_id": github_id(index)}),
+            lambda index: users.get_user_by_github_id(github_id(index)),
+            user_ids, ("users", {"github_id": github_id(user_ids[0])}),
+        ),
+        "aws_user.get_user": (
+            lambda index: db.aws_users.find_one({"user_github_id": github_id(index)}),
+            lambda index: aws_users.get_user(github_id(index)),
+            user_ids, ("aws_users", {"user_github_id": github_id(user_ids[0])}),
+        ),
+    }
+
+    results = {}
+    for name, (driver_call, repository_call, targets, (collection_name, query)) in queries.items():
+        results[name] = {
+            "driver": await time_calls(driver_call, targets, warmup, clear_caches),
+            "repository": await time_calls(repository_call, targets, warmup, clear_caches),
+            "explain": await explain(db, collection_name, query),
+        }
+
+    # Deploy model construction on its own, over documents already in memory
+    documents = await db.deploys.find({"owner": login(owners[0])}).to_list(length=None)
+    iterations = max(1, 20_000 // max(1, len(documents)))
+    started = time.perf_counter()
+    for _ in range(iterations):
+        [DeployRepository._to_deploy(document) for document in documents]
+    per_document = (time.perf_counter() - started) / (iterations * max(1, len(documents)))
+    results["Deploy(**doc)"] = {"us_per_document": round(per_document * 1e6, 2), "documents": len(documents)}
+    return results
+
+
+def report(size: int, indexed: bool, results: Dict, budget_scale: float) -> List[str]:
+    """Print one table and return the budget violations."""
+    violations = []
+    print(f"\n{size:,} documents per collection, {'with' if indexed else 'without'} indexes")
+    print(f"{'query':<28}{'driver ms':>11}{'repo ms':>10}{'overhead':>10}  {'plan':<24}{'examined':>10}  budget")
+    for name, result in results.items():
+        if name == "Deploy(**doc)":
+            print(f"{name:<28}{result['us_per_document']:>10.2f} us per document ({result['documents']} documents)")
+            continue
+        driver, repository = result["driver"]["median_ms"], result["repository"]["median_ms"]
+        plan = result["explain"] or {"plan": "n/a", "docs_examined": "n/a"}
+        budget = BUDGETS_MS[name] * budget_scale
+        verdict = ""
+        if indexed:
+            verdict = f"{budget:g} ms ok" if repository <= budget else f"{budget:g} ms FAILED"
+            if repository > budget:
+                violations.append(f"{name} at {size:,} documents: median {repository} ms > {budget:g} ms")
+        print(f"{name:<28}{driver:>11.3f}{repository:>10.3f}{max(0.0, repository - driver):>10.3f}  "
+              f"{plan['plan']:<24}{plan['docs_examined']:>10}  {verdict}")
+    return violations
+
+
+async def run(args) -> Dict:
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+    settings.DATABASE_NAME = f"easy_deploy_repository_benchmark_{int(time.time())}"
+    DatabaseConnection().client = client
+    db = client[settings.DATABASE_NAME]
+
+    runs, violations = [], []
+    try:
+        for size in args.sizes:
+            await client.drop_database(settings.DATABASE_NAME)
+            started = time.perf_counter()
+            await seed(db, size)
+            print(f"\nseeded {size:,} documents per collection in {time.perf_counter() - started:.1f} s")
+            for indexed in (False, True):
+                await set_indexes(db, indexed)
+                results = await measure(db, size, args.rounds, args.warmup)
+                violations += report(size, indexed, results, args.budget_scale)
+                runs.append({"size": size, "indexed": indexed, "queries": results})
+    finally:
+        await client.drop_database(settings.DATABASE_NAME)
+        client.close()
+    return {"runs": runs, "violations": violations}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--mongomock", action="store_true", help="check the suite without a server; timings are meaningless")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget, e.g. on slow CI hosts")
+    parser.add_argument("--output", help="where to write the JSON results (default: benchmarks/results/repository-<timestamp>.json)")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    results = asyncio.run(run(args))
+    results.update({
+        "started_at": started_at.isoformat(),
+        "database": "mongomock" if args.mongomock else "mongodb",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "mongo_url")},
+        "budgets_ms": BUDGETS_MS,
+    })
+    output = args.output or os.path.join(RESULTS_DIR, f"repository-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if results["violations"] and not args.mongomock:
+        print("\nlatency budgets exceeded:\n  " + "\n  ".join(results["violations"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
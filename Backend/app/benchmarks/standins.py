@@ -0,0 +1,414 @@
+"""
+Local stand-ins for the services the app calls out to, used by the load test.
+
+- FakeGitHub serves the REST and OAuth endpoints the app uses from local bare git
+  repositories, and GitHubRedirectTransport points the app's httpx clients at it.
+- git_rewrite_environment makes `git clone https://<token>@github.com/...` read those
+  bare repositories instead.
+- write_stub_terraform puts a `terraform` executable on PATH whose outputs name the
+  AWS resources seed_aws creates in moto.
+"""
+import base64
+import json
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+GITHUB_HOSTS = ("github.com", "api.github.com")
+AWS_ACCOUNT_ID = "123456789012"
+AWS_REGION = "us-east-1"
+PLATFORM_ROLE_NAME = "easy-deploy-platform"
+PLATFORM_ROLE_ARN = f"arn:aws:iam::{AWS_ACCOUNT_ID}:role/{PLATFORM_ROLE_NAME}"
+CODEBUILD_ROLE_ARN = f"arn:aws:iam::{AWS_ACCOUNT_ID}:role/easy-deploy-codebuild"
+
+# How the stub terraform names a tenant's resources; seed_aws creates the same ones in moto.
+TERRAFORM_OUTPUT_TEMPLATES = {
+    "load_balancer_dns": "{repo_name}-{user_github_id}.elb.localhost",
+    "ecr_repo_url": f"{AWS_ACCOUNT_ID}.dkr.ecr.{AWS_REGION}.amazonaws.com/{{owner}}-{{repo_name}}",
+    "instance_id": "i-{user_github_id}",
+    "ecs_cluster_name": "{user_github_id}-cluster",
+    "ecs_service_name": "{repo_name}-service",
+    "ecs_container_name": "{repo_name}-container",
+}
+
+SAMPLE_APP_FILES = {
+    "main.py": (
+        "from fastapi import FastAPI\n\n"
+        "app = FastAPI()\n\n\n"
+        "@app.get(\"/\")\n"
+        "def root():\n"
+        "    return {\"message\": \"Hello\"}\n"
+    ),
+    "requirements.txt": "fastapi\nuvicorn\n",
+    "README.md": "# Load test fixture\n",
+    "docs/index.md": "Documentation outside the deployed code.\n",
+}
+
+
+def tenant_resources(user_github_id: str, owner: str, repo_name: str) -> Dict[str, str]:
+    """The Terraform outputs the stub returns for one deploy."""
+    values = {"user_github_id": user_github_id, "owner": owner, "repo_name": repo_name}
+    return {name: template.format(**values) for name, template in TERRAFORM_OUTPUT_TEMPLATES.items()}
+
+
+def _git(args: List[str], cwd: str) -> str:
+    env = {**os.environ, "GIT_AUTHOR_NAME": "Load Test", "GIT_AUTHOR_EMAIL": "load-test@localhost",
+           "GIT_COMMITTER_NAME": "Load Test", "GIT_COMMITTER_EMAIL": "load-test@localhost"}
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True).stdout
+
+
+class FakeUser:
+    def __init__(self, github_id: str, login: str):
+        self.github_id = github_id
+        self.login = login
+        self.access_token = f"gho_loadtest_{github_id}"
+        self.code = f"code-{github_id}"
+
+    def to_github(self) -> Dict:
+        return {"id": self.github_id, "login": self.login, "name": f"Load Test {self.login}",
+                "email": f"{self.login}@localhost", "avatar_url": None, "bio": None}
+
+
+class FakeGitHub:
+    """
+    A threaded HTTP server answering the GitHub endpoints the app calls, backed by bare
+    repositories under `root/git/<owner>/<repo>.git`. Each repository also has a working
+    copy under `root/work` that `push` commits to, so webhook payloads describe real commits.
+    """
+
+    def __init__(self, root: str, latency_seconds: float = 0.0):
+        self.root = root
+        self.git_root = os.path.join(root, "git")
+        self.work_root = os.path.join(root, "work")
+        self.latency_seconds = latency_seconds
+        self.users: Dict[str, FakeUser] = {}
+        self.repos: Dict[Tuple[str, str], str] = {}
+        self.hooks = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._tree_cache: Dict[Tuple[str, str, str], Dict] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def add_user(self, github_id: str, login: str) -> FakeUser:
+        user = FakeUser(github_id, login)
+        self.users[user.access_token] = user
+        return user
+
+    def add_repository(self, owner: str, repo_name: str, branch: str = "main") -> str:
+        bare = os.path.join(self.git_root, owner, f"{repo_name}.git")
+        work = os.path.join(self.work_root, owner, repo_name)
+        os.makedirs(bare)
+        os.makedirs(work)
+        _git(["init", "--bare", "-q", "-b", branch, bare], cwd=self.root)
+        _git(["init", "-q", "-b", branch], cwd=work)
+        for path, content in SAMPLE_APP_FILES.items():
+            os.makedirs(os.path.dirname(os.path.join(work, path)), exist_ok=True)
+            with open(os.path.join(work, path), "w") as f:
+                f.write(content)
+        _git(["add", "-A"], cwd=work)
+        _git(["commit", "-q", "-m", "Initial commit"], cwd=work)
+        _git(["remote", "add", "origin", bare], cwd=work)
+        _git(["push", "-q", "origin", branch], cwd=work)
+        self.repos[(owner, repo_name)] = bare
+        return bare
+
+    def push(self, owner: str, repo_name: str, path: str = "main.py", branch: str = "main") -> Dict:
+        """Commit a change to `path`, push it and return the matching webhook payload."""
+        work = os.path.join(self.work_root, owner, repo_name)
+        with self._lock:
+            before = _git(["rev-parse", "HEAD"], cwd=work).strip()
+            with open(os.path.join(work, path), "a") as f:
+                f.write(f"# change {time.time_ns()}\n")
+            _git(["commit", "-q", "-am", f"Update {path}"], cwd=work)
+            _git(["push", "-q", "origin", branch], cwd=work)
+            after = _git(["rev-parse", "HEAD"], cwd=work).strip()
+        return {
+            "ref": f"refs/heads/{branch}",
+            "before": before,
+            "after": after,
+            "repository": {"name": repo_name, "owner": {"login": owner}},
+            "commits": [{"id": after, "added": [], "modified": [path], "removed": []}],
+        }
+
+    def start(self) -> "FakeGitHub":
+        handler = type("Handler", (_GitHubHandler,), {"github": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-github", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # === Responses ===
+
+    def repository(self, owner: str, repo_name: str) -> Dict:
+        return {
+            "name": repo_name,
+            "private": False,
+            "html_url": f"https://github.com/{owner}/{repo_name}",
+            "url": f"https://api.github.com/repos/{owner}/{repo_name}",
+            "default_branch": "main",
+            "description": "Load test fixture",
+            "language": "Python",
+        }
+
+    def resolve(self, owner: str, repo_name: str, revision: str) -> Optional[str]:
+        try:
+            return _git(["rev-parse", "--verify", f"{revision}^{{commit}}"], cwd=self.repos[(owner, repo_name)]).strip()
+        except subprocess.CalledProcessError:
+            return None
+
+    def tree(self, owner: str, repo_name: str, sha: str) -> Optional[Dict]:
+        key = (owner, repo_name, sha)
+        if key not in self._tree_cache:
+            try:
+                output = _git(["ls-tree", "-r", "-t", "-l", sha], cwd=self.repos[(owner, repo_name)])
+            except subprocess.CalledProcessError:
+                return None
+            entries = []
+            for line in output.splitlines():
+                meta, path = line.split("\t", 1)
+                mode, entry_type, entry_sha, size = meta.split()
+                entry = {"path": path, "mode": mode, "type": entry_type, "sha": entry_sha}
+                if entry_type == "blob":
+                    entry["size"] = int(size)
+                entries.append(entry)
+            self._tree_cache[key] = {"sha": sha, "tree": entries, "truncated": False}
+        return self._tree_cache[key]
+
+    def blob(self, owner: str, repo_name: str, sha: str) -> Optional[Dict]:
+        try:
+            content = subprocess.run(["git", "cat-file", "blob", sha], cwd=self.repos[(owner, repo_name)],
+                                     check=True, capture_output=True).stdout
+        except subprocess.CalledProcessError:
+            return None
+        return {"sha": sha, "size": len(content), "encoding": "base64", "content": base64.b64encode(content).decode()}
+
+    def compare(self, owner: str, repo_name: str, base: str, head: str) -> Optional[Dict]:
+        try:
+            output = _git(["diff", "--name-only", base, head], cwd=self.repos[(owner, repo_name)])
+        except subprocess.CalledProcessError:
+            return None
+        return {"files": [{"filename": path, "status": "modified"} for path in output.splitlines()]}
+
+
+class _GitHubHandler(BaseHTTPRequestHandler):
+    github: FakeGitHub
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _user(self) -> Optional[FakeUser]:
+        authorization = self.headers.get("Authorization", "")
+        return self.github.users.get(authorization.split(" ", 1)[-1]) if authorization else None
+
+    def _route(self, method: str):
+        github = self.github
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if method == "POST" and parts == ["login", "oauth", "access_token"]:
+            length = int(self.headers.get("Content-Length") or 0)
+            code = parse_qs(self.rfile.read(length).decode()).get("code", [""])[0]
+            user = next((user for user in github.users.values() if user.code == code), None)
+            if user is None:
+                return 200, {"error": "bad_verification_code"}
+            return 200, {"access_token": user.access_token, "token_type": "bearer", "scope": "repo"}
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+
+        if parts == ["user"]:
+            user = self._user()
+            return (200, user.to_github()) if user else (401, {"message": "Bad credentials"})
+        if len(parts) == 3 and parts[0] == "users" and parts[2] == "repos":
+            owner = parts[1]
+            return 200, [github.repository(repo_owner, name) for repo_owner, name in github.repos if repo_owner == owner]
+        if len(parts) < 3 or parts[0] != "repos" or (parts[1], parts[2]) not in github.repos:
+            return 404, {"message": "Not Found"}
+
+        owner, repo_name, rest = parts[1], parts[2], parts[3:]
+        if not rest:
+            return 200, github.repository(owner, repo_name)
+        if rest == ["languages"]:
+            return 200, {"Python": 1024}
+        if rest == ["hooks"] and method == "POST":
+            with github._lock:
+                github.hooks += 1
+                return 201, {"id": github.hooks, "active": True, "events": ["push"]}
+        if len(rest) == 2 and rest[0] == "commits":
+            sha = github.resolve(owner, repo_name, rest[1])
+            return (200, {"sha": sha}) if sha else (404, {"message": "No commit found"})
+        if len(rest) == 3 and rest[:2] == ["git", "trees"]:
+            sha = github.resolve(owner, repo_name, rest[2])
+            tree = github.tree(owner, repo_name, sha) if sha else None
+            return (200, tree) if tree else (404, {"message": "Not Found"})
+        if len(rest) == 3 and rest[:2] == ["git", "blobs"]:
+            blob = github.blob(owner, repo_name, rest[2])
+            return (200, blob) if blob else (404, {"message": "Not Found"})
+        if len(rest) == 2 and rest[0] == "compare" and "..." in rest[1]:
+            base, head = rest[1].split("...", 1)
+            comparison = github.compare(owner, repo_name, base, head)
+            return (200, comparison) if comparison else (404, {"message": "Not Found"})
+        return 404, {"message": "Not Found"}
+
+    def _handle(self, method: str) -> None:
+        if self.github.latency_seconds:
+            time.sleep(self.github.latency_seconds)
+        status, body = self._route(method)
+        self._send(status, body)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class GitHubRedirectTransport(httpx.AsyncBaseTransport):
+    """Send requests for github.com and api.github.com to the fake server; pass everything else through."""
+
+    def __init__(self, github_url: str):
+        target = urlsplit(github_url)
+        self.host, self.port = target.hostname, target.port
+        self.transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host in GITHUB_HOSTS:
+            request.url = request.url.copy_with(scheme="http", host=self.host, port=self.port)
+            request.headers["Host"] = f"{self.host}:{self.port}"
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def redirect_github_requests(github_url: str) -> None:
+    """Make every httpx.AsyncClient created from now on talk to the fake GitHub server."""
+    import services.git_repository as git_repository
+
+    class StandInAsyncClient(httpx.AsyncClient):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault("transport", GitHubRedirectTransport(github_url))
+            super().__init__(*args, **kwargs)
+
+    httpx.AsyncClient = StandInAsyncClient
+    git_repository.AsyncClient = StandInAsyncClient
+
+
+def git_rewrite_environment(github: FakeGitHub) -> Dict[str, str]:
+    """GIT_CONFIG_* variables rewriting each user's clone URL to the bare repositories."""
+    target = f"file://{github.git_root}/"
+    sources = ["https://github.com/"] + [f"https://{token}@github.com/" for token in github.users]
+    env = {"GIT_CONFIG_COUNT": str(len(sources))}
+    for index, source in enumerate(sources):
+        env[f"GIT_CONFIG_KEY_{index}"] = f"url.{target}.insteadOf"
+        env[f"GIT_CONFIG_VALUE_{index}"] = source
+    return env
+
+
+STUB_TERRAFORM = '''#!{python}
+"""Stub terraform: `apply` records outputs named from the tfvars, `output -json` prints them."""
+import json, os, sys, time
+
+TEMPLATES = {templates}
+args = sys.argv[1:]
+command = next((arg for arg in args if not arg.startswith("-")), "")
+if command == "apply":
+    tf_vars = {{}}
+    for arg in args:
+        if arg.startswith("-var-file="):
+            with open(arg.split("=", 1)[1]) as f:
+                tf_vars.update(json.load(f))
+    time.sleep(float(os.environ.get("STUB_TERRAFORM_APPLY_SECONDS", "0")))
+    outputs = {{name: {{"value": template.format(**tf_vars), "type": "string", "sensitive": False}}
+               for name, template in TEMPLATES.items()}}
+    with open("stub-terraform-outputs.json", "w") as f:
+        json.dump(outputs, f)
+    print("Apply complete! Resources: 0 added, 0 changed, 0 destroyed.")
+elif command == "output":
+    if os.path.exists("stub-terraform-outputs.json"):
+        with open("stub-terraform-outputs.json") as f:
+            print(f.read())
+    else:
+        print("{{}}")
+else:
+    print(f"stub terraform: {{command}} ok")
+'''
+
+
+def write_stub_terraform(bin_dir: str) -> str:
+    os.makedirs(bin_dir, exist_ok=True)
+    path = os.path.join(bin_dir, "terraform")
+    with open(path, "w") as f:
+        f.write(STUB_TERRAFORM.format(python=sys.executable, templates=repr(TERRAFORM_OUTPUT_TEMPLATES)))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def seed_aws(tenants: List[Tuple[str, str, str]]) -> None:
+    """
+    Create the platform role and, for every (github id, owner, repo), the ECR repository,
+    ECS cluster and service and CodeBuild project that the real Terraform module would.
+    Must run inside an active moto mock.
+    """
+    import boto3
+
+    iam = boto3.client("iam", region_name=AWS_REGION)
+    trust = json.dumps({"Version": "2012-10-17", "Statement": [
+        {"Effect": "Allow", "Principal": {"AWS": f"arn:aws:iam::{AWS_ACCOUNT_ID}:root"}, "Action": "sts:AssumeRole"}
+    ]})
+    iam.create_role(RoleName=PLATFORM_ROLE_NAME, AssumeRolePolicyDocument=trust)
+    iam.create_role(RoleName=CODEBUILD_ROLE_ARN.rsplit("/", 1)[1], AssumeRolePolicyDocument=trust)
+
+    ecr = boto3.client("ecr", region_name=AWS_REGION)
+    ecs = boto3.client("ecs", region_name=AWS_REGION)
+    codebuild = boto3.client("codebuild", region_name=AWS_REGION)
+    logs = boto3.client("logs", region_name=AWS_REGION)
+    clusters = set()
+    for github_id, owner, repo_name in tenants:
+        outputs = tenant_resources(github_id, owner, repo_name)
+        repository_name = outputs["ecr_repo_url"].split("/", 1)[1]
+        ecr.create_repository(repositoryName=repository_name)
+        if outputs["ecs_cluster_name"] not in clusters:
+            ecs.create_cluster(clusterName=outputs["ecs_cluster_name"])
+            clusters.add(outputs["ecs_cluster_name"])
+        task_definition = ecs.register_task_definition(
+            family=f"{github_id}-{repo_name}",
+            containerDefinitions=[{"name": outputs["ecs_container_name"], "image": f"{outputs['ecr_repo_url']}:latest", "memory": 512}],
+        )["taskDefinition"]
+        ecs.create_service(
+            cluster=outputs["ecs_cluster_name"], serviceName=outputs["ecs_service_name"],
+            taskDefinition=task_definition["taskDefinitionArn"], desiredCount=1,
+        )
+        codebuild.create_project(
+            name=f"{github_id}-{repo_name}-codebuild",
+            source={"type": "S3", "location": f"easy-deploy-load-test/{github_id}/{repo_name}.zip"},
+            artifacts={"type": "NO_ARTIFACTS"},
+            environment={"type": "LINUX_CONTAINER", "image": "aws/codebuild/standard:7.0", "computeType": "BUILD_GENERAL1_SMALL"},
+            serviceRole=CODEBUILD_ROLE_ARN,
+        )
+        logs.create_log_group(logGroupName=f"/aws/codebuild/{github_id}-{repo_name}-codebuild")
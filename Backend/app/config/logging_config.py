@@ -1,54 +1,202 @@
+import atexit
+import copy
+import gzip
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import shutil
 import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from config.settings import Settings
+
+# Correlation ids stamped on every record logged while they are set. asyncio tasks and
+# asyncio.to_thread copy the context, so ids follow the work they describe.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+deploy_id_var: ContextVar[Optional[str]] = ContextVar("deploy_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class CorrelationFilter(logging.Filter):
+    """Copy the request and deploy correlation ids onto the record, on the thread that logged it."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.deploy_id = deploy_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limit records from noisy loggers with a token bucket per logger. Warnings and
+    above always pass; the number of dropped records is reported on the next one let through.
+    """
+
+    def __init__(self, logger_names: Iterable[str], rate_per_second: float, burst: int):
+        super().__init__()
+        self.logger_names = tuple(logger_names)
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _sampled(self, name: str) -> Optional[str]:
+        for logger_name in self.logger_names:
+            if name == logger_name or name.startswith(f"{logger_name}."):
+                return logger_name
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        bucket_name = self._sampled(record.name)
+        if bucket_name is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill, dropped since last emitted record]
+            bucket = self._buckets.setdefault(bucket_name, [float(self.burst), now, 0])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            record.sampled_out = bucket[2]
+            bucket[2] = 0
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: bucket[2] for name, bucket in self._buckets.items()}
+
+
+class CorrelatedQueueHandler(logging.handlers.QueueHandler):
+    """Render the message and traceback on the calling thread, keeping them apart for the JSON formatter."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the correlation ids and any sampling count."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "deploy_id", "sampled_out"):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class GzipRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that compresses rotated files; rotation runs on the queue listener thread."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as source_file, gzip.open(dest, "wb") as dest_file:
+            shutil.copyfileobj(source_file, dest_file)
+        os.remove(source)
+
 
 def setup_logging():
-    """Configure logging for the application."""
+    """
+    Configure logging for the application.
+
+    Log calls only put the record on a queue; a QueueListener thread formats it and does
+    the file and console I/O, including rotation, so the event loop never blocks on it.
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
     # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
+    log_dir = Path(Settings.LOG_DIR)
     log_dir.mkdir(exist_ok=True)
 
-    # Configure root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-
-    # Create formatters
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    json_formatter = JsonFormatter()
     console_formatter = logging.Formatter(
         '%(asctime)s - %(levelname)s - %(message)s'
     )
 
     # File handler for all logs
-    all_logs_handler = logging.handlers.RotatingFileHandler(
+    all_logs_handler = GzipRotatingFileHandler(
         log_dir / "app.log",
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5
+        maxBytes=Settings.LOG_MAX_BYTES,
+        backupCount=Settings.LOG_BACKUP_COUNT
     )
     all_logs_handler.setLevel(logging.INFO)
-    all_logs_handler.setFormatter(file_formatter)
+    all_logs_handler.setFormatter(json_formatter)
 
     # File handler for errors
-    error_logs_handler = logging.handlers.RotatingFileHandler(
+    error_logs_handler = GzipRotatingFileHandler(
         log_dir / "error.log",
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5
+        maxBytes=Settings.LOG_MAX_BYTES,
+        backupCount=Settings.LOG_BACKUP_COUNT
     )
     error_logs_handler.setLevel(logging.ERROR)
-    error_logs_handler.setFormatter(file_formatter)
+    error_logs_handler.setFormatter(json_formatter)
+
+    handlers = [all_logs_handler, error_logs_handler]
 
     # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(console_formatter)
+    if Settings.LOG_CONSOLE_FORMAT != "off":
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(json_formatter if Settings.LOG_CONSOLE_FORMAT == "json" else console_formatter)
+        handlers.append(console_handler)
 
-    # Add handlers to root logger
-    root_logger.addHandler(all_logs_handler)
-    root_logger.addHandler(error_logs_handler)
-    root_logger.addHandler(console_handler)
+    # The root logger only enqueues; the listener owns every handler that does I/O
+    log_queue = queue.SimpleQueue()
+    _queue_handler = CorrelatedQueueHandler(log_queue)
+    _queue_handler.addFilter(CorrelationFilter())
+    _queue_handler.addFilter(SamplingFilter(
+        Settings.LOG_SAMPLED_LOGGERS, Settings.LOG_SAMPLE_RATE_PER_SECOND, Settings.LOG_SAMPLE_BURST
+    ))
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(_queue_handler)
+
+    # uvicorn installs its own handlers with propagate=False before the app is imported;
+    # route its records through the queue so access logs are sampled and written like the rest
+    for name in ('uvicorn', 'uvicorn.error', 'uvicorn.access'):
+        uvicorn_logger = logging.getLogger(name)
+        for handler in list(uvicorn_logger.handlers):
+            uvicorn_logger.removeHandler(handler)
+        uvicorn_logger.propagate = True
 
     # Set specific logger levels
     logging.getLogger('uvicorn').setLevel(logging.INFO)
@@ -71,6 +219,23 @@ def setup_logging():
 
     return loggers
 
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
 class LoggerWriter:
     """Helper class to redirect stdout/stderr to logger."""
     def __init__(self, log_function):
@@ -83,4 +248,4 @@ class LoggerWriter:
             self.log_function(message.rstrip())
 
     def flush(self):
-        pass
\ No newline at end of file
+        pass
@@ -15,6 +15,62 @@ class Settings:
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
     EXPIRATION_TIME = os.getenv("EXPIRATION_TIME")
+    TREE_INDEX_CACHE_SIZE = int(os.getenv("TREE_INDEX_CACHE_SIZE", "256"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+    AUTH_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+    ADMIN_GITHUB_IDS = [github_id.strip() for github_id in os.getenv("ADMIN_GITHUB_IDS", "").split(",") if github_id.strip()]
+    WORKSPACE_QUOTA_BYTES = int(os.getenv("WORKSPACE_QUOTA_BYTES", str(50 * 1024 ** 3)))  # 50GB
+    WORKSPACE_GC_INTERVAL_SECONDS = int(os.getenv("WORKSPACE_GC_INTERVAL_SECONDS", "300"))
+    WORKSPACE_SCAN_BATCH_SIZE = int(os.getenv("WORKSPACE_SCAN_BATCH_SIZE", "50"))
+    WORKSPACE_PIN_TTL_SECONDS = int(os.getenv("WORKSPACE_PIN_TTL_SECONDS", "7200"))
+    WORKSPACE_MIN_IDLE_SECONDS = int(os.getenv("WORKSPACE_MIN_IDLE_SECONDS", "3600"))  # longer than a CodeBuild run
+    AWS_IDENTITY_POOL_SIZE = int(os.getenv("AWS_IDENTITY_POOL_SIZE", "3"))
+    TERRAFORM_MAX_PARALLEL_RUNS = int(os.getenv("TERRAFORM_MAX_PARALLEL_RUNS", "4"))
+    TERRAFORM_WORKSPACE_DIR = os.getenv("TERRAFORM_WORKSPACE_DIR", "/tmp/easy-deploy/terraform")
+    TERRAFORM_PLUGIN_CACHE_DIR = os.getenv("TERRAFORM_PLUGIN_CACHE_DIR", "/tmp/easy-deploy/terraform-plugins")
+    TERRAFORM_STATE_BUCKET = os.getenv("TERRAFORM_STATE_BUCKET")  # local state per tenant directory when unset
+    TERRAFORM_LOCK_TABLE = os.getenv("TERRAFORM_LOCK_TABLE", "terraform-locks")
+    TERRAFORM_STATE_REGION = os.getenv("TERRAFORM_STATE_REGION", "us-east-1")
+    BUILD_TRACKER_MIN_INTERVAL_SECONDS = float(os.getenv("BUILD_TRACKER_MIN_INTERVAL_SECONDS", "5"))
+    BUILD_TRACKER_MAX_INTERVAL_SECONDS = float(os.getenv("BUILD_TRACKER_MAX_INTERVAL_SECONDS", "60"))
+    BUILD_LOG_POLL_INTERVAL_SECONDS = float(os.getenv("BUILD_LOG_POLL_INTERVAL_SECONDS", "2"))
+    BUILD_LOG_BUFFER_SIZE = int(os.getenv("BUILD_LOG_BUFFER_SIZE", "2000"))
+    BUILD_LOG_IDLE_SECONDS = float(os.getenv("BUILD_LOG_IDLE_SECONDS", "60"))
+    LOG_DIR = os.getenv("LOG_DIR", "logs")
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # 10MB
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    LOG_CONSOLE_FORMAT = os.getenv("LOG_CONSOLE_FORMAT", "text")  # text | json | off
+    LOG_SAMPLED_LOGGERS = [name.strip() for name in os.getenv("LOG_SAMPLED_LOGGERS", "uvicorn.access,httpx,database").split(",") if name.strip()]
+    LOG_SAMPLE_RATE_PER_SECOND = float(os.getenv("LOG_SAMPLE_RATE_PER_SECOND", "20"))
+    LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "100"))
+    LOOP_WATCHDOG_ENABLED = os.getenv("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+    LOOP_WATCHDOG_INTERVAL_SECONDS = float(os.getenv("LOOP_WATCHDOG_INTERVAL_SECONDS", "0.05"))
+    LOOP_STALL_THRESHOLD_SECONDS = float(os.getenv("LOOP_STALL_THRESHOLD_SECONDS", "0.1"))
+    LOOP_STALL_RING_SIZE = int(os.getenv("LOOP_STALL_RING_SIZE", "100"))
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "true").lower() == "true"
+    PROFILER_INTERVAL_SECONDS = float(os.getenv("PROFILER_INTERVAL_SECONDS", "0.01"))
+    PROFILER_MAX_OVERHEAD = float(os.getenv("PROFILER_MAX_OVERHEAD", "0.02"))  # share of wall time spent sampling
+    PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+    PROFILER_MAX_CONCURRENT = int(os.getenv("PROFILER_MAX_CONCURRENT", "1"))  # shared by the endpoint and X-Profile requests
+    PROFILER_RING_SIZE = int(os.getenv("PROFILER_RING_SIZE", "20"))
+    STARTUP_READY_BUDGET_SECONDS = float(os.getenv("STARTUP_READY_BUDGET_SECONDS", "10"))  # process start to ready
+    STARTUP_WARMUP_RETRY_SECONDS = float(os.getenv("STARTUP_WARMUP_RETRY_SECONDS", "2"))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))  # uvicorn worker processes per task
+    SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "mongo")  # mongo | memory; memory is only safe with one process
+    LEADER_LEASE_TTL_SECONDS = float(os.getenv("LEADER_LEASE_TTL_SECONDS", "30"))
+    LEADER_LEASE_RENEW_SECONDS = float(os.getenv("LEADER_LEASE_RENEW_SECONDS", "10"))
+    SHARED_SIGNAL_POLL_SECONDS = float(os.getenv("SHARED_SIGNAL_POLL_SECONDS", "5"))  # how often a leader checks for wakeups from other workers
+    REPO_LOCK_TTL_SECONDS = float(os.getenv("REPO_LOCK_TTL_SECONDS", "60"))
+    REPO_LOCK_HEARTBEAT_SECONDS = float(os.getenv("REPO_LOCK_HEARTBEAT_SECONDS", "20"))
+    REPO_LOCK_POLL_SECONDS = float(os.getenv("REPO_LOCK_POLL_SECONDS", "0.5"))
+    REPO_LOCK_WAIT_TIMEOUT_SECONDS = float(os.getenv("REPO_LOCK_WAIT_TIMEOUT_SECONDS", "1800"))  # a deploy, including its Terraform apply, can take this long
+    WEBHOOK_MAX_CONCURRENT_BUILDS = int(os.getenv("WEBHOOK_MAX_CONCURRENT_BUILDS", "8"))  # shared by every push being handled
+    AWS_TENANCY_MODE = os.getenv("AWS_TENANCY_MODE", "iam_user")  # iam_user | sts
+    AWS_PLATFORM_ROLE_ARN = os.getenv("AWS_PLATFORM_ROLE_ARN")
+    AWS_STS_SESSION_DURATION_SECONDS = int(os.getenv("AWS_STS_SESSION_DURATION_SECONDS", "3600"))
+    AWS_STS_REFRESH_MARGIN_SECONDS = int(os.getenv("AWS_STS_REFRESH_MARGIN_SECONDS", "300"))
+    AWS_IDENTITY_POOL_REFILL_INTERVAL_SECONDS = int(os.getenv("AWS_IDENTITY_POOL_REFILL_INTERVAL_SECONDS", "300"))
     
 
     
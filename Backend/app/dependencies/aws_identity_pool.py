@@ -0,0 +1,9 @@
+from fastapi import Depends
+from dependencies.database_connection import DatabaseConnection
+from repositories.aws_identity_pool import AWSIdentityPoolRepository
+
+def get_aws_identity_pool_repository(db: DatabaseConnection = Depends(DatabaseConnection)) -> AWSIdentityPoolRepository:
+    """
+    Dependency to get an instance of AWSIdentityPoolRepository.
+    """
+    return AWSIdentityPoolRepository(db)
@@ -1,7 +1,10 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 from config.settings import settings
+from services.metrics import MongoCommandMetrics
+from services.startup import lazy_import
 import logging
+
+motor_asyncio = lazy_import("motor.motor_asyncio")
 logger = logging.getLogger('uvicorn.error')
 
 class DatabaseConnection:
@@ -26,13 +29,16 @@ class DatabaseConnection:
     async def connect(self):
         if self.client is None:  # Only connect if no client exists
             try:
-                self.client = AsyncIOMotorClient(self.database_url)
-                # Trigger a server selection to ensure connection
-                await self.client.server_info()
-                
-                logger.info("Connected to MongoDB Successfully")
+                # The driver connects in the background; startup warmup pings the server
+                self.client = motor_asyncio.AsyncIOMotorClient(self.database_url, event_listeners=[MongoCommandMetrics()])
             except Exception as e:
                 logger.error(f"Error while connected to MongoDB: {e}")
+
+    async def ping(self):
+        """Round trip to the server; raises when it cannot be reached."""
+        await self.connect()
+        await self.client.admin.command("ping")
+        logger.info("Connected to MongoDB Successfully")
     
     async def get_database(self):
         if not self.client:
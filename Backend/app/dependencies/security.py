@@ -1,89 +1,71 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from config.settings import settings
 from dependencies.services import get_user_service, UserService
 from services.jwt import decode_access_token
+from schemas.user_schema import UserSchema
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(
+class AuthContext:
+    """
+    Authentication state for one request: the token is decoded and the user loaded once,
+    and FastAPI's per-request dependency cache shares it with every dependant.
+    """
+    def __init__(self, token: str, payload: dict, user: UserSchema):
+        self.token = token
+        self.payload = payload
+        self.user = user
+        self.github_id = payload.get("sub")
+        self.access_key = payload.get("access_key")
+
+
+async def get_auth_context(
     token: str = Depends(oauth2_scheme),
     user_service: UserService = Depends(get_user_service)
-):
+) -> AuthContext:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    github_id = None
-    try:
-        payload = decode_access_token(token)
-        if payload is None:
-            raise credentials_exception
-        github_id = payload.get("sub")
-        if github_id is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_access_token(token)
+    if payload is None:
+        raise credentials_exception
+    github_id = payload.get("sub")
+    if github_id is None:
         raise credentials_exception
     user = await user_service.get_user_by_github_id(github_id)
     
-    if user is None:
+    if user is None or user.login != payload.get("name"):
         raise credentials_exception
     user.access_token = payload.get("access_key")
-    if user.login == payload.get("name"):
-        return user
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    return AuthContext(token=token, payload=payload, user=user)
+
+
+async def get_current_user(auth: AuthContext = Depends(get_auth_context)) -> UserSchema:
+    return auth.user
 
-async def get_access_key_from_token_payload(token: str ) -> str:
+
+async def get_access_key(auth: AuthContext = Depends(get_auth_context)) -> str:
     """
-    Extract the access key from the JWT token payload.
+    GitHub access key carried by the request's JWT.
     """
-    try:
-        # get the current token 
-        
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        access_key = payload.get("access_key")
-        if access_key is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return access_key
-    except JWTError:
+    if auth.access_key is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    return auth.access_key
 
-async def get_github_id_from_token_payload(token: str) -> str:
+async def get_admin_user(user = Depends(get_current_user)):
     """
-    Extract the github id from the JWT token payload.
+    Allow only users listed in ADMIN_GITHUB_IDS.
     """
-    try:
-        # get the current token 
-        
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        github_id = payload.get("sub")
-        if github_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return github_id
-    except JWTError:
+    if user.github_id not in settings.ADMIN_GITHUB_IDS:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
         )
-
+    return user
@@ -5,12 +5,20 @@ from repositories.git_repository import GitRepository
 from repositories.aws_user import AWSUserRepository
 from repositories.deploy import DeployRepository
 from services.deploy import DeployService
+from services.push_queue import PushQueue
 from services.monitoring import MonitoringService
 from services.aws_user import AWSUserService
+from services.aws_credentials import AWSCredentialProvider
+from services.workspace import WorkspaceService
+from repositories.workspace import WorkspaceRepository
 from dependencies.user import get_user
 from dependencies.git_repository import get_git_repository
 from dependencies.aws_user import get_aws_user_repository
 from dependencies.deploy import get_deploy_repository
+from dependencies.workspace import get_workspace_repository
+from dependencies.aws_identity_pool import get_aws_identity_pool_repository
+from repositories.aws_identity_pool import AWSIdentityPoolRepository
+from services.aws_identity_pool import AWSIdentityPoolService
 
 
 from dependencies.user import get_user
@@ -21,24 +29,52 @@ async def get_user_service(user_repository: User = Depends(get_user)) -> UserSer
     return UserService(user_repository)
 
 
+async def get_workspace_service(
+    workspace_repository: WorkspaceRepository = Depends(get_workspace_repository)
+) -> WorkspaceService:
+    return WorkspaceService(workspace_repository)
+
+
 async def get_git_repository_service(
-    git_repository: GitRepository = Depends(get_git_repository)
+    git_repository: GitRepository = Depends(get_git_repository),
+    workspace_service: WorkspaceService = Depends(get_workspace_service),
 ) -> GitRepositoryService:
-    return GitRepositoryService(git_repository)
+    return GitRepositoryService(git_repository, workspace_service)
+
+
+async def get_aws_identity_pool_service(
+    identity_pool_repository: AWSIdentityPoolRepository = Depends(get_aws_identity_pool_repository)
+) -> AWSIdentityPoolService:
+    return AWSIdentityPoolService(identity_pool_repository)
 
 
 async def get_aws_user_service(
-    aws_user_repository: AWSUserRepository = Depends(get_aws_user_repository)
+    aws_user_repository: AWSUserRepository = Depends(get_aws_user_repository),
+    identity_pool: AWSIdentityPoolService = Depends(get_aws_identity_pool_service),
 ) -> AWSUserService:
-    return AWSUserService(aws_user_repository)
+    return AWSUserService(aws_user_repository, identity_pool)
+
+
+async def get_aws_credential_provider(
+    aws_user_service: AWSUserService = Depends(get_aws_user_service)
+) -> AWSCredentialProvider:
+    return AWSCredentialProvider(aws_user_service)
 
 
 async def get_deploy_service(
     deploy_repository: DeployRepository = Depends(get_deploy_repository),
     aws_user_service: AWSUserService = Depends(get_aws_user_service),
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
+    credential_provider: AWSCredentialProvider = Depends(get_aws_credential_provider),
 ) -> DeployService:
-    return DeployService(deploy_repository, aws_user_service, git_repository_service)
+    return DeployService(deploy_repository, aws_user_service, git_repository_service, credential_provider)
+
+
+async def get_push_queue(
+    git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
+    deploy_service: DeployService = Depends(get_deploy_service),
+) -> PushQueue:
+    return PushQueue(git_repository_service, deploy_service)
 
 
 async def get_aws_codebuild(
@@ -0,0 +1,22 @@
+from typing import Optional
+from config.settings import settings
+from dependencies.database_connection import DatabaseConnection
+from interfaces.shared_state_interface import SharedStateInterface
+from repositories.shared_state import InMemorySharedState, SharedStateRepository
+
+SHARED_STATE_MEMORY = "memory"
+SHARED_STATE_MONGO = "mongo"
+
+_shared_state: Optional[SharedStateInterface] = None
+
+def get_shared_state() -> SharedStateInterface:
+    """
+    The process-wide shared state backend selected by SHARED_STATE_BACKEND.
+    """
+    global _shared_state
+    if _shared_state is None:
+        if settings.SHARED_STATE_BACKEND == SHARED_STATE_MEMORY:
+            _shared_state = InMemorySharedState()
+        else:
+            _shared_state = SharedStateRepository(DatabaseConnection())
+    return _shared_state
@@ -0,0 +1,9 @@
+from fastapi import Depends
+from dependencies.database_connection import DatabaseConnection
+from repositories.workspace import WorkspaceRepository
+
+async def get_workspace_repository(db: DatabaseConnection = Depends(DatabaseConnection)) -> WorkspaceRepository:
+    """
+    Dependency to get the WorkspaceRepository instance with a database connection.
+    """
+    return WorkspaceRepository(db)
@@ -0,0 +1,47 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+
+class SharedStateInterface(ABC):
+    """State shared by every worker process and replica: expiring values, counters and leases."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the value stored under a key, or None when it is unset or expired."""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, optionally expiring after `ttl_seconds`."""
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1) -> int:
+        """Atomically add to a counter and return its new value."""
+        pass
+
+    @abstractmethod
+    async def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> Optional[int]:
+        """
+        Take a lease that is free or expired, or extend one the holder already has.
+        Returns the fencing token, which grows every time the lease changes hands,
+        or None while another holder has it.
+        """
+        pass
+
+    @abstractmethod
+    async def renew_lease(self, name: str, holder: str, token: int, ttl_seconds: float) -> bool:
+        """Extend a held lease; False once it has expired or been taken over."""
+        pass
+
+    @abstractmethod
+    async def release_lease(self, name: str, holder: str, token: int) -> None:
+        pass
+
+    @abstractmethod
+    async def list_leases(self, prefix: str = "") -> List[Dict]:
+        pass
@@ -1,19 +1,44 @@
-from fastapi import FastAPI, Depends
+# Imports from here on are timed for the startup profile served by /admin/startup
+from services.startup import startup_state
+startup_state.imports.install()
+
+import asyncio
+import uuid
+from fastapi import FastAPI, Depends, Request, Response
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.openapi.utils import get_openapi
-from routers import user, auth, git_repositories, aws_user, deploy, monitoring
+from routers import user, auth, git_repositories, aws_user, deploy, monitoring, admin
 import os
 from dotenv import load_dotenv
 from dependencies.database_connection import DatabaseConnection
-from config.logging_config import setup_logging
+from config.logging_config import setup_logging, request_id_var
+from config.settings import settings
+from repositories.workspace import WorkspaceRepository
+from services.workspace import WorkspaceService
+from repositories.aws_identity_pool import AWSIdentityPoolRepository
+from services.aws_identity_pool import AWSIdentityPoolService
+from services.aws_credentials import AWSCredentialProvider, TENANCY_STS
+from repositories.deploy import DeployRepository
+from repositories.user import User
+from repositories.aws_user import AWSUserRepository
+from services.build_tracker import CodeBuildStatusTracker
+from services.aws_user import AWSUserService
+from services.deploy import DeployService
+from services.metrics import MetricsMiddleware, render_metrics
+from services.loop_watchdog import loop_watchdog
+from services.profiler import ProfilerMiddleware
+from services.leader import HOSTNAME, LeaderLoop
+from dependencies.shared_state import get_shared_state, SHARED_STATE_MEMORY
 
 load_dotenv()
 
 # Initialize logging
 loggers = setup_logging()
 logger = loggers['api']
+startup_state.mark("imported")
 
 app = FastAPI()
 
@@ -52,26 +77,118 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
+
+@app.middleware("http")
+async def correlate_request(request: Request, call_next):
+    """Tag every log record written while handling a request with its request id."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+background_tasks = []
+
+async def ensure_indexes():
+    # Existing indexes are left alone, so this is a no-op after the first start
+    for repository in (DeployRepository(DatabaseConnection()), User(DatabaseConnection()), AWSUserRepository(DatabaseConnection())):
+        await repository.ensure_indexes()
+    if settings.SHARED_STATE_BACKEND != SHARED_STATE_MEMORY:
+        await get_shared_state().ensure_indexes()
+
+def create_aws_clients():
+    # Creating the first client loads botocore's endpoint and service model files,
+    # which every later client of the same service reuses
+    import boto3
+    for service in ("sts", "ecs", "ecr", "codebuild", "logs", "cloudwatch"):
+        boto3.client(service, region_name=os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
+
+def import_jwt():
+    import jose.jwt
+
+def start_background_tasks():
+    # Workspaces are on local disk, so their collection runs once per host rather than once overall
+    workspace_service = WorkspaceService(WorkspaceRepository(DatabaseConnection()))
+    background_tasks.append(asyncio.create_task(LeaderLoop(
+        f"workspace-gc:{HOSTNAME}",
+        lambda: workspace_service.run_periodically(settings.WORKSPACE_GC_INTERVAL_SECONDS),
+    ).run()))
+    # Rolls out each image once its build succeeds
+    deploy_service = DeployService(
+        DeployRepository(DatabaseConnection()),
+        AWSUserService(AWSUserRepository(DatabaseConnection()), AWSIdentityPoolService(AWSIdentityPoolRepository(DatabaseConnection()))),
+        None,
+    )
+    build_tracker = CodeBuildStatusTracker(DeployRepository(DatabaseConnection()), on_build_succeeded=deploy_service.rollout_built_image)
+    background_tasks.append(asyncio.create_task(LeaderLoop("build-tracker", build_tracker.run_periodically).run()))
+    if settings.AWS_TENANCY_MODE == TENANCY_STS:
+        # Renews the STS sessions cached by this process, so every worker runs its own
+        credential_provider = AWSCredentialProvider(None)
+        background_tasks.append(asyncio.create_task(
+            credential_provider.run_periodically(settings.AWS_STS_REFRESH_MARGIN_SECONDS / 2)
+        ))
+    elif settings.AWS_IDENTITY_POOL_SIZE > 0:
+        identity_pool_service = AWSIdentityPoolService(AWSIdentityPoolRepository(DatabaseConnection()))
+        background_tasks.append(asyncio.create_task(LeaderLoop(
+            "identity-pool-refill",
+            lambda: identity_pool_service.run_periodically(settings.AWS_IDENTITY_POOL_REFILL_INTERVAL_SECONDS),
+        ).run()))
+
+async def warm_up():
+    """Connect to MongoDB and load the heavy clients concurrently, then start background work."""
+    await startup_state.warm_up(
+        required={"mongodb": DatabaseConnection().ping},
+        optional={
+            "indexes": ensure_indexes,
+            "aws_clients": lambda: asyncio.to_thread(create_aws_clients),
+            "jwt": lambda: asyncio.to_thread(import_jwt),
+        },
+    )
+    start_background_tasks()
 
 @app.on_event("startup")
 async def startup_db_client():
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+    if settings.SHARED_STATE_BACKEND == SHARED_STATE_MEMORY and settings.WEB_CONCURRENCY > 1:
+        logger.warning("SHARED_STATE_BACKEND=memory with several workers: every worker runs its own background loops")
     await DatabaseConnection().connect()
+    # Serve right away; the health check reports ready once warmup is done
+    background_tasks.append(asyncio.create_task(warm_up()))
+    startup_state.mark("serving")
     logger.info("Application starting up...")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    loop_watchdog.stop()
     await DatabaseConnection().close()
     logger.info("Application shutting down...")
 
-# for health check on aws
+# for health check on aws; unhealthy until warmup is done so no traffic reaches a cold task
 @app.get("/")
 def root():
+    if not startup_state.ready:
+        return JSONResponse(status_code=503, content={"message": "Starting", "warmup": startup_state.steps})
     return {"message": "Hello"}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 # Routers that require authentication
 app.include_router(user.router, dependencies=[Depends(oauth2_scheme)])
 app.include_router(aws_user.router, dependencies=[Depends(oauth2_scheme)])
 app.include_router(monitoring.router, dependencies=[Depends(oauth2_scheme)])
+app.include_router(admin.router, dependencies=[Depends(oauth2_scheme)])
 
 # Routers that do not require authentication
 app.include_router(auth.router)
@@ -81,4 +198,5 @@ app.include_router(deploy.router)
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run(app, host=host, port=port)
+    # Workers are separate processes, each importing the app by name
+    uvicorn.run("main:app", host=host, port=port, workers=settings.WEB_CONCURRENCY)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class AWSIdentity(BaseModel):
+    identity_name: str
+    iam_role_arn: str
+    aws_access_key_id: str
+    aws_secret_access_key: str
+    aws_account_id: str
+    aws_user_group: str = Field(default="deployment-users")
+    status: str = Field(default="available")  # available | assigned
+    assigned_github_id: Optional[str] = None
+    assigned_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        from_attributes = True
@@ -3,6 +3,7 @@ from typing import Optional, List, Dict
 from datetime import datetime
 from bson import ObjectId
 class Deploy(BaseModel):
+    id: Optional[str] = None
     user_github_id: Optional[str] = None
     repo_name: Optional[str] = None
     owner: Optional[str] = None
@@ -16,10 +17,32 @@ class Deploy(BaseModel):
     run_command: Optional[str] = None 
     load_balancer_url: Optional[str] = None
     webhook_id: Optional[str] = None
-    status: Optional[str] = None  # e.g., "pending", "in_progress", "completed", "failed"
+    status: Optional[str] = None  # "pending", "in_progress", "success" or "failed"
     app_entry_point: Optional[str] = None  # e.g., "main.py" or "app.py"
+    entry_point: Optional[str] = None  # entry point resolved from the framework defaults at deploy time
     port: Optional[int] = None 
     environment_variables: Optional[Dict[str, str]] = None  # environment variables for the application
+    include_paths: Optional[List[str]] = None  # repository globs outside root_folder_path that also trigger rebuilds
+    exclude_paths: Optional[List[str]] = None  # repository globs that never trigger rebuilds
+    terraform_fingerprint: Optional[str] = None  # hash of the Terraform inputs the infrastructure was applied with
+    terraform_outputs: Optional[Dict[str, Optional[str]]] = None  # e.g., load_balancer_dns, ecr_repo_url
+    terraform_skipped: Optional[bool] = None  # outputs were reused because the fingerprint matched
+    codebuild_build_id: Optional[str] = None
+    build_status: Optional[str] = None  # CodeBuild buildStatus, e.g. "IN_PROGRESS", "SUCCEEDED", "FAILED"
+    build_phase: Optional[str] = None  # CodeBuild currentPhase, e.g. "BUILD", "COMPLETED"
+    build_started_at: Optional[datetime] = None
+    build_ended_at: Optional[datetime] = None
+    build_duration_seconds: Optional[float] = None
+    commit_sha: Optional[str] = None  # commit checked out in the workspace when the image was built
+    image_tag: Optional[str] = None  # "<commit sha>-<settings fingerprint>"
+    build_cache_hit: Optional[bool] = None  # the image already existed in ECR, so CodeBuild was skipped
+    build_skip_reason: Optional[str] = None  # why the last push did not rebuild this deploy
+    build_skipped_commit_sha: Optional[str] = None
+    build_skipped_at: Optional[datetime] = None
+    image_digest: Optional[str] = None  # digest the running task definition is pinned to
+    task_definition_arn: Optional[str] = None
+    task_definition_revision: Optional[int] = None
+    rolled_out_at: Optional[datetime] = None
     created_at: datetime = datetime.now()
     updated_at: Optional[datetime] = None
 
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class WorkspacePin(BaseModel):
+    token: str
+    reason: Optional[str] = None
+    pinned_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Workspace(BaseModel):
+    owner: str
+    repo_name: str
+    path: str
+    size_bytes: int = 0
+    pins: List[WorkspacePin] = Field(default_factory=list)
+    # What keeps the workspace from eviction for as long as it exists, e.g. "deploy" or "webhook"
+    retained_by: List[str] = Field(default_factory=list)
+    evicting: bool = False
+    last_used_at: datetime = Field(default_factory=datetime.utcnow)
+    scanned_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        from_attributes = True
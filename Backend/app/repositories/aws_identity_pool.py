@@ -0,0 +1,43 @@
+from typing import Dict, Optional
+from datetime import datetime
+from pymongo import ReturnDocument
+from dependencies.database_connection import DatabaseConnection
+from models.aws_identity import AWSIdentity
+import logging
+
+logger = logging.getLogger('database')
+
+class AWSIdentityPoolRepository:
+    def __init__(self, db: DatabaseConnection):
+        self.db = db
+        self.collection = "aws_identity_pool"
+
+    async def add_identity(self, identity: AWSIdentity) -> None:
+        collection = await self.db.get_collection(self.collection)
+        await collection.insert_one(identity.dict())
+
+    async def claim_identity(self, github_id: str) -> Optional[AWSIdentity]:
+        """
+        Atomically assign the oldest available identity to a GitHub user.
+        An identity already assigned to the user is returned again, so a claim whose
+        aws_users write failed is not lost.
+        """
+        collection = await self.db.get_collection(self.collection)
+        identity = await collection.find_one({"assigned_github_id": github_id})
+        if identity is None:
+            identity = await collection.find_one_and_update(
+                {"status": "available"},
+                {"$set": {"status": "assigned", "assigned_github_id": github_id, "assigned_at": datetime.utcnow()}},
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+        return AWSIdentity(**identity) if identity else None
+
+    async def count_available(self) -> int:
+        collection = await self.db.get_collection(self.collection)
+        return await collection.count_documents({"status": "available"})
+
+    async def get_stats(self) -> Dict[str, int]:
+        collection = await self.db.get_collection(self.collection)
+        counts = await collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(length=None)
+        return {row["_id"]: row["count"] for row in counts}
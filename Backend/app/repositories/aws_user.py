@@ -1,25 +1,48 @@
 from schemas.aws_user_schema import AWSUserSchema
 from typing import List
+from pymongo import IndexModel
 from dependencies.database_connection import DatabaseConnection
 from models.aws_user import AWSUser
+from repositories.cache import TTLCache, MISSING
+from config.settings import settings
+
+# Process-local cache of AWS credentials by GitHub id; every deploy reads it.
+aws_user_cache = TTLCache(
+    "aws_users",
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
 class AWSUserRepository:
+    INDEXES = [IndexModel("user_github_id", name="user_github_id")]
+
     def __init__(self, db:DatabaseConnection):
         self.db = db
 
+    async def ensure_indexes(self) -> List[str]:
+        collection = await self.db.get_collection("aws_users")
+        return await collection.create_indexes(self.INDEXES)
+
     async def create_user(self, user: AWSUser) -> AWSUserSchema:
         collection = await self.db.get_collection("aws_users")
         
         user_dict = user.dict()
         result = await collection.insert_one(user_dict)
+        aws_user_cache.invalidate(user.user_github_id)
         return AWSUserSchema(id=str(result.inserted_id), **user_dict)
     
 
     async def get_user(self, user_id: str) -> AWSUserSchema:
+        cached = aws_user_cache.get(user_id)
+        if cached is not MISSING:
+            return cached.model_copy() if cached else None
+
         collection = await self.db.get_collection("aws_users")
         user = await collection.find_one({"user_github_id": user_id})
-        if not user:
-            return None
-        return AWSUserSchema(**user)
+        aws_user = AWSUserSchema(**user) if user else None
+        aws_user_cache.set(user_id, aws_user)
+        return aws_user.model_copy() if aws_user else None
     
 
     async def get_all_users(self) -> List[AWSUserSchema]:
@@ -31,11 +54,16 @@ class AWSUserRepository:
         collection = await self.db.get_collection("aws_users")
         user_data = user.dict()
         result = await collection.update_one({"_id": user.user_github_id}, {"$set": user_data})
+        aws_user_cache.invalidate(user.user_github_id)
         if result.modified_count == 0:
             return None
         return AWSUserSchema(**user_data)
     
     async def delete_user(self, user_id: str) -> bool:
         collection = await self.db.get_collection("aws_users")
-        result = await collection.delete_one({"_id": user_id})
-        return result.deleted_count > 0
\ No newline at end of file
+        deleted = await collection.find_one_and_delete({"_id": user_id})
+        if deleted is None:
+            return False
+        # The cache is keyed by GitHub id, not by the document id
+        aws_user_cache.invalidate(deleted.get("user_github_id"))
+        return True
\ No newline at end of file
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+# Returned by TTLCache.get when the key is unknown or expired; `None` is a cached miss.
+MISSING = object()
+
+# Every cache registers itself here so hit/miss counters can be reported in one place.
+caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL, with negative caching of misses."""
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        caches[name] = self
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, `None` for a cached miss, or MISSING."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value; `None` records a miss for the shorter negative TTL."""
+        ttl = self.negative_ttl_seconds if value is None else self.ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+            }
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -1,19 +1,36 @@
 from schemas.deploy_schema import DeploySchema, DeployUpdate, DeployCreateSchema
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from models.deploy import Deploy
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
 from dependencies.database_connection import DatabaseConnection
 import logging
 
 logger = logging.getLogger('database')
 
 class DeployRepository:
+    # (owner, repo_name, ...) serves get_deploys and get_active_deploys by prefix;
+    # (owner, status) serves get_deploys_for_owner and the statistics counts.
+    INDEXES = [
+        IndexModel([("owner", ASCENDING), ("repo_name", ASCENDING), ("branch", ASCENDING), ("created_at", DESCENDING)], name="owner_repo_branch_created"),
+        IndexModel([("owner", ASCENDING), ("status", ASCENDING)], name="owner_status"),
+        IndexModel([("build_status", ASCENDING)], name="build_status"),
+    ]
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
         self.collection = "deploys"
         logger.info("DeployRepository initialized")
 
+    async def ensure_indexes(self) -> List[str]:
+        collection = await self.db.get_collection(self.collection)
+        return await collection.create_indexes(self.INDEXES)
+
+    @staticmethod
+    def _to_deploy(document: Dict) -> Deploy:
+        return Deploy(**{**document, "id": str(document["_id"])})
+
     async def create_deploy(self, deploy: Dict) -> Deploy:
         """
         Create a new deploy record in the database.
@@ -23,12 +40,12 @@ class DeployRepository:
         deploy_data = deploy.copy()
         deploy_data["created_at"] = datetime.now()
         deploy_data["updated_at"] = datetime.now()
-        deploy_data["status"] = "success"
+        deploy_data.setdefault("status", "pending")
         try:
             result = await collection.insert_one(deploy_data)
             if result.inserted_id:
                 logger.info(f"Successfully created deployment record with ID: {result.inserted_id}")
-                return Deploy(**deploy_data)
+                return self._to_deploy(deploy_data)
             else:
                 logger.error("Failed to create deploy record - no inserted ID returned")
                 raise Exception("Failed to create deploy record")
@@ -45,11 +62,71 @@ class DeployRepository:
         
         try:
             deploys = await collection.find({"owner": owner, "repo_name": repo_name}).to_list(length=None)
-            return [Deploy(**deploy) for deploy in deploys]
+            return [self._to_deploy(deploy) for deploy in deploys]
         except Exception as e:
             logger.error(f"Error fetching deployment record: {str(e)}")
             raise
     
+    async def get_active_deploys(self, owner: str, repo_name: str, branch: str) -> List[Deploy]:
+        """
+        Get the newest deploy of each service (root folder and user) deployed from a branch.
+        Every create_deploy call adds a record, so older records of the same service are superseded.
+        """
+        collection = await self.db.get_collection(self.collection)
+        cursor = collection.find({"owner": owner, "repo_name": repo_name, "branch": branch}).sort("created_at", -1)
+        active = {}
+        async for deploy in cursor:
+            key = ((deploy.get("root_folder_path") or "").strip("/"), deploy.get("user_github_id"))
+            active.setdefault(key, deploy)
+        return [self._to_deploy(deploy) for deploy in active.values()]
+
+    async def get_deploy(self, deploy_id: str) -> Optional[Deploy]:
+        """
+        Get a deploy record by its ID.
+        """
+        if not ObjectId.is_valid(deploy_id):
+            return None
+        collection = await self.db.get_collection(self.collection)
+        deploy = await collection.find_one({"_id": ObjectId(deploy_id)})
+        return self._to_deploy(deploy) if deploy else None
+
+    async def update_deploy(self, deploy_id: str, fields: Dict) -> Optional[Deploy]:
+        """
+        Set fields on a deploy record and return the updated record.
+        """
+        collection = await self.db.get_collection(self.collection)
+        deploy = await collection.find_one_and_update(
+            {"_id": ObjectId(deploy_id)},
+            {"$set": {**fields, "updated_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._to_deploy(deploy) if deploy else None
+
+    async def get_in_flight_builds(self) -> List[Dict]:
+        """
+        Get the build id and last known phase of every deploy whose CodeBuild build has not finished.
+        """
+        collection = await self.db.get_collection(self.collection)
+        cursor = collection.find(
+            {"build_status": "IN_PROGRESS", "codebuild_build_id": {"$ne": None}},
+            {"codebuild_build_id": 1, "build_phase": 1, "build_status": 1},
+        )
+        return await cursor.to_list(length=None)
+
+    async def apply_build_updates(self, updates: List[Tuple[ObjectId, Dict]]) -> int:
+        """
+        Write build transitions for many deploys in one unordered bulk request.
+        """
+        if not updates:
+            return 0
+        collection = await self.db.get_collection(self.collection)
+        now = datetime.now()
+        result = await collection.bulk_write(
+            [UpdateOne({"_id": deploy_id}, {"$set": {**fields, "updated_at": now}}) for deploy_id, fields in updates],
+            ordered=False,
+        )
+        return result.modified_count
+
     # get a list of all the deploys for owner
     async def get_deploys_for_owner(self, owner: str) -> List[Deploy]:
         """
@@ -59,9 +136,8 @@ class DeployRepository:
         collection = await self.db.get_collection(self.collection)
         try:
             deploys = await collection.find({"owner": owner}).to_list(length=None)
-            print(f"deploys: {deploys}")
             logger.info(f"Found {len(deploys)} deployment records for {owner}")
-            return [Deploy(**deploy) for deploy in deploys]
+            return [self._to_deploy(deploy) for deploy in deploys]
         except Exception as e:
             logger.error(f"Error fetching deployment records: {str(e)}")
             raise
@@ -81,12 +157,16 @@ class DeployRepository:
             successful_deployments = await collection.count_documents({"owner": owner, "status": "success"})
             failed_deployments = await collection.count_documents({"owner": owner, "status": "failed"}) 
             pending_deployments = await collection.count_documents({"owner": owner, "status": "pending"})
+            in_progress_deployments = await collection.count_documents({"owner": owner, "status": "in_progress"})
+            cache_hits = await collection.count_documents({"owner": owner, "build_cache_hit": True})
 
             return {
                 "total": total_deployments,
                 "successful": successful_deployments,
                 "failed": failed_deployments,
                 "pending": pending_deployments,
+                "in_progress": in_progress_deployments,
+                "build_cache_hits": cache_hits,
             }
 
         except Exception as e:
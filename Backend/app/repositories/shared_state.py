@@ -0,0 +1,187 @@
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from dependencies.database_connection import DatabaseConnection
+from interfaces.shared_state_interface import SharedStateInterface
+
+logger = logging.getLogger('database')
+
+
+def _expiry(now: datetime, ttl_seconds: Optional[float]) -> Optional[datetime]:
+    return now + timedelta(seconds=ttl_seconds) if ttl_seconds is not None else None
+
+
+def _lease_view(lease: Dict, now: datetime) -> Dict:
+    return {
+        "name": lease["_id"],
+        "holder": lease.get("holder"),
+        "token": lease.get("token", 0),
+        "expires_at": lease.get("expires_at"),
+        "held": lease.get("holder") is not None and lease.get("expires_at") is not None and lease["expires_at"] > now,
+    }
+
+
+class InMemorySharedState(SharedStateInterface):
+    """Shared state for a single process: development, tests and one-worker deployments."""
+
+    def __init__(self):
+        self._values: Dict[str, Dict] = {}
+        self._leases: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or (entry["expires_at"] is not None and entry["expires_at"] <= datetime.utcnow()):
+                return None
+            return entry["value"]
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._values[key] = {"value": value, "expires_at": _expiry(datetime.utcnow(), ttl_seconds)}
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._values.setdefault(key, {"value": 0, "expires_at": None})
+            entry["value"] += amount
+            return entry["value"]
+
+    async def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> Optional[int]:
+        now = datetime.utcnow()
+        with self._lock:
+            lease = self._leases.setdefault(name, {"_id": name, "holder": None, "token": 0, "expires_at": None})
+            held = _lease_view(lease, now)["held"]
+            if held and lease["holder"] != holder:
+                return None
+            if not held:
+                lease["token"] += 1
+                lease["holder"] = holder
+                lease["acquired_at"] = now
+            lease["expires_at"] = _expiry(now, ttl_seconds)
+            return lease["token"]
+
+    async def renew_lease(self, name: str, holder: str, token: int, ttl_seconds: float) -> bool:
+        now = datetime.utcnow()
+        with self._lock:
+            lease = self._leases.get(name)
+            if lease is None or lease["holder"] != holder or lease["token"] != token or lease["expires_at"] <= now:
+                return False
+            lease["expires_at"] = _expiry(now, ttl_seconds)
+            return True
+
+    async def release_lease(self, name: str, holder: str, token: int) -> None:
+        with self._lock:
+            lease = self._leases.get(name)
+            if lease is not None and lease["holder"] == holder and lease["token"] == token:
+                lease["holder"] = None
+                lease["expires_at"] = None
+
+    async def list_leases(self, prefix: str = "") -> List[Dict]:
+        now = datetime.utcnow()
+        with self._lock:
+            return [_lease_view(lease, now) for name, lease in sorted(self._leases.items()) if name.startswith(prefix)]
+
+
+class SharedStateRepository(SharedStateInterface):
+    """
+    Shared state in MongoDB, for several uvicorn workers or ECS tasks.
+
+    Values live in `shared_state`, where a TTL index removes expired ones. Leases live in
+    `leases` and are never deleted, so a lease's fencing token keeps growing across holders.
+    Expiry is judged by the clock of the worker making the call, so lease TTLs should be
+    well above the clock skew between tasks.
+    """
+
+    INDEXES = [IndexModel("expires_at", name="expires_at_ttl", expireAfterSeconds=0)]
+
+    def __init__(self, db: DatabaseConnection):
+        self.db = db
+
+    async def ensure_indexes(self) -> list[str]:
+        collection = await self.db.get_collection("shared_state")
+        return await collection.create_indexes(self.INDEXES)
+
+    async def get(self, key: str) -> Any:
+        collection = await self.db.get_collection("shared_state")
+        entry = await collection.find_one({"_id": key})
+        # The TTL monitor only runs once a minute
+        if entry is None or (entry.get("expires_at") is not None and entry["expires_at"] <= datetime.utcnow()):
+            return None
+        return entry["value"]
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        collection = await self.db.get_collection("shared_state")
+        await collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": _expiry(datetime.utcnow(), ttl_seconds)}},
+            upsert=True,
+        )
+
+    async def delete(self, key: str) -> None:
+        collection = await self.db.get_collection("shared_state")
+        await collection.delete_one({"_id": key})
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        collection = await self.db.get_collection("shared_state")
+        entry = await collection.find_one_and_update(
+            {"_id": key},
+            {"$inc": {"value": amount}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return entry["value"]
+
+    async def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> Optional[int]:
+        collection = await self.db.get_collection("leases")
+        now = datetime.utcnow()
+        expires_at = _expiry(now, ttl_seconds)
+        lease = await collection.find_one_and_update(
+            {"_id": name, "holder": holder, "expires_at": {"$gt": now}},
+            {"$set": {"expires_at": expires_at}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if lease is not None:
+            return lease["token"]
+        try:
+            # Matches a free or expired lease; while one is held the upsert collides on _id
+            lease = await collection.find_one_and_update(
+                {"_id": name, "$or": [{"holder": None}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"holder": holder, "expires_at": expires_at, "acquired_at": now}, "$inc": {"token": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return None
+        return lease["token"]
+
+    async def renew_lease(self, name: str, holder: str, token: int, ttl_seconds: float) -> bool:
+        collection = await self.db.get_collection("leases")
+        now = datetime.utcnow()
+        result = await collection.update_one(
+            {"_id": name, "holder": holder, "token": token, "expires_at": {"$gt": now}},
+            {"$set": {"expires_at": _expiry(now, ttl_seconds)}},
+        )
+        return result.matched_count == 1
+
+    async def release_lease(self, name: str, holder: str, token: int) -> None:
+        collection = await self.db.get_collection("leases")
+        await collection.update_one(
+            {"_id": name, "holder": holder, "token": token},
+            {"$set": {"holder": None, "expires_at": None}},
+        )
+
+    async def list_leases(self, prefix: str = "") -> List[Dict]:
+        collection = await self.db.get_collection("leases")
+        now = datetime.utcnow()
+        leases = await collection.find({"_id": {"$regex": f"^{re.escape(prefix)}"}}).sort("_id", 1).to_list(length=None)
+        return [_lease_view(lease, now) for lease in leases]
@@ -2,13 +2,30 @@ from interfaces.user_interface import UserInterface
 from typing import Optional
 from schemas.user_schema import UserSchema
 from bson import ObjectId
+from pymongo import IndexModel
 from dependencies.database_connection import DatabaseConnection
+from repositories.cache import TTLCache, MISSING
+from config.settings import settings
 
 from hashlib import sha256
 
+# Process-local cache of users by GitHub id; authentication reads it on every request.
+user_cache = TTLCache(
+    "users",
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
 class User(UserInterface):
+    INDEXES = [IndexModel("github_id", name="github_id")]
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
+
+    async def ensure_indexes(self) -> list[str]:
+        collection = await self.db.get_collection("users")
+        return await collection.create_indexes(self.INDEXES)
     
 
     def hash_access_key(self, access_token: str) -> str:
@@ -45,6 +62,7 @@ class User(UserInterface):
             user_dict["_id"] = ObjectId()
             user_dict["hashed_access_key"] = self.hash_access_key(user_dict["access_token"])
             await collection.insert_one(user_dict)
+            user_cache.invalidate(user.github_id)
             return user
         return UserSchema(**user)
            
@@ -69,11 +87,20 @@ class User(UserInterface):
     
 
     async def get_user_by_github_id(self, github_id: int) -> UserSchema:
+        # Stored as a string; an int id would miss in Mongo and cache that miss for the valid string key
+        github_id = str(github_id)
+        cached = user_cache.get(github_id)
+        if cached is not MISSING:
+            # Callers such as get_current_user mutate the result, so hand out a copy
+            return cached.model_copy() if cached else None
+
         collection = await self.db.get_collection("users")
         user_data = await collection.find_one({"github_id": github_id})
         
+        user = None
         if user_data:
             user_data["email"] = user_data.get("email", "") or ""
             user_data["login"] = user_data.get("login", "") or ""
-            return UserSchema(**user_data)
-        return None
+            user = UserSchema(**user_data)
+        user_cache.set(github_id, user)
+        return user.model_copy() if user else None
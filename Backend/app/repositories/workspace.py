@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+from pymongo import ReturnDocument
+from dependencies.database_connection import DatabaseConnection
+from models.workspace import Workspace, WorkspacePin
+import logging
+
+logger = logging.getLogger('database')
+
+class WorkspaceRepository:
+    def __init__(self, db: DatabaseConnection):
+        self.db = db
+        self.collection = "workspaces"
+
+    async def touch(self, owner: str, repo_name: str, path: str) -> None:
+        """
+        Record that a workspace was used, creating its record on first use.
+        """
+        collection = await self.db.get_collection(self.collection)
+        now = datetime.utcnow()
+        await collection.update_one(
+            {"owner": owner, "repo_name": repo_name},
+            {
+                "$set": {"path": path, "last_used_at": now},
+                "$setOnInsert": {"size_bytes": 0, "pins": [], "evicting": False, "scanned_at": None, "created_at": now},
+            },
+            upsert=True,
+        )
+
+    async def retain(self, owner: str, repo_name: str, path: str, reason: str) -> None:
+        """
+        Keep a workspace from eviction until the reason is released, unlike a pin, which lasts one operation.
+        """
+        collection = await self.db.get_collection(self.collection)
+        now = datetime.utcnow()
+        await collection.update_one(
+            {"owner": owner, "repo_name": repo_name},
+            {
+                "$addToSet": {"retained_by": reason},
+                "$set": {"path": path, "last_used_at": now},
+                "$setOnInsert": {"size_bytes": 0, "pins": [], "evicting": False, "scanned_at": None, "created_at": now},
+            },
+            upsert=True,
+        )
+
+    async def release(self, owner: str, repo_name: str, reason: str) -> None:
+        collection = await self.db.get_collection(self.collection)
+        await collection.update_one({"owner": owner, "repo_name": repo_name}, {"$pull": {"retained_by": reason}})
+
+    async def get_workspace(self, owner: str, repo_name: str) -> Optional[Workspace]:
+        collection = await self.db.get_collection(self.collection)
+        workspace = await collection.find_one({"owner": owner, "repo_name": repo_name})
+        return Workspace(**workspace) if workspace else None
+
+    async def get_workspace_keys(self) -> set:
+        collection = await self.db.get_collection(self.collection)
+        cursor = collection.find({}, {"owner": 1, "repo_name": 1, "_id": 0})
+        return {(workspace["owner"], workspace["repo_name"]) async for workspace in cursor}
+
+    async def add_pin(self, owner: str, repo_name: str, path: str, pin: WorkspacePin) -> bool:
+        """
+        Pin a workspace so it cannot be evicted. Fails while an eviction is in progress.
+        """
+        collection = await self.db.get_collection(self.collection)
+        now = datetime.utcnow()
+        result = await collection.find_one_and_update(
+            {"owner": owner, "repo_name": repo_name, "evicting": {"$ne": True}},
+            {"$push": {"pins": pin.model_dump()}, "$set": {"path": path, "last_used_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if result:
+            return True
+        if await collection.find_one({"owner": owner, "repo_name": repo_name}):
+            return False
+        await self.touch(owner, repo_name, path)
+        return await self.add_pin(owner, repo_name, path, pin)
+
+    async def remove_pin(self, owner: str, repo_name: str, token: str) -> None:
+        collection = await self.db.get_collection(self.collection)
+        await collection.update_one(
+            {"owner": owner, "repo_name": repo_name},
+            {"$pull": {"pins": {"token": token}}, "$set": {"last_used_at": datetime.utcnow()}},
+        )
+
+    async def get_unscanned(self, limit: int) -> List[Workspace]:
+        """
+        Get workspaces used since their last size scan, oldest scan first.
+        """
+        collection = await self.db.get_collection(self.collection)
+        cursor = collection.find(
+            {"$or": [{"scanned_at": None}, {"$expr": {"$gt": ["$last_used_at", "$scanned_at"]}}]}
+        ).sort("scanned_at", 1).limit(limit)
+        return [Workspace(**workspace) async for workspace in cursor]
+
+    async def update_size(self, owner: str, repo_name: str, size_bytes: int, scanned_at: datetime) -> None:
+        collection = await self.db.get_collection(self.collection)
+        await collection.update_one(
+            {"owner": owner, "repo_name": repo_name},
+            {"$set": {"size_bytes": size_bytes, "scanned_at": scanned_at}},
+        )
+
+    async def get_total_size(self) -> int:
+        collection = await self.db.get_collection(self.collection)
+        result = await collection.aggregate([{"$group": {"_id": None, "total": {"$sum": "$size_bytes"}}}]).to_list(length=1)
+        return result[0]["total"] if result else 0
+
+    async def claim_for_eviction(self, stale_pin_cutoff: datetime, idle_cutoff: datetime) -> Optional[Workspace]:
+        """
+        Atomically mark the least recently used unpinned, unretained workspace as evicting.
+        Pins older than `stale_pin_cutoff` are treated as leaked and ignored, and workspaces
+        used after `idle_cutoff` are skipped because a CodeBuild job may still be reading them.
+        """
+        collection = await self.db.get_collection(self.collection)
+        workspace = await collection.find_one_and_update(
+            {
+                "evicting": {"$ne": True},
+                "retained_by.0": {"$exists": False},
+                "last_used_at": {"$lt": idle_cutoff},
+                "pins": {"$not": {"$elemMatch": {"pinned_at": {"$gt": stale_pin_cutoff}}}},
+            },
+            {"$set": {"evicting": True}},
+            sort=[("last_used_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return Workspace(**workspace) if workspace else None
+
+    async def delete_workspace(self, owner: str, repo_name: str) -> bool:
+        collection = await self.db.get_collection(self.collection)
+        result = await collection.delete_one({"owner": owner, "repo_name": repo_name})
+        return result.deleted_count > 0
+
+    async def release_eviction(self, owner: str, repo_name: str) -> None:
+        collection = await self.db.get_collection(self.collection)
+        await collection.update_one({"owner": owner, "repo_name": repo_name}, {"$set": {"evicting": False}})
+
+    async def get_usage_by_owner(self) -> List[Dict]:
+        """
+        Aggregate workspace count, size and pinned workspaces per owner.
+        """
+        collection = await self.db.get_collection(self.collection)
+        pipeline = [
+            {"$group": {
+                "_id": "$owner",
+                "workspaces": {"$sum": 1},
+                "size_bytes": {"$sum": "$size_bytes"},
+                "pinned": {"$sum": {"$cond": [{"$gt": [{"$size": {"$ifNull": ["$pins", []]}}, 0]}, 1, 0]}},
+                "retained": {"$sum": {"$cond": [{"$gt": [{"$size": {"$ifNull": ["$retained_by", []]}}, 0]}, 1, 0]}},
+                "last_used_at": {"$max": "$last_used_at"},
+            }},
+            {"$sort": {"size_bytes": -1}},
+        ]
+        usage = await collection.aggregate(pipeline).to_list(length=None)
+        return [{"owner": row.pop("_id"), **row} for row in usage]
@@ -0,0 +1,174 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from typing import Dict, Optional
+from services.workspace import WorkspaceService
+from services.aws_identity_pool import AWSIdentityPoolService
+from dependencies.services import get_workspace_service, get_aws_identity_pool_service
+from dependencies.security import get_admin_user
+from repositories.cache import get_cache_stats
+from services.terraform_runner import terraform_lock_manager
+from services.build_tracker import BUILD_TRACKER_STATS_KEY, get_build_tracker_stats
+from services.leader import WORKER_ID, get_leader_stats
+from services.repository_lock import LEASE_PREFIX, repository_locks
+from dependencies.shared_state import get_shared_state
+from services.loop_watchdog import loop_watchdog
+from services.profiler import FORMATS, Profile, profile_sessions
+from services.startup import startup_state
+from config.settings import settings
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_admin_user)])
+
+@router.get("/workspaces", response_model=Dict)
+async def get_workspace_usage(
+    workspace_service: WorkspaceService = Depends(get_workspace_service)
+) -> Dict:
+    """
+    Get cloned workspace disk usage per owner against the configured quota.
+    """
+    try:
+        return await workspace_service.get_usage()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/workspaces/collect", response_model=Dict)
+async def collect_workspaces(
+    workspace_service: WorkspaceService = Depends(get_workspace_service)
+) -> Dict:
+    """
+    Run a discovery, incremental scan and eviction pass immediately.
+    """
+    try:
+        return await workspace_service.collect()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/caches", response_model=Dict)
+async def get_caches() -> Dict:
+    """
+    Get size and hit/miss counters of the process-local caches.
+    """
+    return get_cache_stats()
+
+@router.get("/identity-pool", response_model=Dict)
+async def get_identity_pool(
+    identity_pool_service: AWSIdentityPoolService = Depends(get_aws_identity_pool_service)
+) -> Dict:
+    """
+    Get the number of available and assigned pre-provisioned AWS identities.
+    """
+    try:
+        return await identity_pool_service.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/terraform", response_model=Dict)
+async def get_terraform_queue() -> Dict:
+    """
+    Get queue depth, running count and wait times of Terraform runs in this process.
+    """
+    return terraform_lock_manager.stats()
+
+@router.get("/build-tracker", response_model=Dict)
+async def get_build_tracker() -> Dict:
+    """
+    Get in-flight build count, poll interval and API call counters of the CodeBuild status tracker,
+    as last published by whichever worker runs it.
+    """
+    stats = get_build_tracker_stats() or await get_shared_state().get(BUILD_TRACKER_STATS_KEY)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Build tracker is not running in any worker")
+    return stats
+
+@router.get("/leases", response_model=Dict)
+async def get_leases() -> Dict:
+    """
+    Get every lease with its holder and fencing token, and the leader loops of the worker answering.
+    """
+    return {
+        "worker": WORKER_ID,
+        "leader_loops": get_leader_stats(),
+        "leases": await get_shared_state().list_leases(),
+    }
+
+@router.get("/repository-locks", response_model=Dict)
+async def get_repository_locks() -> Dict:
+    """
+    Get the repository locks held and waited on in the worker answering, and every repository lease
+    across workers with its holder and fencing token.
+    """
+    return {
+        "worker": WORKER_ID,
+        **repository_locks.stats(),
+        "leases": [lease for lease in await get_shared_state().list_leases(LEASE_PREFIX) if lease["held"]],
+    }
+
+@router.get("/event-loop", response_model=Dict)
+async def get_event_loop_stalls(
+    limit: Optional[int] = Query(None, ge=1, description="Most recent stalls to return")
+) -> Dict:
+    """
+    Get the most recent event loop stalls with the stack, route and handler that blocked the loop.
+    """
+    if not loop_watchdog.running:
+        raise HTTPException(status_code=404, detail="Event loop watchdog is not running in this process")
+    return loop_watchdog.stats(limit)
+
+@router.get("/startup", response_model=Dict)
+async def get_startup_profile(
+    limit: int = Query(30, ge=1, description="Slowest imports to return")
+) -> Dict:
+    """
+    Get this process's startup phases, warmup steps and slowest imports, timed from process start.
+    """
+    return startup_state.stats(limit)
+
+def _render_profile(profile: Profile, format: str) -> Response:
+    if format == "speedscope":
+        return JSONResponse(
+            profile.speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{profile.id}.speedscope.json"'},
+        )
+    return PlainTextResponse(profile.collapsed())
+
+@router.post("/profile")
+async def run_profiler(
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS, description="How long to sample"),
+    format: str = Query("collapsed", pattern=f"^({'|'.join(FORMATS)})$"),
+    interval_ms: float = Query(settings.PROFILER_INTERVAL_SECONDS * 1000, ge=1, le=1000),
+    include_idle: bool = Query(False, description="Keep samples of threads parked in a selector, queue or condition wait"),
+) -> Response:
+    """
+    Sample the stacks of every thread in this process for the given number of seconds and
+    return them as collapsed stacks or a speedscope file.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled in this process")
+    profiler = profile_sessions.try_start(interval_ms / 1000, seconds, include_idle)
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = await asyncio.to_thread(profile_sessions.finish, profiler)
+    return _render_profile(profile, format)
+
+@router.get("/profiles", response_model=Dict)
+async def list_request_profiles() -> Dict:
+    """
+    List the most recent profiles recorded for requests sent with the X-Profile header.
+    """
+    return {"profiles": profile_sessions.list(), "rejected_total": profile_sessions.rejected_total}
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern=f"^({'|'.join(FORMATS)})$"),
+) -> Response:
+    """
+    Get a recorded request profile as collapsed stacks or a speedscope file.
+    """
+    profile = profile_sessions.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _render_profile(profile, format)
@@ -9,9 +9,12 @@ from services.jwt import create_access_token
 from dependencies.services import get_user_service
 from config.settings import settings
 from dependencies.security import get_current_user
+import logging
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+logger = logging.getLogger('api')
+
 
 @router.get("/logout")
 async def logout():
@@ -66,7 +69,7 @@ async def github_callback(
         raise HTTPException(status_code=400, detail="GitHub authentication failed")
     
     # Debug logging to help diagnose issues
-    print(f"GitHub user data received: {user_data.keys()}")
+    logger.debug(f"GitHub user data received: {list(user_data.keys())}")
     
     user_data["id"] = str(user_data.get("id"))
     user = await user_service.get_or_create_user(user_data)
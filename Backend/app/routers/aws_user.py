@@ -4,13 +4,11 @@ from schemas.aws_user_schema import AWSUserSchema
 from dependencies.services import get_aws_user_service
 from models.aws_user import AWSUser
 from schemas.user_schema import UserSchema
-from dependencies.security import get_current_user
+from dependencies.security import get_current_user, get_auth_context
 from typing import Optional, List
-from fastapi.security import OAuth2PasswordBearer
 
-outh_2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-router = APIRouter(prefix="/aws_user", tags=["aws_user"], dependencies=[Depends(get_current_user)])
+router = APIRouter(prefix="/aws_user", tags=["aws_user"], dependencies=[Depends(get_auth_context)])
 
 @router.get("/", response_model=List[AWSUserSchema])
 async def get_aws_users(
@@ -1,37 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
 from services.deploy import DeployService
-from dependencies.security import get_current_user, get_access_key_from_token_payload
+from dependencies.security import AuthContext, get_auth_context, get_access_key
 from schemas.deploy_schema import DeployCreateSchema, DeploySchema, DeployUpdate
 from models.deploy import Deploy
 from typing import Optional, List, Dict
 from schemas.user_schema import UserSchema
 from dependencies.services import get_deploy_service
-from dependencies.security import get_current_user, get_access_key_from_token_payload
-from fastapi.security import OAuth2PasswordBearer
 from services.aws_user import AWSUserService
+from services.build_logs import get_build_log_tailer
+from services.repository_lock import RepositoryLockTimeout
 
-oauth_2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-router = APIRouter(prefix="/deploy", tags=["deploy"], dependencies=[Depends(get_current_user)])
+router = APIRouter(prefix="/deploy", tags=["deploy"], dependencies=[Depends(get_auth_context)])
 @router.post("/", response_model=Deploy)
 async def create_deploy(
     deploy: DeployCreateSchema,
-    user: UserSchema = Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     deploy_service: DeployService = Depends(get_deploy_service),
-    token: str = Depends(oauth_2_scheme)
+    access_key: str = Depends(get_access_key)
 ) -> Deploy:
     """
     Create a new deploy record in the database.
     """
     try:
-        # Get the access key from the token payload
-              
-        access_token = await get_access_key_from_token_payload(token)
-        return await deploy_service.create_deploy(deploy, access_token=access_token, user=user)
+        return await deploy_service.create_deploy(deploy, access_token=access_key, user=auth.user)
     except HTTPException as http_ex:
         raise http_ex
+    except RepositoryLockTimeout as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/{deploy_id}/rollout", response_model=Deploy)
+async def rollout_deploy(
+    deploy_id: str,
+    image_tag: Optional[str] = Query(None, description="Image tag to roll out; defaults to the deploy's current tag"),
+    auth: AuthContext = Depends(get_auth_context),
+    deploy_service: DeployService = Depends(get_deploy_service)
+) -> Deploy:
+    """
+    Roll a built image out to the deploy's ECS service by registering a new task definition revision.
+    """
+    try:
+        return await deploy_service.rollout_image(deploy_id, auth.user, image_tag=image_tag)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{deploy_id}/build-logs/stream")
+async def stream_build_logs(
+    deploy_id: str,
+    request: Request,
+    auth: AuthContext = Depends(get_auth_context),
+    deploy_service: DeployService = Depends(get_deploy_service)
+) -> StreamingResponse:
+    """
+    Stream the deploy's CodeBuild log lines as server-sent events until the build finishes.
+    Reconnecting clients resume after the Last-Event-ID they received.
+    """
+    try:
+        deploy = await deploy_service.get_deploy(deploy_id, auth.user)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if not deploy.codebuild_build_id:
+        raise HTTPException(status_code=404, detail="Deploy has no build")
+
+    tailer = get_build_log_tailer(deploy.codebuild_build_id)
+    last_event_id = request.headers.get("last-event-id", "")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    async def events():
+        async for sequence, event in tailer.follow(after):
+            yield f"id: {sequence}\ndata: {json.dumps(event)}\n\n"
+        yield f"event: end\ndata: {json.dumps({'build_status': tailer.build_status})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.get("/frameworks", response_model=Dict)
 def get_frameworks(
     deploy_service: DeployService = Depends(get_deploy_service)
@@ -45,6 +97,33 @@ def get_frameworks(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/detect/{owner}/{repo_name}", response_model=Dict)
+async def detect_framework(
+    owner: str,
+    repo_name: str,
+    branch: Optional[str] = Query(None, description="Branch to inspect when no SHA is given"),
+    sha: str = Query("", description="Commit SHA to inspect"),
+    root_folder_path: str = Query("", description="Application folder inside the repository"),
+    deploy_service: DeployService = Depends(get_deploy_service),
+    access_key: str = Depends(get_access_key)
+) -> Dict:
+    """
+    Detect the framework, entry point and port of a repository without cloning it.
+    """
+    try:
+        result = await deploy_service.detect_framework(
+            owner, repo_name, access_token=access_key, branch=branch, sha=sha, root_folder_path=root_folder_path
+        )
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return result
+    except HTTPException as http_ex:
+        raise http_ex
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/repository/{owner}/{repo_name}")
 async def get_deploys(
     owner: str,
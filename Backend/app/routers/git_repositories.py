@@ -1,19 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from services.git_repository import GitRepositoryService
 from services.deploy import DeployService
-from services.aws_codebuild import AWSCodeBuild
-from dependencies.security import get_current_user, get_access_key_from_token_payload
+from dependencies.security import get_current_user, get_access_key
 from schemas.repository import RepositorySchema
 from models.deploy import Deploy
 from schemas.deploy_schema import DeploySchema
 from typing import Optional, List
 from schemas.user_schema import UserSchema
-from dependencies.services import get_git_repository_service, get_deploy_service, get_aws_codebuild
-from fastapi.security import OAuth2PasswordBearer
+from dependencies.services import get_git_repository_service, get_deploy_service, get_push_queue
+from services.push_queue import PushQueue
 import logging
-import os
 
-outh_2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 router = APIRouter(prefix="/git", tags=["git"])
 
 logger = logging.getLogger(__name__)
@@ -23,14 +20,12 @@ async def create_webhook(
     owner: str,
     repo_name: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Creates a webhook for a specific repository.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         result = await git_repository_service.create_github_webhook(owner=owner, repo_name=repo_name, access_token=access_key)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -41,12 +36,10 @@ async def create_webhook(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.post("/repository/webhook/")  
+@router.post("/repository/webhook/", status_code=202)
 async def github_webhook(
     request: Request,
-    git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    deploy_service: DeployService = Depends(get_deploy_service),
-    aws_codebuild: AWSCodeBuild = Depends(get_aws_codebuild)
+    push_queue: PushQueue = Depends(get_push_queue)
 ):
     """Handle GitHub webhook events for repository updates"""
     try:
@@ -56,70 +49,20 @@ async def github_webhook(
         if payload.get("ref") and payload.get("repository"):
             owner = payload["repository"]["owner"]["login"]
             repo_name = payload["repository"]["name"]
-            
-            # Pull the latest changes
-            result = await git_repository_service.pull_repository(
-                owner=owner,
-                repo_name=repo_name,
-                access_token=None  # No token needed for webhook operations
-            )
-            
-            if "error" in result:
-                logger.error(f"Failed to pull repository: {result['error']}")
-                return {"status": "error", "message": result["error"]}
-            
-            # Get deploy data
-            deploys = await deploy_service.get_deploys(owner, repo_name)
-            if deploys:
-                # Get the latest deploy
-                latest_deploy = deploys[0]  # Assuming deploys are ordered by creation date desc
-                
-                # Start CodeBuild process
-                codebuild_project_name = f"{latest_deploy.user_github_id}-{latest_deploy.repo_name}-codebuild"
-                source_branch_for_codebuild = getattr(latest_deploy, 'branch', 'main')
-
-                # Read buildspec content
-                if not latest_deploy.absolute_path:
-                    raise HTTPException(status_code=400, detail="Repository path is required")
-                buildspec_file_path = os.path.join(latest_deploy.absolute_path, "buildspec.yml")
-                buildspec_content = ""
-                if os.path.exists(buildspec_file_path):
-                    with open(buildspec_file_path, "r") as f:
-                        buildspec_content = f.read()
-                else:
-                    logger.warning(f"buildspec.yml not found at {buildspec_file_path}. CodeBuild might use project default.")
-
-                # Validate required deploy parameters
-                if not latest_deploy.ecr_repo_url:
-                    raise HTTPException(status_code=400, detail="ECR repository URL is required")
-                if not latest_deploy.port:
-                    raise HTTPException(status_code=400, detail="Port is required")
-                if not latest_deploy.app_entry_point:
-                    raise HTTPException(status_code=400, detail="App entry point is required")
-
-                logger.info(f"Starting CodeBuild project: {codebuild_project_name} for ECR repo: {latest_deploy.ecr_repo_url} on branch {source_branch_for_codebuild}")
-                build_response = aws_codebuild.start_build(
-                    project_name=codebuild_project_name,
-                    ecr_repo_url=latest_deploy.ecr_repo_url,
-                    source_version=source_branch_for_codebuild,
-                    buildspec_content=buildspec_content,
-                    port=latest_deploy.port,
-                    entry_point=latest_deploy.app_entry_point,
-                    image_tag="latest",
-                    github_username=latest_deploy.owner,
-                    repo_name=latest_deploy.repo_name,
-                    absolute_path=latest_deploy.absolute_path
-                )
-                print(f"CodeBuild started: {build_response}")
+            if not payload["ref"].startswith("refs/heads/") or payload.get("deleted"):
+                return {"status": "ignored", "message": "Not a push to a branch"}
+            branch = payload["ref"][len("refs/heads/"):]
 
+            # GitHub gives up on a delivery after 10s and never retries it, while a deploy can hold the
+            # repository for much longer; the pull and rebuilds run once the repository lock is free
+            await push_queue.enqueue(owner, repo_name, branch, payload)
             return {
-                "status": "success",
-                "message": "Repository updated successfully",
-                "details": result
+                "status": "accepted",
+                "message": f"Push to {branch} queued; the repository is pulled and its deploys rebuilt once it is free",
             }
         else:
             return {"status": "ignored", "message": "Not a push event"}
-            
+
     except Exception as e:
         logger.error(f"Webhook processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -128,14 +71,12 @@ async def github_webhook(
 async def get_repositories(
     owner: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ) -> List[RepositorySchema]:
     """
     Fetches the repositories of the authenticated user.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         repositories = await git_repository_service.fetch_user_repositories(owner=owner, access_token=access_key)
         
         # Check if the response is an error dictionary
@@ -156,14 +97,12 @@ async def get_repository(
     owner: str,
     repo_name: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Fetches a specific repository by its name.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         repository = await git_repository_service.fetch_repository(owner=owner, repo_name=repo_name, access_token=access_key)
         if "error" in repository:
             raise HTTPException(status_code=400, detail=repository["error"])
@@ -180,14 +119,12 @@ async def save_repo(
     owner: str,
     repo_name: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Saves a specific repository by its name.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         repository = await git_repository_service.fetch_repository(owner=owner, repo_name=repo_name, access_token=access_key)
         if "error" in repository:
             raise HTTPException(status_code=400, detail=repository["error"])
@@ -206,14 +143,12 @@ async def get_latest_commit(
     repo_name: str,
     branch: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Fetches the latest commit from a specific branch of a repository.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         commit = await git_repository_service.get_latest_commit(owner=owner, repo_name=repo_name, branch=branch, access_token=access_key)
         if "error" in commit:
             raise HTTPException(status_code=400, detail=commit["error"])
@@ -233,18 +168,17 @@ async def get_blob_tree(
     repo_name: str,
     branch: str,
     sha: Optional[str] = None,
+    path: str = Query("", description="Directory to list, relative to the repository root"),
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
-    Fetches the blob tree structure of a repository.
+    Fetches the directories under `path` in the blob tree of a repository.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         if sha is None:
             raise HTTPException(status_code=400, detail="SHA parameter is required")
-        blob_tree = await git_repository_service.get_blob_tree(owner=owner, repo_name=repo_name, branch=branch, sha=sha, access_token=access_key)
+        blob_tree = await git_repository_service.get_blob_tree(owner=owner, repo_name=repo_name, branch=branch, sha=sha, access_token=access_key, path=path)
         if isinstance(blob_tree, dict) and "error" in blob_tree:
             raise HTTPException(status_code=400, detail=blob_tree.get("error", "Unknown error"))
         return blob_tree
@@ -254,6 +188,31 @@ async def get_blob_tree(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# search the tree with a glob pattern
+@router.get("/repository/{owner}/{repo_name}/blobs/{branch}/{sha}/glob", response_model=None, dependencies=[Depends(get_current_user)])
+async def glob_blob_tree(
+    owner: str,
+    repo_name: str,
+    branch: str,
+    sha: str,
+    pattern: str = Query(..., description="Glob such as 'services/*' or '**/requirements.txt'"),
+    git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
+    access_key: str = Depends(get_access_key)
+):
+    """
+    Fetches every file and directory in the repository tree matching a glob pattern.
+    """
+    try:
+        matches = await git_repository_service.glob_tree(owner=owner, repo_name=repo_name, branch=branch, sha=sha, pattern=pattern, access_token=access_key)
+        if isinstance(matches, dict) and "error" in matches:
+            raise HTTPException(status_code=400, detail=matches.get("error", "Unknown error"))
+        return matches
+
+    except HTTPException as http_ex:
+        raise http_ex
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # create github webhook
 
 @router.post("/repository/{owner}/{repo_name}/clone", response_model=None, dependencies=[Depends(get_current_user)])
@@ -261,14 +220,12 @@ async def clone_repository(
     owner: str,
     repo_name: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Clones a repository to the local filesystem.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         result = await git_repository_service.clone_repository(owner=owner, repo_name=repo_name, access_token=access_key)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -285,15 +242,13 @@ async def pull_repository(
     owner: str,
     repo_name: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     
     """
     Pulls the latest changes for a cloned repository.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         result = await git_repository_service.pull_repository(owner=owner, repo_name=repo_name, access_token=access_key)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -308,14 +263,12 @@ async def pull_repository(
 async def get_tree_directory(
     owner: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Fetches the tree directory for a repository.
     """
     try:
-        # Get the access key from the token payload
-        access_key = await get_access_key_from_token_payload(token)
         result = await git_repository_service.get_tree_directory(owner=owner, access_token=access_key)
         
         return result
@@ -330,7 +283,7 @@ async def delete_repository(
     owner: str,
     repo_name: str,
     git_repository_service: GitRepositoryService = Depends(get_git_repository_service),
-    token: str = Depends(outh_2_scheme)
+    access_key: str = Depends(get_access_key)
 ):
     """
     Deletes a repository from the local filesystem.
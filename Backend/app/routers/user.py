@@ -1,13 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from services.user import UserService
 from schemas.user_schema import UserSchema
-from dependencies.security import get_current_user
-from fastapi.security import OAuth2PasswordBearer
+from dependencies.security import get_current_user, get_auth_context
 
 from dependencies.services import get_user_service
 
-router = APIRouter(prefix="/users", tags=["users"], dependencies=[Depends(get_current_user)])
-oauth_2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+router = APIRouter(prefix="/users", tags=["users"], dependencies=[Depends(get_auth_context)])
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def get_user_by_id(
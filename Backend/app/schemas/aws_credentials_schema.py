@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class AWSCredentialsSchema(BaseModel):
+    tenancy: str  # iam_user | sts
+    aws_access_key_id: str
+    aws_secret_access_key: str
+    aws_session_token: Optional[str] = None
+    expiration: Optional[datetime] = None
+    aws_account_id: Optional[str] = None
+    iam_role_arn: Optional[str] = None
+
+    class Config:
+        from_attributes = True
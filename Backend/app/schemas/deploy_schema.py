@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -14,6 +14,8 @@ class BaseDeploySchema(BaseModel):
     app_entry_point: Optional[str] = None
     port: Optional[int] = None
     environment_variables: Optional[Dict[str, str]] = None
+    include_paths: Optional[List[str]] = None  # globs outside the root folder whose changes also rebuild, e.g. "libs/common/**"
+    exclude_paths: Optional[List[str]] = None  # globs whose changes never rebuild, e.g. "**/*.md"
 
     class Config:
         orm_mode = True
@@ -24,6 +26,7 @@ class DeployCreateSchema(BaseDeploySchema):
     """Schema for creating a new deployment"""
     build_command: Optional[str] = None
     run_command: Optional[str] = None
+    force_terraform: bool = False  # apply Terraform even when its inputs are unchanged
     class Config:
         orm_mode = True
         extra = "allow"
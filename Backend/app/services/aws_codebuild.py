@@ -1,24 +1,43 @@
-import boto3
 import os
 from dotenv import load_dotenv
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
+from schemas.aws_credentials_schema import AWSCredentialsSchema
+from services.startup import lazy_import
+from services.metrics import instrument_boto3_client
+
+boto3 = lazy_import("boto3")
 
 logger = logging.getLogger(__name__)
 
+BATCH_GET_BUILDS_LIMIT = 100
+# Reuse Docker layers and the source cache on warm build hosts.
+CODEBUILD_LOCAL_CACHE = {'type': 'LOCAL', 'modes': ['LOCAL_DOCKER_LAYER_CACHE', 'LOCAL_SOURCE_CACHE']}
+
 class AWSCodeBuild:
-    def __init__(self):
+    def __init__(self, credentials: Optional[AWSCredentialsSchema] = None):
+        """Use the given scoped credentials, or the platform credentials from the environment."""
         load_dotenv()
         aws_region = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
         if not aws_region:
             raise ValueError("AWS_DEFAULT_REGION environment variable is not set")
         
-        self.codebuild = boto3.client(
-            'codebuild',
-            region_name=aws_region,
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+        if credentials:
+            self.codebuild = boto3.client(
+                'codebuild',
+                region_name=aws_region,
+                aws_access_key_id=credentials.aws_access_key_id,
+                aws_secret_access_key=credentials.aws_secret_access_key,
+                aws_session_token=credentials.aws_session_token
+            )
+        else:
+            self.codebuild = boto3.client(
+                'codebuild',
+                region_name=aws_region,
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+            )
+        instrument_boto3_client(self.codebuild)
 
     def start_build(self, project_name: str, ecr_repo_url: str, source_version: str, buildspec_content: str, port: int, entry_point: str, image_tag: Optional[str] = None, github_username: Optional[str] = None, repo_name: Optional[str] = None, absolute_path: Optional[str] = None):
         try:
@@ -65,7 +84,8 @@ class AWSCodeBuild:
                 'projectName': project_name,
                 'environmentVariablesOverride': environment_variables_override,
                 'sourceVersion': source_version,
-                'buildspecOverride': buildspec_content
+                'buildspecOverride': buildspec_content,
+                'cacheOverride': CODEBUILD_LOCAL_CACHE,
             }
             # Add buildspec override if provided
             if buildspec_content:
@@ -79,7 +99,6 @@ class AWSCodeBuild:
             logger.debug(f"Build parameters: {start_build_params}")
             try:    
                 response = self.codebuild.start_build(**start_build_params)
-                print(response)
             except Exception as e:
                 logger.error(f"Failed to start CodeBuild: {str(e)}")
                 raise Exception(f"CodeBuild start failed: {str(e)}")
@@ -96,4 +115,13 @@ class AWSCodeBuild:
 
         except Exception as e:
             logger.error(f"Failed to start CodeBuild: {str(e)}")
-            raise Exception(f"CodeBuild start failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"CodeBuild start failed: {str(e)}")
+
+    def batch_get_builds(self, build_ids: List[str]) -> Dict[str, List]:
+        """Fetch many builds, at most 100 per CodeBuild API call."""
+        result = {'builds': [], 'buildsNotFound': []}
+        for start in range(0, len(build_ids), BATCH_GET_BUILDS_LIMIT):
+            response = self.codebuild.batch_get_builds(ids=build_ids[start:start + BATCH_GET_BUILDS_LIMIT])
+            result['builds'].extend(response.get('builds', []))
+            result['buildsNotFound'].extend(response.get('buildsNotFound', []))
+        return result
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import logging
+
+from config.settings import Settings
+from schemas.aws_credentials_schema import AWSCredentialsSchema
+from services.aws_user import AWSUserService
+from services.startup import lazy_import
+from services.metrics import instrument_boto3_client
+
+boto3 = lazy_import("boto3")
+
+logger = logging.getLogger('deploy')
+
+TENANCY_IAM_USER = "iam_user"
+TENANCY_STS = "sts"
+
+
+class STSSessionCache:
+    """Process-local cache of assumed-role credentials per GitHub id, with last-use tracking."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[AWSCredentialsSchema, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, github_id: str, valid_until: datetime) -> Optional[AWSCredentialsSchema]:
+        """Return credentials that stay valid past `valid_until`, marking them used."""
+        with self._lock:
+            entry = self._entries.get(github_id)
+            if entry is None or entry[0].expiration <= valid_until:
+                return None
+            self._entries[github_id] = (entry[0], datetime.now(timezone.utc))
+            return entry[0]
+
+    def put(self, github_id: str, credentials: AWSCredentialsSchema, last_used_at: Optional[datetime] = None) -> None:
+        with self._lock:
+            self._entries[github_id] = (credentials, last_used_at or datetime.now(timezone.utc))
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def discard(self, github_id: str) -> None:
+        with self._lock:
+            self._entries.pop(github_id, None)
+
+
+sts_session_cache = STSSessionCache()
+
+# One assume_role call per GitHub id at a time; concurrent deploys await the same task.
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+class AWSCredentialProvider:
+    """
+    Resolve the AWS credentials a deploy runs under.
+
+    In `iam_user` tenancy these are the long-lived keys of the user's IAM identity. In `sts`
+    tenancy every user shares AWS_PLATFORM_ROLE_ARN, assumed with a `github_id` session tag
+    that the role's policies scope resources by.
+    """
+
+    def __init__(self, aws_user_service: Optional[AWSUserService], tenancy: Optional[str] = None):
+        self.aws_user_service = aws_user_service
+        self.tenancy = tenancy or Settings.AWS_TENANCY_MODE
+        self.role_arn = Settings.AWS_PLATFORM_ROLE_ARN
+        self.session_duration = Settings.AWS_STS_SESSION_DURATION_SECONDS
+        self.refresh_margin = timedelta(seconds=Settings.AWS_STS_REFRESH_MARGIN_SECONDS)
+
+    async def get_credentials(self, github_id: str) -> AWSCredentialsSchema:
+        if self.tenancy == TENANCY_STS:
+            return await self._get_session_credentials(github_id)
+        return await self._get_user_credentials(github_id)
+
+    async def _get_user_credentials(self, github_id: str) -> AWSCredentialsSchema:
+        aws_user = await self.aws_user_service.find_user(github_id)
+        if not aws_user:
+            logger.info(f"Creating new AWS user for GitHub ID: {github_id}")
+            aws_user = await self.aws_user_service.create_user(github_id)
+        return AWSCredentialsSchema(
+            tenancy=TENANCY_IAM_USER,
+            aws_access_key_id=aws_user.aws_access_key_id,
+            aws_secret_access_key=aws_user.aws_secret_access_key,
+            aws_account_id=aws_user.aws_account_id,
+            iam_role_arn=aws_user.iam_role_arn,
+        )
+
+    async def _get_session_credentials(self, github_id: str) -> AWSCredentialsSchema:
+        credentials = sts_session_cache.get(github_id, datetime.now(timezone.utc) + self.refresh_margin)
+        if credentials is not None:
+            return credentials
+        task = _inflight.get(github_id)
+        if task is None:
+            task = asyncio.create_task(self._assume_role(github_id))
+            _inflight[github_id] = task
+            task.add_done_callback(lambda done: _inflight.pop(github_id) if _inflight.get(github_id) is done else None)
+        return await asyncio.shield(task)
+
+    async def _assume_role(self, github_id: str, last_used_at: Optional[datetime] = None) -> AWSCredentialsSchema:
+        if not self.role_arn:
+            raise ValueError("AWS_PLATFORM_ROLE_ARN must be set for sts tenancy")
+        response = await asyncio.to_thread(
+            instrument_boto3_client(boto3.client("sts")).assume_role,
+            RoleArn=self.role_arn,
+            RoleSessionName=f"github-{github_id}",
+            DurationSeconds=self.session_duration,
+            Tags=[{"Key": "github_id", "Value": str(github_id)}],
+            TransitiveTagKeys=["github_id"],
+        )
+        session = response["Credentials"]
+        credentials = AWSCredentialsSchema(
+            tenancy=TENANCY_STS,
+            aws_access_key_id=session["AccessKeyId"],
+            aws_secret_access_key=session["SecretAccessKey"],
+            aws_session_token=session["SessionToken"],
+            expiration=session["Expiration"],
+            aws_account_id=response["AssumedRoleUser"]["Arn"].split(":")[4],
+            iam_role_arn=self.role_arn,
+        )
+        sts_session_cache.put(github_id, credentials, last_used_at)
+        logger.info(f"Assumed platform role for GitHub ID {github_id} until {credentials.expiration}")
+        return credentials
+
+    async def refresh(self) -> int:
+        """Renew sessions about to expire if they were used within the last session lifetime; drop the rest."""
+        now = datetime.now(timezone.utc)
+        refreshed = 0
+        for github_id, (credentials, last_used_at) in sts_session_cache.items():
+            if credentials.expiration - now > 2 * self.refresh_margin:
+                continue
+            if now - last_used_at > timedelta(seconds=self.session_duration):
+                sts_session_cache.discard(github_id)
+                continue
+            try:
+                await self._assume_role(github_id, last_used_at)
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Failed to refresh STS session for GitHub ID {github_id}: {str(e)}")
+        return refreshed
+
+    async def run_periodically(self, interval_seconds: float) -> None:
+        """Background loop that renews active STS sessions before they expire."""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"STS session refresh failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
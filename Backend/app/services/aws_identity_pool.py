@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+from typing import Dict, Optional
+import logging
+
+from config.settings import Settings
+from models.aws_identity import AWSIdentity
+from repositories.aws_identity_pool import AWSIdentityPoolRepository
+from services.leader import SharedSignal
+from services.terraform_runner import TerraformRunner
+
+logger = logging.getLogger('deploy')
+
+# Notified after every claim, by any worker, so the refill loop tops the pool up without waiting for its interval.
+_refill_requested = SharedSignal("identity-pool-refill")
+
+
+class AWSIdentityPoolService:
+    """Keeps pre-provisioned IAM identities ready so a first deploy does not wait on Terraform."""
+
+    def __init__(self, identity_pool_repository: AWSIdentityPoolRepository, pool_size: Optional[int] = None):
+        self.identity_pool_repository = identity_pool_repository
+        self.pool_size = Settings.AWS_IDENTITY_POOL_SIZE if pool_size is None else pool_size
+        self.terraform = TerraformRunner("iam")
+
+    async def claim(self, github_id: str) -> Optional[AWSIdentity]:
+        """Assign a pooled identity to a GitHub user, or None when the pool is empty."""
+        identity = await self.identity_pool_repository.claim_identity(github_id)
+        _refill_requested.notify()
+        if identity is None:
+            logger.warning(f"AWS identity pool is empty; provisioning inline for GitHub ID {github_id}")
+        return identity
+
+    async def provision_identity(self, identity_name: str) -> AWSIdentity:
+        """Run the iam Terraform module for one identity in its own workspace."""
+        output = await self.terraform.apply(identity_name, {"user_github_id": identity_name})
+        return AWSIdentity(
+            identity_name=identity_name,
+            aws_access_key_id=output.get("aws_access_key", {}).get("value"),
+            aws_secret_access_key=output.get("aws_secret_access_key", {}).get("value"),
+            aws_account_id=output.get("aws_account_id", {}).get("value"),
+            iam_role_arn=output.get("iam_role_arn", {}).get("value"),
+        )
+
+    async def _provision_into_pool(self) -> None:
+        identity_name = f"pool-{uuid.uuid4().hex[:12]}"
+        identity = await self.provision_identity(identity_name)
+        await self.identity_pool_repository.add_identity(identity)
+        logger.info(f"Provisioned pooled AWS identity {identity_name}")
+
+    async def refill(self) -> int:
+        """Provision identities concurrently until the pool holds `pool_size` available ones."""
+        missing = self.pool_size - await self.identity_pool_repository.count_available()
+        if missing <= 0:
+            return 0
+        results = await asyncio.gather(*(self._provision_into_pool() for _ in range(missing)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to provision pooled AWS identity: {str(result)}")
+        return sum(1 for result in results if not isinstance(result, Exception))
+
+    async def run_periodically(self, interval_seconds: float) -> None:
+        """Background loop that keeps the pool full, woken early after each claim."""
+        while True:
+            _refill_requested.clear()
+            try:
+                provisioned = await self.refill()
+                if provisioned:
+                    logger.info(f"AWS identity pool refilled with {provisioned} identities")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"AWS identity pool refill failed: {str(e)}")
+            await _refill_requested.wait(interval_seconds)
+
+    async def get_stats(self) -> Dict:
+        counts = await self.identity_pool_repository.get_stats()
+        return {
+            "pool_size": self.pool_size,
+            "available": counts.get("available", 0),
+            "assigned": counts.get("assigned", 0),
+        }
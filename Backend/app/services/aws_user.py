@@ -4,18 +4,16 @@ from models.aws_user import AWSUser
 from schemas.aws_user_schema import AWSUserSchema
 from typing import List, Optional
 from schemas.user_schema import UserSchema
-from python_terraform import Terraform
+from services.aws_identity_pool import AWSIdentityPoolService
 from fastapi import HTTPException
 import httpx
 import json 
 
-import os
 from dotenv import load_dotenv
 class AWSUserService:
-    def __init__(self, aws_user: AWSUserRepository):
+    def __init__(self, aws_user: AWSUserRepository, identity_pool: AWSIdentityPoolService):
         self.aws_user = aws_user
-        terraform_path = os.path.join(os.path.dirname(__file__), "..", "Pipelines", "Common", "Terraform", "iam")
-        self.tf = Terraform(working_dir=terraform_path)
+        self.identity_pool = identity_pool
         load_dotenv()
 
     async def get_all_users(self) -> List[AWSUserSchema]:
@@ -28,47 +26,33 @@ class AWSUserService:
             raise HTTPException(status_code=404, detail="User not found")
         return AWSUserSchema.from_orm(user)
 
+    async def find_user(self, github_id: str) -> Optional[AWSUserSchema]:
+        """Return the user's AWS credentials, or None when they have not been provisioned yet."""
+        return await self.aws_user.get_user(github_id)
+
     async def create_user(self, github_id: str) -> AWSUserSchema:
 
         # check if user already exists
         existing_user = await self.aws_user.get_user(github_id)
         if existing_user:
             raise HTTPException(status_code=400, detail="User already exists")
-        
-
-        
-        # Prepare Terraform variables
-        vars = {
-            "user_github_id": github_id,
-        }
-
-        # Run Terraform init
-        print("Initializing...")
-        return_code, stdout, stderr = self.tf.init(capture_output=False)
-        if return_code != 0:
-            raise HTTPException(status_code=500, detail="Failed to initialize Terraform")
 
-        # Apply with vars (auto-approve)
-        print("Applying Terraform...")
-        return_code, stdout, stderr = self.tf.apply(skip_plan=True, var=vars, capture_output=False, auto_approve=True)
-        if return_code != 0:
-            raise HTTPException(status_code=500, detail="Failed to apply Terraform configuration")
+        # Claim a pre-provisioned identity; only run Terraform inline when the pool is empty
+        identity = await self.identity_pool.claim(github_id)
+        if identity is None:
+            try:
+                identity = await self.identity_pool.provision_identity(github_id)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
 
-        # Get output in JSON format
-        print("Getting output...")
-        output = self.tf.output(json=True)
-        print("Terraform output:", output)
-    
-        if not output:
-            raise HTTPException(status_code=500, detail="Failed to get Terraform output")
-        
-        # Create a new AWSUser object with Terraform outputs
+        # Create a new AWSUser object from the identity's Terraform outputs
         current_user = AWSUser(
             user_github_id=github_id,
-            aws_access_key_id=output.get("aws_access_key", {}).get("value"),
-            aws_secret_access_key=output.get("aws_secret_access_key", {}).get("value"),
-            aws_account_id=output.get("aws_account_id", {}).get("value"),
-            iam_role_arn=output.get("iam_role_arn", {}).get("value"),
+            aws_access_key_id=identity.aws_access_key_id,
+            aws_secret_access_key=identity.aws_secret_access_key,
+            aws_account_id=identity.aws_account_id,
+            iam_role_arn=identity.iam_role_arn,
+            aws_user_group=identity.aws_user_group,
         )
         created_user = await self.aws_user.create_user(current_user)
         if not created_user:
@@ -0,0 +1,136 @@
+import asyncio
+import os
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+import logging
+
+from config.settings import Settings
+from services.aws_codebuild import AWSCodeBuild
+from services.startup import lazy_import
+from services.metrics import instrument_boto3_client
+
+boto3 = lazy_import("boto3")
+
+logger = logging.getLogger('deploy')
+
+TERMINAL_BUILD_STATUSES = {"SUCCEEDED", "FAILED", "FAULT", "TIMED_OUT", "STOPPED"}
+
+
+class BuildLogTailer:
+    """
+    Tail one build's CloudWatch Logs stream for every viewer of that build.
+
+    Each poll asks for events after the last nextForwardToken, so only new lines are transferred.
+    The newest BUILD_LOG_BUFFER_SIZE events are kept in a ring buffer for viewers that join late.
+    The tailer stops once the build is in a terminal state and its stream is drained, or when it
+    has had no viewers for BUILD_LOG_IDLE_SECONDS.
+    """
+
+    def __init__(self, build_id: str, codebuild: AWSCodeBuild, logs_client=None):
+        self.build_id = build_id
+        self.codebuild = codebuild
+        self.logs = logs_client or instrument_boto3_client(boto3.client('logs', region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1')))
+        self.poll_interval = Settings.BUILD_LOG_POLL_INTERVAL_SECONDS
+        self.idle_timeout = Settings.BUILD_LOG_IDLE_SECONDS
+        self.buffer: Deque[Tuple[int, Dict]] = deque(maxlen=Settings.BUILD_LOG_BUFFER_SIZE)
+        self.sequence = 0
+        self.finished = False
+        self.build_status: Optional[str] = None
+        self.viewers = 0
+        self._changed = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _publish(self, events) -> None:
+        async with self._changed:
+            for event in events:
+                self.sequence += 1
+                self.buffer.append((self.sequence, {"timestamp": event["timestamp"], "message": event["message"]}))
+            self._changed.notify_all()
+
+    async def _finish(self) -> None:
+        async with self._changed:
+            self.finished = True
+            self._changed.notify_all()
+
+    async def _run(self) -> None:
+        token = None
+        group = stream = None
+        idle_since = asyncio.get_running_loop().time()
+        try:
+            while True:
+                builds = (await asyncio.to_thread(self.codebuild.batch_get_builds, [self.build_id]))["builds"]
+                if not builds:
+                    logger.warning(f"Build {self.build_id} not found; stopping log tail")
+                    break
+                build = builds[0]
+                self.build_status = build.get("buildStatus")
+                group = build.get("logs", {}).get("groupName") or group
+                stream = build.get("logs", {}).get("streamName") or stream
+
+                drained = group is None
+                while group and stream:
+                    params = {"logGroupName": group, "logStreamName": stream, "startFromHead": True}
+                    if token:
+                        params["nextToken"] = token
+                    try:
+                        response = await asyncio.to_thread(self.logs.get_log_events, **params)
+                    except self.logs.exceptions.ResourceNotFoundException:
+                        # The stream appears once the build container starts logging
+                        drained = self.build_status in TERMINAL_BUILD_STATUSES
+                        break
+                    await self._publish(response.get("events", []))
+                    next_token = response.get("nextForwardToken")
+                    drained = next_token == token or not response.get("events")
+                    token = next_token
+                    if drained:
+                        break
+
+                if self.build_status in TERMINAL_BUILD_STATUSES and drained:
+                    break
+                if self.viewers:
+                    idle_since = asyncio.get_running_loop().time()
+                elif asyncio.get_running_loop().time() - idle_since > self.idle_timeout:
+                    logger.info(f"No viewers for build {self.build_id}; stopping log tail")
+                    break
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Log tail for build {self.build_id} failed: {str(e)}")
+        finally:
+            await self._finish()
+            build_log_tailers.pop(self.build_id, None)
+
+    async def follow(self, after: int = 0) -> AsyncIterator[Tuple[int, Dict]]:
+        """Yield buffered events newer than `after`, then new events until the tail finishes."""
+        self.viewers += 1
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: self.finished or self.sequence > after)
+                    pending = [(sequence, event) for sequence, event in self.buffer if sequence > after]
+                    finished = self.finished
+                for sequence, event in pending:
+                    yield sequence, event
+                    after = sequence
+                if finished and not pending:
+                    return
+        finally:
+            self.viewers -= 1
+
+
+# One tailer per build, shared by all viewers in this process.
+build_log_tailers: Dict[str, BuildLogTailer] = {}
+
+
+def get_build_log_tailer(build_id: str) -> BuildLogTailer:
+    tailer = build_log_tailers.get(build_id)
+    if tailer is None or tailer.finished:
+        tailer = BuildLogTailer(build_id, AWSCodeBuild())
+        build_log_tailers[build_id] = tailer
+        tailer.start()
+    return tailer
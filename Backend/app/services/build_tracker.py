@@ -0,0 +1,156 @@
+import asyncio
+import math
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+from config.settings import Settings
+from repositories.deploy import DeployRepository
+from services.aws_codebuild import AWSCodeBuild, BATCH_GET_BUILDS_LIMIT
+from services.leader import SharedSignal, WORKER_ID
+from dependencies.shared_state import get_shared_state
+from services.metrics import IN_FLIGHT_DEPLOYS
+
+logger = logging.getLogger('deploy')
+
+# Notified whenever a build is started, by any worker, so the tracker polls right away instead of after its backoff.
+build_tracker_wakeup = SharedSignal("build-tracker")
+# The leader publishes its stats here so /admin/build-tracker answers from every worker
+BUILD_TRACKER_STATS_KEY = "stats:build-tracker"
+
+# Deploy status for each CodeBuild buildStatus.
+DEPLOY_STATUS = {
+    "IN_PROGRESS": "in_progress",
+    "SUCCEEDED": "success",
+    "FAILED": "failed",
+    "FAULT": "failed",
+    "TIMED_OUT": "failed",
+    "STOPPED": "failed",
+    "NOT_FOUND": "failed",
+}
+
+_running_tracker: Optional["CodeBuildStatusTracker"] = None
+
+
+class CodeBuildStatusTracker:
+    """
+    Follow every in-flight CodeBuild build with batched batch_get_builds calls and write phase,
+    status and duration transitions back to the deploy records in one bulk update per poll.
+
+    The poll interval starts at BUILD_TRACKER_MIN_INTERVAL_SECONDS, backs off towards
+    BUILD_TRACKER_MAX_INTERVAL_SECONDS while nothing changes, and resets on any transition
+    or when a new build is started.
+
+    When a build succeeds, `on_build_succeeded` is called with the deploy id so the pushed image
+    is rolled out to the deploy's ECS service.
+    """
+
+    def __init__(self, deploy_repository: DeployRepository, codebuild: Optional[AWSCodeBuild] = None,
+                 on_build_succeeded: Optional[Callable[[object], Awaitable]] = None):
+        self.deploy_repository = deploy_repository
+        self.codebuild = codebuild or AWSCodeBuild()
+        self.on_build_succeeded = on_build_succeeded
+        self.min_interval = Settings.BUILD_TRACKER_MIN_INTERVAL_SECONDS
+        self.max_interval = Settings.BUILD_TRACKER_MAX_INTERVAL_SECONDS
+        self.interval = self.min_interval
+        self.in_flight = 0
+        self.polls = 0
+        self.api_calls = 0
+        self.transitions = 0
+
+    async def poll(self) -> int:
+        """Fetch all in-flight builds and persist the ones whose phase or status changed."""
+        deploys = await self.deploy_repository.get_in_flight_builds()
+        self.in_flight = len(deploys)
+        IN_FLIGHT_DEPLOYS.labels("building").set(self.in_flight)
+        self.polls += 1
+        if not deploys:
+            return 0
+
+        by_build_id = {deploy["codebuild_build_id"]: deploy for deploy in deploys}
+        build_ids = list(by_build_id)
+        response = await asyncio.to_thread(self.codebuild.batch_get_builds, build_ids)
+        self.api_calls += math.ceil(len(build_ids) / BATCH_GET_BUILDS_LIMIT)
+
+        updates = []
+        for build in response["builds"]:
+            deploy = by_build_id.get(build["id"])
+            fields = self._transition(deploy, build) if deploy else None
+            if fields:
+                updates.append((deploy["_id"], fields))
+        for build_id in response["buildsNotFound"]:
+            logger.warning(f"CodeBuild build {build_id} no longer exists")
+            updates.append((by_build_id[build_id]["_id"], {"build_status": "NOT_FOUND", "build_phase": None, "status": "failed"}))
+
+        await self.deploy_repository.apply_build_updates(updates)
+        self.transitions += len(updates)
+        succeeded = [deploy_id for deploy_id, fields in updates if fields.get("build_status") == "SUCCEEDED"]
+        if succeeded and self.on_build_succeeded:
+            results = await asyncio.gather(*(self.on_build_succeeded(deploy_id) for deploy_id in succeeded), return_exceptions=True)
+            for deploy_id, result in zip(succeeded, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Rollout after build of deploy {deploy_id} failed: {str(result)}")
+        return len(updates)
+
+    @staticmethod
+    def _transition(deploy: Dict, build: Dict) -> Optional[Dict]:
+        build_status = build.get("buildStatus")
+        build_phase = build.get("currentPhase")
+        if build_status == deploy.get("build_status") and build_phase == deploy.get("build_phase"):
+            return None
+        fields = {
+            "build_status": build_status,
+            "build_phase": build_phase,
+            "status": DEPLOY_STATUS.get(build_status, "in_progress"),
+            "build_started_at": build.get("startTime"),
+        }
+        if build.get("endTime"):
+            fields["build_ended_at"] = build["endTime"]
+            if build.get("startTime"):
+                fields["build_duration_seconds"] = (build["endTime"] - build["startTime"]).total_seconds()
+        return fields
+
+    def _next_interval(self, changed: int) -> float:
+        if changed:
+            return self.min_interval
+        if not self.in_flight:
+            return self.max_interval
+        return min(self.interval * 2, self.max_interval)
+
+    async def run_periodically(self) -> None:
+        """Background loop that polls in-flight builds at an adaptive interval."""
+        global _running_tracker
+        _running_tracker = self
+        try:
+            while True:
+                build_tracker_wakeup.clear()
+                changed = 0
+                try:
+                    changed = await self.poll()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"CodeBuild status poll failed: {str(e)}")
+                self.interval = self._next_interval(changed)
+                try:
+                    await get_shared_state().set(BUILD_TRACKER_STATS_KEY, self.stats(), ttl_seconds=self.interval + self.max_interval)
+                except Exception as e:
+                    logger.warning(f"Could not publish build tracker stats: {str(e)}")
+                if await build_tracker_wakeup.wait(self.interval):
+                    self.interval = self.min_interval
+        finally:
+            # Cancelled when this worker stops being the leader
+            _running_tracker = None
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "interval_seconds": self.interval,
+            "polls": self.polls,
+            "api_calls": self.api_calls,
+            "transitions": self.transitions,
+            "worker": WORKER_ID,
+        }
+
+
+def get_build_tracker_stats() -> Optional[Dict]:
+    return _running_tracker.stats() if _running_tracker else None
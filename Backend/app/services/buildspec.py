@@ -0,0 +1,87 @@
+import json
+import re
+import shlex
+from typing import Dict, List
+
+# Registry tag holding the BuildKit layer cache next to the deploy's images.
+BUILD_CACHE_TAG = "buildcache"
+BUILDX_BUILDER = "easy-deploy"
+# Part of the image tag fingerprint; bump it when a change here changes the images that get built.
+BUILDSPEC_VERSION = "1"
+
+ECR_REPO_URL_PATTERN = re.compile(r"^(?P<registry>(?P<account>\d{12})\.dkr\.ecr\.(?P<region>[a-z0-9-]+)\.amazonaws\.com)/(?P<repository>[a-z0-9._/-]+)$")
+
+
+def parse_ecr_repo_url(ecr_repo_url: str) -> Dict[str, str]:
+    """Split an ECR repository URL into registry, account, region and repository name."""
+    match = ECR_REPO_URL_PATTERN.match(ecr_repo_url or "")
+    if not match:
+        raise ValueError(f"Invalid ECR repository URL: {ecr_repo_url}")
+    return match.groupdict()
+
+
+def _quote(value: str) -> str:
+    # A JSON string is a valid double-quoted YAML scalar, so shell metacharacters and ': ' stay literal.
+    return json.dumps(value)
+
+
+def _commands(phase: str, commands: List[str]) -> List[str]:
+    return [f"  {phase}:", "    commands:"] + [f"      - {_quote(command)}" for command in commands]
+
+
+def render_buildspec(framework: str, ecr_repo_url: str, image_tag: str, workspace_path: str, port, entry_point: str, remove_workspace: bool = False) -> str:
+    """Render the CodeBuild buildspec for one deploy.
+
+    The image is built with BuildKit from the deploy's workspace on EFS. Layers are
+    reused from the CodeBuild local Docker cache when the build lands on a warm host,
+    and from a registry cache stored under the `buildcache` tag in the deploy's ECR
+    repository otherwise. With `remove_workspace` the build deletes the workspace when it
+    ends, whether or not it succeeded; it is set for snapshots taken for a single build.
+    """
+    ecr = parse_ecr_repo_url(ecr_repo_url)
+    image = f"{ecr_repo_url}:{image_tag}"
+    cache_ref = f"{ecr_repo_url}:{BUILD_CACHE_TAG}"
+    tags = [image] if image_tag == "latest" else [image, f"{ecr_repo_url}:latest"]
+
+    build = [
+        "docker buildx build",
+        f"--cache-from type=registry,ref={cache_ref}",
+        f"--cache-to type=registry,ref={cache_ref},mode=max,image-manifest=true,oci-mediatypes=true",
+        f"--build-arg PORT={shlex.quote(str(port))}",
+        f"--build-arg ENTRY_POINT={shlex.quote(entry_point)}",
+        f"--label easy-deploy.framework={shlex.quote(framework)}",
+    ]
+    build += [f"--tag {tag}" for tag in tags]
+    build += ["--provenance=false", "--push", "."]
+
+    lines = [
+        "version: 0.2",
+        "",
+        "env:",
+        "  variables:",
+        f"    DOCKER_BUILDKIT: {_quote('1')}",
+        f"    IMAGE_URI: {_quote(image)}",
+        "",
+        "phases:",
+    ]
+    lines += _commands("pre_build", [
+        f"aws ecr get-login-password --region {ecr['region']} | docker login --username AWS --password-stdin {ecr['registry']}",
+        f"docker buildx inspect {BUILDX_BUILDER} >/dev/null 2>&1 || docker buildx create --name {BUILDX_BUILDER} --driver docker-container",
+        f"docker buildx use {BUILDX_BUILDER}",
+    ])
+    lines += _commands("build", [
+        f"cd {shlex.quote(workspace_path)} && {' '.join(build)}",
+    ])
+    if remove_workspace:
+        lines += ["    finally:", f"      - {_quote(f'rm -rf {shlex.quote(workspace_path)}')}"]
+    lines += _commands("post_build", [
+        "printf '{\"ImageURI\":\"%s\"}' \"$IMAGE_URI\" > \"$CODEBUILD_SRC_DIR/imageDetail.json\"",
+    ])
+    lines += [
+        "",
+        "artifacts:",
+        "  files:",
+        "    - imageDetail.json",
+        "",
+    ]
+    return "\n".join(lines)
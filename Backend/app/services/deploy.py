@@ -1,14 +1,22 @@
+import asyncio
+import hashlib
 import json
 import os
 import re
 import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict
 import logging
 from datetime import datetime
 
 from fastapi import HTTPException
-from python_terraform import Terraform
+from config.settings import Settings
+from config.logging_config import deploy_id_var
+from services.startup import lazy_import
 from models.deploy import Deploy
 from repositories.deploy import DeployRepository
 import subprocess
@@ -18,20 +26,74 @@ from schemas.user_schema import UserSchema
 from services.aws_user import AWSUserService
 from services.git_repository import GitRepositoryService
 from services.aws_codebuild import AWSCodeBuild
-from typing import List
+from services.aws_credentials import AWSCredentialProvider, TENANCY_STS
+from schemas.aws_credentials_schema import AWSCredentialsSchema
+from services.framework_detector import FrameworkDetector
+from services.terraform_runner import run_terraform_init, terraform_lock_manager
+from services.repository_lock import repository_locks
+from dependencies.shared_state import get_shared_state
+from services.ecs_rollout import ECSRollout
+from services.build_tracker import build_tracker_wakeup
+from services.buildspec import BUILDSPEC_VERSION, render_buildspec
+from services.path_filter import DeployPathFilter
+from services.metrics import IN_FLIGHT_DEPLOYS, WEBHOOK_REBUILDS, observe_dependency
+from typing import List, Optional, Tuple
+
+python_terraform = lazy_import("python_terraform")
 logger = logging.getLogger('deploy')
 
+# Outputs of the ecs_cluster module kept on the deploy and reused while its inputs are unchanged.
+TERRAFORM_OUTPUTS = ("load_balancer_dns", "ecr_repo_url", "instance_id", "ecs_cluster_name", "ecs_service_name", "ecs_container_name")
+TERRAFORM_CREDENTIAL_VARS = {"aws_access_key", "aws_secret_access_key", "aws_session_token"}
+# Fingerprint and outputs of the last successful apply against a user's ecs_cluster state. Every
+# repository of a user applies to the same state, so only this apply describes what exists.
+TERRAFORM_STATE_KEY = "terraform-state:ecs-{user_github_id}"
+# Caps how many deploys pushes rebuild at once, across every webhook being handled.
+push_build_semaphore = asyncio.Semaphore(Settings.WEBHOOK_MAX_CONCURRENT_BUILDS)
+
+# Builds read a snapshot of the workspace kept inside its clone, where pulls never touch it and
+# it is evicted with the workspace. Builds time out after 8 hours at most, so older snapshots are leftovers.
+BUILD_SNAPSHOT_DIR = os.path.join(".git", "easy-deploy", "builds")
+BUILD_SNAPSHOT_MAX_AGE_SECONDS = 24 * 3600
+
+# Deploy settings that change the built image for the same commit; the .env file is copied into the image.
+IMAGE_FINGERPRINT_FIELDS = ("framework", "root_folder_path", "port", "entry_point", "build_command", "run_command", "environment_variables")
+
+
+@lru_cache(maxsize=8)
+def _hash_template(template_path: str, mtimes: tuple) -> str:
+    digest = hashlib.sha256()
+    for relative_path, _ in mtimes:
+        digest.update(relative_path.encode())
+        with open(os.path.join(template_path, relative_path), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _template_hash(template_path: str) -> str:
+    """Content hash of a Terraform module or pipeline directory, recomputed only when one of its files changes."""
+    mtimes = []
+    for directory, _, files in os.walk(template_path):
+        for file in files:
+            path = os.path.join(directory, file)
+            mtimes.append((os.path.relpath(path, template_path), os.stat(path).st_mtime_ns))
+    return _hash_template(template_path, tuple(sorted(mtimes)))
+
+
 class DeployService:
-    def __init__(self, deploy_repository: DeployRepository, aws_user_service: AWSUserService, git_repository_service: GitRepositoryService):
+    def __init__(self, deploy_repository: DeployRepository, aws_user_service: AWSUserService, git_repository_service: GitRepositoryService, credential_provider: Optional[AWSCredentialProvider] = None):
         """Initialize DeployService with repository and service dependencies."""
         self.deploy_repository = deploy_repository
         self.aws_user_service = aws_user_service
+        self.credential_provider = credential_provider or AWSCredentialProvider(aws_user_service)
         self.git_repository_service = git_repository_service
         self.base_pipeline_path = "app/Pipelines/"
         self.project_root = Path(__file__).resolve().parent.parent.parent
+        self.terraform_template_path = os.path.join(self.project_root, self.base_pipeline_path, "Common", "Terraform", "ecs_cluster")
         self.codebuild_service = AWSCodeBuild()
         self.framework_config = self._load_framework_config()
         self.supported_frameworks = self._get_supported_frameworks()
+        self.framework_detector = FrameworkDetector(git_repository_service, self.framework_config)
         logger.info("DeployService initialized successfully")
     def _validate_path(self, path: str) -> bool:
         """Validate path to prevent directory traversal attacks."""
@@ -87,15 +149,72 @@ class DeployService:
             raise ValueError("Command contains invalid characters")
         return command
 
+    def render_buildspec(self, deploy_data: Dict, image_tag: str, snapshot_path: Optional[str] = None) -> str:
+        """Render the per-deploy buildspec from the deploy's ECR repository, workspace and framework."""
+        return render_buildspec(
+            framework=deploy_data["framework"].lower(),
+            ecr_repo_url=deploy_data["ecr_repo_url"],
+            image_tag=image_tag,
+            workspace_path=snapshot_path or deploy_data["absolute_path"].rstrip('/'),
+            port=deploy_data["port"],
+            entry_point=deploy_data["entry_point"],
+            remove_workspace=snapshot_path is not None,
+        )
+
+    def _snapshot_build_context(self, deploy_data: Dict, image_tag: str) -> str:
+        """
+        Copy the deploy's build context, as checked out now, to a directory only one build reads.
+        The build starts minutes later, after the repository lock is released and a pull may have moved the workspace.
+        """
+        build_context = deploy_data["absolute_path"].rstrip('/')
+        clone_dir = build_context
+        while not os.path.isdir(os.path.join(clone_dir, ".git")):
+            parent = os.path.dirname(clone_dir)
+            if parent == clone_dir:
+                raise ValueError(f"{build_context} is not inside a cloned repository")
+            clone_dir = parent
+
+        snapshots_dir = os.path.join(clone_dir, BUILD_SNAPSHOT_DIR)
+        os.makedirs(snapshots_dir, exist_ok=True)
+        expired = time.time() - BUILD_SNAPSHOT_MAX_AGE_SECONDS
+        for entry in os.scandir(snapshots_dir):
+            if entry.stat().st_mtime < expired:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+        def ignore(directory: str, names: List[str]) -> List[str]:
+            # The Terraform working directory holds provider binaries the image never needs
+            skipped = {".git", "terraform"} if directory == build_context else {".git"}
+            return [name for name in names if name in skipped]
+
+        snapshot_path = os.path.join(snapshots_dir, f"{image_tag}-{uuid.uuid4().hex[:8]}")
+        shutil.copytree(build_context, snapshot_path, symlinks=True, ignore=ignore)
+        # copytree copies the source directory's mtime, which would make the snapshot look expired
+        os.utime(snapshot_path)
+        return snapshot_path
+
     def get_framework_config(self) -> Dict:
         """Get the framework configuration."""
         return self.framework_config
 
-    async def get_aws_user(self, user_id: str) -> AWSUserSchema:
-        """Fetch AWS user details from the repository."""
+    async def detect_framework(self, owner: str, repo_name: str, access_token: str, branch: Optional[str] = None, sha: str = "", root_folder_path: str = "") -> Dict:
+        """Detect framework, entry point and port from the repository's manifest files."""
+        if not self._validate_path(root_folder_path.lstrip('/')):
+            raise ValueError("Invalid root folder path")
+        return await self.framework_detector.detect(
+            owner, repo_name, access_token, branch=branch, sha=sha, root_folder_path=root_folder_path
+        )
+
+    async def get_aws_user(self, user_id: str) -> Optional[AWSUserSchema]:
+        """Fetch AWS user details from the repository, or None if the user has none yet."""
         if not user_id or not isinstance(user_id, str):
             raise ValueError("Invalid user ID")
-        return await self.aws_user_service.get_user_by_id(user_id)
+        return await self.aws_user_service.find_user(user_id)
+
+    def get_codebuild_service(self, credentials: AWSCredentialsSchema) -> AWSCodeBuild:
+        """CodeBuild client for a deploy; IAM-user keys carry no CodeBuild permissions, so they use the platform client."""
+        if credentials.tenancy == TENANCY_STS:
+            return AWSCodeBuild(credentials)
+        return self.codebuild_service
 
     async def get_deploys(self, owner: str, repo_name: str) -> List[Deploy]:
         """Fetch a deployment record from the repository."""
@@ -108,6 +227,215 @@ class DeployService:
     async def get_deploy_statistics(self, owner: str) -> Dict:
         """Fetch deployment statistics from the repository."""
         return await self.deploy_repository.get_deployment_statistics(owner)
+    async def get_deploy(self, deploy_id: str, user: UserSchema) -> Deploy:
+        """Fetch a deploy owned by the user."""
+        deploy = await self.deploy_repository.get_deploy(deploy_id)
+        if not deploy:
+            raise LookupError("Deploy not found")
+        deploy_id_var.set(deploy.id)
+        if deploy.user_github_id != user.github_id:
+            raise PermissionError("Deploy belongs to another user")
+        return deploy
+
+    async def rebuild(self, deploy: Deploy) -> Deploy:
+        """Build the commit checked out in a deploy's workspace, or roll out its image if ECR already has it."""
+        deploy_id_var.set(deploy.id)
+        if not deploy.absolute_path:
+            raise ValueError("Repository path is required")
+        if not deploy.ecr_repo_url:
+            raise ValueError("ECR repository URL is required")
+        deploy_data = deploy.dict()
+        deploy_data["entry_point"] = deploy.entry_point or deploy.app_entry_point
+        if not deploy_data["port"] or not deploy_data["entry_point"]:
+            framework = (deploy.framework or "").lower()
+            framework_defaults = self.framework_config.get(self._get_framework_type(framework), {}).get(framework, {})
+            deploy_data["port"] = deploy_data["port"] or framework_defaults.get("port")
+            deploy_data["entry_point"] = deploy_data["entry_point"] or framework_defaults.get("entry_point")
+
+        # The build packages the workspace, so a pull must not move it between reading HEAD and uploading
+        async with repository_locks.hold(deploy.owner, deploy.repo_name, "rebuild"):
+            # Also retains workspaces of deploys created before retention existed
+            await self._retain_workspace(deploy.owner, deploy.repo_name)
+            deploy_data["commit_sha"] = await self.git_repository_service.get_head_sha(deploy.owner, deploy.repo_name)
+            deploy_data["image_tag"] = self._image_tag(deploy_data["commit_sha"], deploy_data)
+            credentials = await self.credential_provider.get_credentials(deploy.user_github_id)
+            try:
+                fields = await self._build_or_reuse_image(deploy_data, credentials)
+            except Exception as e:
+                logger.error(f"Error rebuilding deploy {deploy.id}: {str(e)}")
+                fields = {"status": "failed", "codebuild_build_id": None}
+        fields.update(commit_sha=deploy_data["commit_sha"], image_tag=deploy_data["image_tag"], build_skip_reason=None)
+        return await self.deploy_repository.update_deploy(deploy.id, fields)
+
+    @staticmethod
+    def build_skip_reason(deploy: Deploy, changed_paths: Optional[List[str]]) -> Optional[str]:
+        """Why a push with these changed paths does not need to rebuild the deploy, or None when it does."""
+        if changed_paths is None:
+            return None
+        if not changed_paths:
+            return "push changed no files"
+        path_filter = DeployPathFilter(deploy.root_folder_path or "", deploy.include_paths, deploy.exclude_paths)
+        if path_filter.first_match(changed_paths) is None:
+            return f"none of the {len(changed_paths)} changed paths match root folder '/{path_filter.root}' and the include/exclude globs"
+        return None
+
+    async def handle_push(self, owner: str, repo_name: str, branch: str, changed_paths: Optional[List[str]], pushed_sha: Optional[str] = None) -> List[Dict]:
+        """
+        Rebuild every active deploy of a pushed branch concurrently, under a concurrency limit
+        shared by all pushes. A failing deploy is reported in its summary without affecting the others.
+        """
+        deploys = await self.deploy_repository.get_active_deploys(owner, repo_name, branch)
+
+        async def rebuild_one(deploy: Deploy) -> Dict:
+            with WEBHOOK_REBUILDS.labels("waiting").track_inprogress():
+                await push_build_semaphore.acquire()
+            try:
+                with WEBHOOK_REBUILDS.labels("running").track_inprogress():
+                    return await self.rebuild_for_push(deploy, changed_paths, pushed_sha)
+            except Exception as e:
+                logger.error(f"Rebuild of deploy {deploy.id} for {owner}/{repo_name}@{branch} failed: {str(e)}")
+                return {"deploy_id": deploy.id, "action": "failed", "error": str(e)}
+            finally:
+                push_build_semaphore.release()
+
+        return list(await asyncio.gather(*(rebuild_one(deploy) for deploy in deploys)))
+
+    async def rebuild_for_push(self, deploy: Deploy, changed_paths: Optional[List[str]], pushed_sha: Optional[str] = None) -> Dict:
+        """Rebuild a deploy for a push unless none of the changed paths affect it; returns a summary."""
+        reason = self.build_skip_reason(deploy, changed_paths)
+        if reason:
+            logger.info(f"Skipping rebuild of deploy {deploy.id} for {pushed_sha}: {reason}")
+            await self.deploy_repository.update_deploy(deploy.id, {
+                "build_skip_reason": reason,
+                "build_skipped_commit_sha": pushed_sha,
+                "build_skipped_at": datetime.now(),
+            })
+            return {"deploy_id": deploy.id, "action": "skipped", "reason": reason}
+        updated = await self.rebuild(deploy)
+        return {
+            "deploy_id": deploy.id,
+            "action": "reused" if updated.build_cache_hit else "built",
+            "status": updated.status,
+            "image_tag": updated.image_tag,
+            "codebuild_build_id": updated.codebuild_build_id,
+        }
+
+    def _image_tag(self, commit_sha: str, deploy_data: Dict) -> str:
+        """Tag an image by its commit and a fingerprint of the framework settings and pipeline template it was built with."""
+        settings = {field: deploy_data.get(field) for field in IMAGE_FINGERPRINT_FIELDS}
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode())
+        digest.update(BUILDSPEC_VERSION.encode())
+        if deploy_data.get("pipeline_path"):
+            pipeline_source = os.path.join(self.project_root, deploy_data["pipeline_path"])
+            if os.path.isdir(pipeline_source):
+                digest.update(_template_hash(pipeline_source).encode())
+        return f"{commit_sha[:12]}-{digest.hexdigest()[:12]}"
+
+    async def _build_or_reuse_image(self, deploy_data: Dict, credentials: AWSCredentialsSchema) -> Dict:
+        """
+        Start a CodeBuild build for the deploy's image tag and return the fields to record on the deploy.
+        When ECR already holds an image with that tag the build is skipped and the image rolled out directly.
+        """
+        image_tag = deploy_data["image_tag"]
+        rollout = ECSRollout(credentials)
+        image_digest = await asyncio.to_thread(rollout.find_image_digest, deploy_data["ecr_repo_url"], image_tag)
+        if image_digest:
+            logger.info(f"Image {image_tag} for {deploy_data['owner']}/{deploy_data['repo_name']} is already in ECR; skipping CodeBuild")
+            fields = await self._rollout(rollout, deploy_data["user_github_id"], deploy_data["ecr_repo_url"], deploy_data.get("terraform_outputs"), image_digest)
+            return {
+                **fields,
+                "build_cache_hit": True,
+                "codebuild_build_id": None,
+                "status": "success",
+                "build_status": None,
+                "build_phase": None,
+                "build_duration_seconds": None,
+            }
+
+        codebuild_project_name = f"{deploy_data['user_github_id']}-{deploy_data['repo_name']}-codebuild"
+        # Callers hold the repository lock, so the snapshot matches commit_sha
+        snapshot_path = await asyncio.to_thread(self._snapshot_build_context, deploy_data, image_tag)
+        logger.info(f"Starting CodeBuild project: {codebuild_project_name}")
+        try:
+            build_response = await asyncio.to_thread(
+                self.get_codebuild_service(credentials).start_build,
+                project_name=codebuild_project_name,
+                ecr_repo_url=deploy_data["ecr_repo_url"],
+                source_version=deploy_data.get("branch") or 'main',
+                buildspec_content=self.render_buildspec(deploy_data, image_tag, snapshot_path),
+                port=deploy_data["port"],
+                entry_point=deploy_data["entry_point"],
+                image_tag=image_tag,
+                github_username=deploy_data["user_github_id"],
+                repo_name=deploy_data["repo_name"],
+                absolute_path=snapshot_path
+            )
+        except BaseException:
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+            raise
+        logger.info(f"CodeBuild started successfully: {build_response}")
+        if not build_response.get('build_id'):
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+            return {"build_cache_hit": False, "codebuild_build_id": None, "status": "failed"}
+        build_tracker_wakeup.notify()
+        return {
+            "build_cache_hit": False,
+            "codebuild_build_id": build_response['build_id'],
+            "status": "in_progress",
+            "build_status": "IN_PROGRESS",
+            "build_phase": "SUBMITTED",
+            "build_duration_seconds": None,
+        }
+
+    async def _rollout(self, rollout: ECSRollout, user_github_id: str, ecr_repo_url: str, terraform_outputs: Optional[Dict], image_digest: str) -> Dict:
+        """Point the ECS service at an image digest and return the fields to record on the deploy."""
+        # Deploys applied before the ECS outputs existed fall back to the module's naming
+        outputs = terraform_outputs or {}
+        result = await asyncio.to_thread(
+            rollout.rollout,
+            outputs.get("ecs_cluster_name") or f"ecs-cluster-{user_github_id}",
+            outputs.get("ecs_service_name") or "ecs-service",
+            outputs.get("ecs_container_name"),
+            f"{ecr_repo_url}@{image_digest}",
+        )
+        return {
+            "image_digest": image_digest,
+            "task_definition_arn": result["task_definition_arn"],
+            "task_definition_revision": result["task_definition_revision"],
+            "rolled_out_at": datetime.now(),
+        }
+
+    async def rollout_image(self, deploy_id: str, user: UserSchema, image_tag: Optional[str] = None) -> Deploy:
+        """Point a deploy's ECS service at a built image by digest, without running Terraform."""
+        deploy = await self.get_deploy(deploy_id, user)
+        if not deploy.ecr_repo_url:
+            raise ValueError("Deploy has no ECR repository")
+
+        credentials = await self.credential_provider.get_credentials(deploy.user_github_id)
+        rollout = ECSRollout(credentials)
+        image_tag = image_tag or deploy.image_tag or "latest"
+        image_digest = await asyncio.to_thread(rollout.resolve_image_digest, deploy.ecr_repo_url, image_tag)
+        fields = await self._rollout(rollout, deploy.user_github_id, deploy.ecr_repo_url, deploy.terraform_outputs, image_digest)
+        logger.info(f"Rolled out {image_tag} ({image_digest}) for deploy {deploy_id}")
+        return await self.deploy_repository.update_deploy(deploy_id, {"image_tag": image_tag, **fields})
+
+    async def rollout_built_image(self, deploy_id) -> Optional[Deploy]:
+        """Roll out the image a deploy's CodeBuild build just pushed; called by the build tracker when the build succeeds."""
+        deploy = await self.deploy_repository.get_deploy(str(deploy_id))
+        if not deploy or not deploy.ecr_repo_url or not deploy.image_tag:
+            return None
+        deploy_id_var.set(deploy.id)
+        try:
+            credentials = await self.credential_provider.get_credentials(deploy.user_github_id)
+            rollout = ECSRollout(credentials)
+            image_digest = await asyncio.to_thread(rollout.resolve_image_digest, deploy.ecr_repo_url, deploy.image_tag)
+            fields = await self._rollout(rollout, deploy.user_github_id, deploy.ecr_repo_url, deploy.terraform_outputs, image_digest)
+        except Exception as e:
+            logger.error(f"Error rolling out {deploy.image_tag} for deploy {deploy.id}: {str(e)}")
+            return await self.deploy_repository.update_deploy(deploy.id, {"status": "failed"})
+        logger.info(f"Rolled out built image {deploy.image_tag} ({image_digest}) for deploy {deploy.id}")
+        return await self.deploy_repository.update_deploy(deploy.id, fields)
+
     async def destroy_terraform_resources(self, owner: str, repo_name: str) -> Dict[str, str]:
         """Destroy Terraform resources for a given repository."""
         try:
@@ -117,8 +445,16 @@ class DeployService:
                 raise ValueError("Deploy record not found or missing absolute path")
             # get the absolute path of the deploy
             tf_working_dir = os.path.join(str(deploys[0].absolute_path), "terraform")
-            tf = Terraform(working_dir=tf_working_dir)
-            tf.destroy(auto_approve=True, var={'github_owner': deploys[0].owner})
+            user_github_id = deploys[0].user_github_id
+            async with repository_locks.hold(owner, repo_name, "destroy") as lock, terraform_lock_manager.acquire(f"ecs-{user_github_id}"):
+                await lock.ensure_held()
+                # Even a partial destroy leaves nothing a later deploy can reuse
+                await self._forget_terraform_state(user_github_id)
+                tf = python_terraform.Terraform(working_dir=tf_working_dir)
+                # Off the event loop, so the repository lock heartbeat keeps running
+                with observe_dependency("subprocess", "terraform destroy"):
+                    await asyncio.to_thread(tf.destroy, auto_approve=True, var={'github_owner': deploys[0].owner})
+                await self._retain_workspace(owner, repo_name, retained=False)
             return {"status": "success", "message": "Resources destroyed successfully"}
         except Exception as e:
             raise ValueError(f"Error destroying Terraform resources: {str(e)}")
@@ -127,10 +463,7 @@ class DeployService:
     async def create_deploy(self, deploy: DeployCreateSchema, access_token: str, user: UserSchema) -> Deploy:
         """Create a new deployment record with default or overridden configuration."""
         logger.info(f"Starting deployment process for repository: {deploy.owner}/{deploy.repo_name}")
-        
-        # Generate unique tag for this deployment
-        deployment_tag = "latest"
-        
+
         if not access_token or not isinstance(access_token, str):
             logger.error("Invalid access token provided")
             raise ValueError("Invalid access token")
@@ -138,17 +471,11 @@ class DeployService:
         if not user.github_id:
             logger.error("User's GitHub ID is required")
             raise ValueError("User's GitHub ID is required")
-        aws_user = await self.get_aws_user(user.github_id)
-        if not aws_user:
-            logger.info(f"Creating new AWS user for GitHub ID: {user.github_id}")
-            try:
-                aws_user = await self.aws_user_service.create_user(user.github_id)
-            except Exception as e:
-                logger.error(f"Error creating AWS user: {str(e)}")
-                raise ValueError(f"Error creating AWS user: {str(e)}")
-        if not aws_user:
-            logger.error("AWS user not found or could not be created")
-            raise ValueError("AWS user not found or could not be created.")
+        try:
+            credentials = await self.credential_provider.get_credentials(user.github_id)
+        except Exception as e:
+            logger.error(f"Error resolving AWS credentials: {str(e)}")
+            raise ValueError(f"Error resolving AWS credentials: {str(e)}")
        
         if not deploy.framework:
             logger.error("Framework is required")
@@ -167,6 +494,7 @@ class DeployService:
 
         # Merge user input with defaults
         deploy_data = deploy.dict(exclude_unset=True)
+        force_terraform = deploy_data.pop("force_terraform", False)
         
         # Sanitize commands before using them
         build_command = self._sanitize_commands(deploy_data.get("build_command") or framework_defaults["build_command"])
@@ -184,6 +512,139 @@ class DeployService:
 
         logger.info(f"Deployment configuration prepared for {deploy.owner}/{deploy.repo_name}")
 
+        # One operation at a time mutates a repository's workspace and Terraform, across every replica;
+        # the pin keeps the workspace from being evicted while it is cloned, provisioned and built
+        async with repository_locks.hold(deploy.owner, deploy.repo_name, f"deploy:{user.github_id}") as lock:
+            async with self._pin_workspace(deploy.owner, deploy.repo_name, reason=f"deploy:{user.github_id}"):
+                with IN_FLIGHT_DEPLOYS.labels("provisioning").track_inprogress():
+                    await self._provision_and_build(deploy, deploy_data, credentials, user, access_token, force_terraform)
+                # Pushes pull into the workspace and destroy runs from its terraform directory, for as long as the deploy lives
+                await self._retain_workspace(deploy.owner, deploy.repo_name)
+
+            logger.info(f"Creating deployment record for {deploy.owner}/{deploy.repo_name}")
+            await lock.ensure_held()
+            return await self.deploy_repository.create_deploy(deploy_data)
+
+    async def _retain_workspace(self, owner: str, repo_name: str, retained: bool = True) -> None:
+        """Keep the repository workspace from eviction while it has a live deploy, when workspace tracking is enabled."""
+        workspace_service = self.git_repository_service.workspace_service
+        if workspace_service is None:
+            return
+        if retained:
+            await workspace_service.retain(owner, repo_name, "deploy")
+        else:
+            await workspace_service.release(owner, repo_name, "deploy")
+
+    @asynccontextmanager
+    async def _pin_workspace(self, owner: str, repo_name: str, reason: str):
+        """Pin the repository workspace when workspace tracking is enabled."""
+        workspace_service = self.git_repository_service.workspace_service
+        if workspace_service is None:
+            yield None
+            return
+        async with workspace_service.pinned(owner, repo_name, reason=reason) as token:
+            yield token
+
+    @staticmethod
+    def _terraform_credential_vars(credentials: AWSCredentialsSchema) -> Dict[str, str]:
+        """
+        Credentials the ecs_cluster module provisions with. Only STS sessions are passed; IAM-user keys
+        carry no permission to create the CodeBuild project, buckets and IAM resources, so those tenants
+        are provisioned with the platform's ambient credentials, as their builds are.
+        """
+        if credentials.tenancy != TENANCY_STS:
+            return {}
+        return {
+            "aws_access_key": credentials.aws_access_key_id,
+            "aws_secret_access_key": credentials.aws_secret_access_key,
+            "aws_session_token": credentials.aws_session_token,
+        }
+
+    def _terraform_fingerprint(self, tf_vars: Dict) -> str:
+        """Hash the infrastructure inputs of a deploy; credentials rotate without changing infrastructure."""
+        inputs = {k: v for k, v in tf_vars.items() if k not in TERRAFORM_CREDENTIAL_VARS}
+        payload = json.dumps({"vars": inputs, "template": _template_hash(self.terraform_template_path)}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def _provision_infrastructure(self, deploy_data: Dict, tf_vars: Dict, force_terraform: bool = False) -> Tuple[Dict[str, str], bool]:
+        """
+        Apply the ecs_cluster module, or reuse the outputs of the last apply against the user's state
+        when it was made with the same inputs. Returns the outputs and whether Terraform was skipped.
+        """
+        user_github_id = deploy_data["user_github_id"]
+        # Applies against the same per-user state run one at a time, and the reuse check sees the latest one
+        async with terraform_lock_manager.acquire(f"ecs-{user_github_id}"):
+            if not force_terraform:
+                applied = await get_shared_state().get(TERRAFORM_STATE_KEY.format(user_github_id=user_github_id))
+                if applied and applied["fingerprint"] == deploy_data["terraform_fingerprint"]:
+                    return applied["outputs"], True
+            return await self._apply_terraform(deploy_data, tf_vars), False
+
+    async def _forget_terraform_state(self, user_github_id: str) -> None:
+        await get_shared_state().delete(TERRAFORM_STATE_KEY.format(user_github_id=user_github_id))
+
+    async def _apply_terraform(self, deploy_data: Dict, tf_vars: Dict) -> Dict[str, str]:
+        """Materialize the ecs_cluster module next to the repository and apply it."""
+        tf_working_dir = os.path.join(deploy_data["absolute_path"], "terraform")
+        try:
+            logger.info("Initializing Terraform configuration")
+            lock = repository_locks.current(deploy_data["owner"], deploy_data["repo_name"])
+            if lock is not None:
+                # A holder that stalled past its lease must not overwrite the next holder's directory
+                await lock.ensure_held()
+            # A failed apply can leave the state anywhere, so nothing is reusable until one succeeds
+            await self._forget_terraform_state(deploy_data["user_github_id"])
+            outputs = await asyncio.to_thread(self._run_terraform, tf_working_dir, deploy_data["user_github_id"], tf_vars)
+            await get_shared_state().set(
+                TERRAFORM_STATE_KEY.format(user_github_id=deploy_data["user_github_id"]),
+                {"fingerprint": deploy_data["terraform_fingerprint"], "outputs": outputs, "repository": f"{deploy_data['owner']}/{deploy_data['repo_name']}"},
+            )
+            return outputs
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error running setup_backend.sh: {e.stderr}")
+            raise ValueError(f"Error running setup_backend.sh: {e.stderr}")
+        except Exception as e:
+            logger.error(f"Error initializing or applying Terraform: {str(e)}")
+            raise ValueError(f"Error initializing or applying Terraform: {str(e)}")
+
+    def _run_terraform(self, tf_working_dir: str, user_github_id: str, tf_vars: Dict) -> Dict[str, str]:
+        # Replace the terraform directory with a fresh copy of the module
+        if os.path.exists(tf_working_dir):
+            shutil.rmtree(tf_working_dir)
+        shutil.copytree(self.terraform_template_path, tf_working_dir)
+
+        # Run setup_backend.sh
+        setup_script_path = os.path.join(tf_working_dir, "setup_backend.sh")
+        if os.path.exists(setup_script_path):
+            logger.info("Running setup_backend.sh script")
+            os.chmod(setup_script_path, 0o755)
+            with observe_dependency("subprocess", "setup_backend.sh"):
+                # The script runs terraform init
+                run_terraform_init(["sh", setup_script_path, user_github_id], cwd=tf_working_dir).check_returncode()
+
+        tf = python_terraform.Terraform(working_dir=tf_working_dir)
+        logger.info("Applying Terraform configuration")
+        with observe_dependency("subprocess", "terraform apply"):
+            return_code, stdout, stderr = tf.apply(skip_plan=True, var=tf_vars, capture_output=True)
+        if return_code != 0:
+            logger.error(f"Terraform apply failed. Stdout: {stdout}, Stderr: {stderr}")
+            raise ValueError(f"Failed to apply Terraform configuration: {stderr}")
+
+        logger.info("Getting Terraform output")
+        output = tf.output()
+        if not output:
+            logger.error("Terraform output is empty")
+            raise ValueError("Terraform output is empty")
+
+        outputs = {name: output.get(name, {}).get("value") for name in TERRAFORM_OUTPUTS}
+        missing_outputs = [name for name in ("load_balancer_dns", "ecr_repo_url") if not outputs.get(name)]
+        if missing_outputs:
+            logger.error(f"Missing critical Terraform outputs: {', '.join(missing_outputs)}")
+            raise ValueError(f"Missing critical Terraform outputs: {', '.join(missing_outputs)}")
+        return outputs
+
+    async def _provision_and_build(self, deploy: DeployCreateSchema, deploy_data: Dict, credentials: AWSCredentialsSchema, user: UserSchema, access_token: str, force_terraform: bool = False) -> None:
+        """Clone the repository, copy pipeline files, provision infrastructure and start CodeBuild."""
         # Clone the repository
         try:
             if not re.match(r'^[a-zA-Z0-9\-]+$', deploy.owner) or not re.match(r'^[a-zA-Z0-9\-_.]+$', deploy.repo_name):
@@ -207,6 +668,7 @@ class DeployService:
                 raise ValueError("Invalid root folder path")
                 
             deploy_data["absolute_path"] = os.path.join(clone_data["path"], root_path)
+            deploy_data["commit_sha"] = await self.git_repository_service.get_head_sha(deploy.owner, deploy.repo_name)
             
             # Copy pipeline files
             pipeline_source = os.path.join(self.project_root, deploy_data["pipeline_path"])
@@ -223,28 +685,6 @@ class DeployService:
                     else:
                         shutil.copytree(source_path, dest_path)
 
-            # Copy terraform files
-            terraform_path = os.path.join(self.project_root, self.base_pipeline_path, "Common", "Terraform", "ecs_cluster")
-            terraform_dest = os.path.join(deploy_data["absolute_path"], "terraform")
-            
-            # Remove existing terraform directory if it exists
-            if os.path.exists(terraform_dest):
-                shutil.rmtree(terraform_dest)
-            
-            # Create terraform directory
-            os.makedirs(terraform_dest)
-            
-            # Copy terraform files to the terraform subdirectory
-            terraform_files = os.listdir(terraform_path)
-            for file in terraform_files:
-                source_path = os.path.join(terraform_path, file)
-                dest_path = os.path.join(terraform_dest, file)
-                
-                if os.path.isfile(source_path):
-                    shutil.copy(source_path, dest_path)
-                else:
-                    shutil.copytree(source_path, dest_path)
-            
             # Create .env file
             env_path = os.path.join(deploy_data["absolute_path"], ".env")
             logger.info(f"Creating environment file at {env_path}")
@@ -256,102 +696,35 @@ class DeployService:
             logger.error(f"Error during repository setup: {str(e)}")
             raise ValueError(f"Error cloning repository: {str(e)}")
 
-        # Initialize Terraform
-        try:
-            logger.info("Initializing Terraform configuration")
-            tf_vars = {
-                "user_github_id": deploy_data["user_github_id"],
-                "aws_access_key": aws_user.aws_access_key_id,
-                "aws_secret_access_key": aws_user.aws_secret_access_key,
-                "repo_name": deploy.repo_name,
-                "absolute_path": deploy_data["absolute_path"].rstrip('/'),
-                "owner": deploy.owner,
-                "ecs_task_container_port": deploy_data["port"],
-                "ecs_task_host_port": deploy_data["port"],
-                "aws_region": os.environ.get('AWS_DEFAULT_REGION'),
-                "source_branch": getattr(deploy, 'branch_name', 'main')
-            }
-            tf_vars = {k: v for k, v in tf_vars.items() if v is not None}
-
-            tf_working_dir = os.path.join(deploy_data["absolute_path"], "terraform")
-            tf = Terraform(working_dir=tf_working_dir)
-
-            # Run setup_backend.sh
-            setup_script_path = os.path.join(tf_working_dir, "setup_backend.sh")
-            if os.path.exists(setup_script_path):
-                logger.info("Running setup_backend.sh script")
-                os.chmod(setup_script_path, 0o755)
-                subprocess.run(["sh", setup_script_path, deploy_data["user_github_id"]], 
-                             cwd=tf_working_dir, capture_output=True, text=True, check=True)
-
-            # logger.info("Applying Terraform configuration")
-            # return_code, stdout, stderr = tf.apply(skip_plan=True, var=tf_vars, capture_output=False, auto_approve=True)
-            # if return_code != 0:
-            #     logger.error(f"Terraform apply failed. Stdout: {stdout}, Stderr: {stderr}")
-            #     raise HTTPException(status_code=500, detail=f"Failed to apply Terraform configuration: {stderr}")
-
-            # logger.info("Getting Terraform output")
-            # output = tf.output(json=True)
-            # logger.info(f"Terraform output: {output}")
-            # if not output:
-            #     logger.error("Terraform output is empty")
-            #     raise ValueError("Terraform output is empty")
-
-            # dns_load_balancer = output.get("load_balancer_dns", {}).get("value")
-            # ecr_repo_url = output.get("ecr_repo_url", {}).get("value")
-
-            # if not dns_load_balancer or not ecr_repo_url:
-            #     missing_outputs = []
-            #     if not dns_load_balancer: missing_outputs.append("load_balancer_dns")
-            #     if not ecr_repo_url: missing_outputs.append("ecr_repo_url")
-            #     logger.error(f"Missing critical Terraform outputs: {', '.join(missing_outputs)}")
-            #     raise ValueError(f"Missing critical Terraform outputs: {', '.join(missing_outputs)}")
+        # Provision infrastructure, skipping Terraform when its inputs are unchanged
+        tf_vars = {
+            "user_github_id": deploy_data["user_github_id"],
+            **self._terraform_credential_vars(credentials),
+            "repo_name": deploy.repo_name,
+            "absolute_path": deploy_data["absolute_path"].rstrip('/'),
+            "owner": deploy.owner,
+            "ecs_task_container_port": deploy_data["port"],
+            "ecs_task_host_port": deploy_data["port"],
+            "aws_region": os.environ.get('AWS_DEFAULT_REGION'),
+            "source_branch": deploy.branch or 'main'
+        }
+        tf_vars = {k: v for k, v in tf_vars.items() if v is not None}
+        fingerprint = self._terraform_fingerprint(tf_vars)
+        deploy_data["terraform_fingerprint"] = fingerprint
 
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Error running setup_backend.sh: {e.stderr}")
-            raise ValueError(f"Error running setup_backend.sh: {e.stderr}")
-        except Exception as e:
-            logger.error(f"Error initializing or applying Terraform: {str(e)}")
-            raise ValueError(f"Error initializing or applying Terraform: {str(e)}")
+        outputs, deploy_data["terraform_skipped"] = await self._provision_infrastructure(deploy_data, tf_vars, force_terraform)
+        if deploy_data["terraform_skipped"]:
+            logger.info(f"Terraform inputs unchanged for {deploy.owner}/{deploy.repo_name} ({fingerprint[:12]}); reusing outputs")
 
-        deploy_data["load_balancer_url"] = "http://flask-test-deploy-d4b48c6d1ce81d5e.elb.us-east-1.amazonaws.com"
-        deploy_data["ecr_repo_url"] = "058264170818.dkr.ecr.us-east-1.amazonaws.com/flask-test-deploy-119636436"
+        deploy_data["terraform_outputs"] = outputs
+        deploy_data["load_balancer_url"] = f"http://{outputs['load_balancer_dns']}"
+        deploy_data["ecr_repo_url"] = outputs["ecr_repo_url"]
 
-        # Start CodeBuild process
+        # Build the image, or roll it out directly when this commit was already built with the same settings
+        deploy_data["image_tag"] = self._image_tag(deploy_data["commit_sha"], deploy_data)
         try:
-            codebuild_project_name = f"{user.github_id}-{deploy.repo_name}-codebuild"
-            source_branch_for_codebuild = getattr(deploy, 'branch_name', 'main')
-
-            logger.info(f"Starting CodeBuild project: {codebuild_project_name}")
-            buildspec_file_path = os.path.join(deploy_data["absolute_path"],"buildspec.yml")
-            buildspec_content = ""
-            if os.path.exists(buildspec_file_path):
-                with open(buildspec_file_path, "r") as f:
-                    buildspec_content = f.read()
-            else:
-                logger.warning(f"buildspec.yml not found at {buildspec_file_path}. CodeBuild might use project default.")
-
-            build_response = self.codebuild_service.start_build(
-                project_name=codebuild_project_name,
-                ecr_repo_url=deploy_data["ecr_repo_url"],
-                source_version=source_branch_for_codebuild,
-                buildspec_content=buildspec_content,
-                port=deploy_data["port"],
-                entry_point=deploy_data["entry_point"],
-                image_tag=deployment_tag,  # Pass the unique tag to CodeBuild
-                github_username=user.github_id,  # Pass GitHub username
-                repo_name=deploy.repo_name,  # Pass repository name
-                absolute_path=deploy_data["absolute_path"].rstrip('/')
-            )
-            logger.info(f"CodeBuild started successfully: {build_response}")
-            deploy_data["codebuild_build_id"] = build_response.get('build', {}).get('id')
-            deploy_data["image_tag"] = deployment_tag  # Store the tag in deploy data
-
+            deploy_data.update(await self._build_or_reuse_image(deploy_data, credentials))
         except Exception as e:
             logger.error(f"Error starting CodeBuild build: {str(e)}")
             deploy_data["codebuild_build_id"] = None
-            deploy_data["image_tag"] = deployment_tag  # Still store the tag even if build fails
-
-        logger.info(f"Creating deployment record for {deploy.owner}/{deploy.repo_name}")
-
-        return await self.deploy_repository.create_deploy(deploy_data)
\ No newline at end of file
+            deploy_data["status"] = "failed"
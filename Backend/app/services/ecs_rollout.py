@@ -0,0 +1,73 @@
+import os
+import logging
+from typing import Dict, Optional
+from schemas.aws_credentials_schema import AWSCredentialsSchema
+from services.startup import lazy_import
+from services.metrics import instrument_boto3_client
+
+boto3 = lazy_import("boto3")
+
+logger = logging.getLogger('deploy')
+
+# Fields of describe_task_definition that register_task_definition accepts back.
+REGISTERABLE_FIELDS = (
+    "family", "taskRoleArn", "executionRoleArn", "networkMode", "containerDefinitions", "volumes",
+    "placementConstraints", "requiresCompatibilities", "cpu", "memory", "pidMode", "ipcMode",
+    "proxyConfiguration", "inferenceAccelerators", "ephemeralStorage", "runtimePlatform",
+)
+
+
+class ECSRollout:
+    """Roll a new image out to an existing ECS service without going through Terraform."""
+
+    def __init__(self, credentials: Optional[AWSCredentialsSchema] = None):
+        aws_region = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+        session_kwargs = {}
+        if credentials:
+            session_kwargs = {
+                "aws_access_key_id": credentials.aws_access_key_id,
+                "aws_secret_access_key": credentials.aws_secret_access_key,
+                "aws_session_token": credentials.aws_session_token,
+            }
+        self.ecs = instrument_boto3_client(boto3.client('ecs', region_name=aws_region, **session_kwargs))
+        self.ecr = instrument_boto3_client(boto3.client('ecr', region_name=aws_region, **session_kwargs))
+
+    def resolve_image_digest(self, ecr_repo_url: str, image_tag: str) -> str:
+        """Return the digest an ECR tag currently points at."""
+        repository_name = ecr_repo_url.split("/", 1)[1]
+        response = self.ecr.describe_images(repositoryName=repository_name, imageIds=[{"imageTag": image_tag}])
+        images = response.get("imageDetails", [])
+        if not images:
+            raise ValueError(f"Image {repository_name}:{image_tag} not found in ECR")
+        return images[0]["imageDigest"]
+
+    def find_image_digest(self, ecr_repo_url: str, image_tag: str) -> Optional[str]:
+        """Return the digest of a tagged image, or None when the tag has not been pushed yet."""
+        repository_name = ecr_repo_url.split("/", 1)[1]
+        try:
+            response = self.ecr.describe_images(repositoryName=repository_name, imageIds=[{"imageTag": image_tag}])
+        except self.ecr.exceptions.ImageNotFoundException:
+            return None
+        images = response.get("imageDetails", [])
+        return images[0]["imageDigest"] if images else None
+
+    def rollout(self, cluster: str, service: str, container_name: Optional[str], image: str) -> Dict:
+        """Register a task definition revision running `image` and point the service at it."""
+        services = self.ecs.describe_services(cluster=cluster, services=[service]).get("services", [])
+        if not services:
+            raise ValueError(f"ECS service {service} not found in cluster {cluster}")
+        current = self.ecs.describe_task_definition(taskDefinition=services[0]["taskDefinition"])["taskDefinition"]
+
+        task_definition = {field: current[field] for field in REGISTERABLE_FIELDS if current.get(field)}
+        containers = task_definition["containerDefinitions"]
+        target = next((c for c in containers if c["name"] == container_name), containers[0])
+        target["image"] = image
+
+        registered = self.ecs.register_task_definition(**task_definition)["taskDefinition"]
+        self.ecs.update_service(cluster=cluster, service=service, taskDefinition=registered["taskDefinitionArn"])
+        logger.info(f"Rolled out {image} to {cluster}/{service} as {registered['taskDefinitionArn']}")
+        return {
+            "task_definition_arn": registered["taskDefinitionArn"],
+            "task_definition_revision": registered["revision"],
+            "previous_task_definition_arn": current["taskDefinitionArn"],
+        }
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from services.git_repository import GitRepositoryService
+from services.repository_tree import RepositoryTreeIndex
+
+logger = logging.getLogger('deploy')
+
+PYTHON_MANIFESTS = ("requirements.txt", "pyproject.toml", "Pipfile")
+MANIFESTS = PYTHON_MANIFESTS + ("package.json", "pom.xml", "build.gradle", "composer.json")
+
+# Dependency markers per framework, checked in order so more specific frameworks win
+# (e.g. nestjs ships express, next ships react).
+PYTHON_MARKERS = [("django", "django"), ("fastapi", "fastapi"), ("flask", "flask")]
+NODE_MARKERS = [
+    ("nestjs", "@nestjs/core"),
+    ("next", "next"),
+    ("angular", "@angular/core"),
+    ("vue", "vue"),
+    ("react", "react"),
+    ("express", "express"),
+]
+
+# Common entry points tried when the frameworks.json default is not in the repository.
+ENTRY_POINT_CANDIDATES = {
+    "flask": ["app.py", "main.py", "wsgi.py", "run.py", "application.py", "app/__init__.py"],
+    "fastapi": ["main.py", "app/main.py", "app.py", "src/main.py"],
+    "django": ["manage.py"],
+    "express": ["app.js", "index.js", "server.js", "src/app.js", "src/index.js", "src/server.js"],
+    "nestjs": ["src/main.ts"],
+    "react": ["src/index.js", "src/index.jsx", "src/index.tsx", "src/main.jsx", "src/main.tsx"],
+    "angular": ["src/main.ts"],
+    "vue": ["src/main.js", "src/main.ts"],
+    "next": ["pages/index.js", "pages/index.tsx", "app/page.js", "app/page.tsx"],
+    "laravel": ["public/index.php"],
+}
+
+
+class DetectionCache:
+    """Small LRU of detection results keyed by (repository, commit SHA, root folder)."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: Tuple[str, str, str], result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+detection_cache = DetectionCache()
+
+
+class FrameworkDetector:
+    """Infer framework, entry point and port from manifest files without cloning the repository."""
+
+    def __init__(self, git_repository_service: GitRepositoryService, framework_config: Dict):
+        self.git_repository_service = git_repository_service
+        self.framework_config = framework_config
+
+    async def detect(self, owner: str, repo_name: str, access_token: str, branch: Optional[str] = None, sha: str = "", root_folder_path: str = "") -> Dict[str, Any]:
+        """Detect the framework of the application under `root_folder_path`."""
+        # Cached results are shared across users, so the caller's access is checked first
+        denied = await self.git_repository_service.check_repository_access(owner, repo_name, access_token)
+        if denied:
+            return denied
+        if not sha:
+            if not branch:
+                return {"error": "Either a SHA or a branch is required"}
+            commit = await self.git_repository_service.get_latest_commit(owner, repo_name, branch, access_token)
+            if "error" in commit:
+                return commit
+            sha = commit.get("sha")
+            if not sha:
+                return {"error": "No SHA found in commit data"}
+
+        root = root_folder_path.strip("/")
+        cache_key = (f"{owner.lower()}/{repo_name.lower()}", sha, root)
+        cached = detection_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        index = await self.git_repository_service.get_tree_index(owner, repo_name, access_token, sha=sha)
+        if isinstance(index, dict):
+            return index
+        if not index.is_dir(root):
+            return {"error": f"Root folder not found: {root_folder_path}"}
+
+        manifests = await self._read_manifests(owner, repo_name, access_token, index, root)
+        candidates = self._match_frameworks(manifests)
+
+        result: Dict[str, Any] = {
+            "commit_sha": sha,
+            "root_folder_path": root,
+            "framework": None,
+            "candidates": [framework for framework, _ in candidates],
+            "manifests": sorted(manifests),
+        }
+        if candidates:
+            framework, manifest = candidates[0]
+            result.update(self._framework_defaults(framework, index, root, manifests))
+            result["manifest"] = manifest
+            logger.info(f"Detected {framework} for {owner}/{repo_name}@{sha[:7]} in '{root}' from {manifest}")
+        else:
+            logger.info(f"No supported framework detected for {owner}/{repo_name}@{sha[:7]} in '{root}'")
+
+        detection_cache.put(cache_key, result)
+        return result
+
+    async def _read_manifests(self, owner: str, repo_name: str, access_token: str, index: RepositoryTreeIndex, root: str) -> Dict[str, str]:
+        """Fetch every manifest present under the root folder concurrently."""
+        entries = [entry for entry in (index.get(self._join(root, name)) for name in MANIFESTS) if entry and entry["type"] == "blob"]
+        contents = await asyncio.gather(*(
+            self.git_repository_service.get_blob_content(owner, repo_name, entry["sha"], access_token)
+            for entry in entries
+        ))
+        manifests = {}
+        for entry, content in zip(entries, contents):
+            if isinstance(content, dict):
+                logger.warning(f"Could not read {entry['path']}: {content.get('error')}")
+                continue
+            manifests[entry["name"]] = content
+        return manifests
+
+    def _match_frameworks(self, manifests: Dict[str, str]) -> List[Tuple[str, str]]:
+        """Return (framework, manifest) pairs in order of confidence."""
+        matches: List[Tuple[str, str]] = []
+
+        for manifest in PYTHON_MANIFESTS:
+            if manifest not in manifests:
+                continue
+            packages = self._python_packages(manifests[manifest])
+            for framework, marker in PYTHON_MARKERS:
+                if marker in packages:
+                    matches.append((framework, manifest))
+
+        if "package.json" in manifests:
+            dependencies = self._node_dependencies(manifests["package.json"])
+            for framework, marker in NODE_MARKERS:
+                if marker in dependencies:
+                    matches.append((framework, "package.json"))
+
+        for manifest in ("pom.xml", "build.gradle"):
+            if manifest in manifests and "spring-boot" in manifests[manifest]:
+                matches.append(("spring-boot", manifest))
+
+        if "composer.json" in manifests and "laravel/framework" in manifests["composer.json"]:
+            matches.append(("laravel", "composer.json"))
+
+        unique: List[Tuple[str, str]] = []
+        for framework, manifest in matches:
+            if framework not in (existing for existing, _ in unique):
+                unique.append((framework, manifest))
+        return unique
+
+    def _framework_defaults(self, framework: str, index: RepositoryTreeIndex, root: str, manifests: Dict[str, str]) -> Dict[str, Any]:
+        """Merge frameworks.json defaults with an entry point found in the tree."""
+        framework_type = "backend" if framework in self.framework_config.get("backend", {}) else "frontend"
+        defaults = self.framework_config.get(framework_type, {}).get(framework, {})
+
+        entry_point = None
+        candidates = [defaults.get("entry_point")] + ENTRY_POINT_CANDIDATES.get(framework, [])
+        if framework == "express":
+            candidates.insert(0, self._package_main(manifests.get("package.json", "")))
+        for candidate in candidates:
+            if candidate and index.exists(self._join(root, candidate)):
+                entry_point = candidate
+                break
+        if entry_point is None and framework == "spring-boot":
+            matches = index.glob(self._join(root, "src/main/java/**/*Application.java"))
+            if matches:
+                entry_point = matches[0]["path"][len(root) + 1 if root else 0:]
+
+        port = defaults.get("port")
+        return {
+            "framework": framework,
+            "framework_type": framework_type,
+            "app_entry_point": entry_point or defaults.get("entry_point"),
+            "entry_point_found": entry_point is not None,
+            "port": int(port) if port else None,
+            "build_command": defaults.get("build_command"),
+            "run_command": defaults.get("run_command"),
+        }
+
+    @staticmethod
+    def _join(root: str, path: str) -> str:
+        return f"{root}/{path}" if root else path
+
+    @staticmethod
+    def _python_packages(content: str) -> set:
+        """Collect lower-cased package names referenced by a Python manifest."""
+        return {match.lower() for match in re.findall(r"(?im)^[\s\"']*([a-z0-9][a-z0-9._-]*)", content)} | \
+            {match.lower() for match in re.findall(r"[\"']([a-zA-Z0-9][a-zA-Z0-9._-]*)(?:\[[^\]]*\])?\s*[<>=~!; \"']", content)}
+
+    @staticmethod
+    def _node_dependencies(content: str) -> set:
+        try:
+            package = json.loads(content)
+        except json.JSONDecodeError:
+            return set()
+        dependencies = set()
+        for key in ("dependencies", "devDependencies", "peerDependencies"):
+            dependencies.update((package.get(key) or {}).keys())
+        return dependencies
+
+    @staticmethod
+    def _package_main(content: str) -> Optional[str]:
+        try:
+            return json.loads(content).get("main") if content else None
+        except (json.JSONDecodeError, AttributeError):
+            return None
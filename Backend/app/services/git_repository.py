@@ -1,4 +1,8 @@
+import asyncio
+import base64
+import hashlib
 import os
+import shutil
 import subprocess
 from typing import List, Optional, Dict, Any, Union
 import logging
@@ -8,17 +12,53 @@ from pathlib import Path
 import httpx
 from httpx import AsyncClient, HTTPStatusError
 
+from repositories.cache import MISSING, TTLCache
 from repositories.git_repository import GitRepository
 from schemas.repository import RepositorySchema
 from services.user import UserService
+from services.repository_tree import RepositoryTreeIndex, TreeIndexCache
+from services.workspace import WorkspaceService
+from services.repository_lock import RepositoryLockLost, RepositoryLockTimeout, repository_locks
 from config.settings import Settings
+from services.metrics import observe_dependency
 logger = logging.getLogger('git')
 
+# Tree indexes are keyed by repository and immutable SHA, so one cache is shared by every request;
+# callers are checked against repository_access_cache before a hit is served.
+tree_index_cache = TreeIndexCache(max_entries=Settings.TREE_INDEX_CACHE_SIZE)
+# Whether a token can read a repository, keyed by (token digest, owner, repo); denials are negative entries.
+repository_access_cache = TTLCache(
+    "repository_access",
+    max_entries=Settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=Settings.AUTH_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=Settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
+# GitHub lists at most this many commits in a push payload; longer pushes are diffed with the compare API.
+PUSH_PAYLOAD_COMMIT_LIMIT = 20
+# The compare API lists at most this many files.
+COMPARE_FILE_LIMIT = 300
+NULL_SHA = "0" * 40
+
+
+def _github_operation(method: str, endpoint: str) -> str:
+    """Metric label for a GitHub endpoint with owner, repository and SHAs left out, e.g. 'GET repos/compare'."""
+    segments = endpoint.strip("/").split("/")
+    # /repos/{owner}/{repo}/<resource>/... and /users/{owner}/<resource>
+    if segments[0] == "repos":
+        resource = segments[3:4]
+    elif segments[0] == "users":
+        resource = segments[2:3]
+    else:
+        resource = []
+    return f"{method.upper()} " + "/".join([segments[0], *resource])
+
 class GitRepositoryService:
     """Service for interacting with Git repositories (primarily GitHub)."""
     
-    def __init__(self, git_repository: GitRepository):
+    def __init__(self, git_repository: GitRepository, workspace_service: Optional[WorkspaceService] = None):
         self.git_repository = git_repository
+        self.workspace_service = workspace_service
         # Read from environment variable with fallbacks
         self.dir_base = Settings.DIR_BASE or "/tmp/mnt/repos"
         self.base_url = "https://api.github.com"
@@ -27,6 +67,8 @@ class GitRepositoryService:
         logger.info(f"Initializing GitRepositoryService with base directory: {self.dir_base}")
         # Ensure the base directory exists and has proper permissions
         self._ensure_base_directory()
+        if self.workspace_service:
+            self.workspace_service.dir_base = self.dir_base
     
     def _get_base_directory(self) -> str:
         dir_base = os.getenv("DIR_BASE")
@@ -67,31 +109,33 @@ class GitRepositoryService:
     ) -> Dict[str, Any]:
         """Make a request to the GitHub API with error handling."""
         headers = {
-            "Authorization": f"token {access_token}",
             "Accept": "application/vnd.github.v3+json",
             "X-GitHub-Api-Version": "2022-11-28"
         }
+        if access_token:
+            headers["Authorization"] = f"token {access_token}"
         
         try:
             async with AsyncClient() as client:
-                if method.lower() == "get":
-                    resp = await client.get(
-                        f"{self.base_url}{endpoint}",
-                        headers=headers,
-                        params=params
-                    )
-                elif method.lower() == "post":
-                    resp = await client.post(
-                        f"{self.base_url}{endpoint}",
-                        headers=headers,
-                        params=params,
-                        json=json_data
-                    )
-                else:
-                    return {"error": f"Unsupported HTTP method: {method}"}
+                with observe_dependency("github", _github_operation(method, endpoint)):
+                    if method.lower() == "get":
+                        resp = await client.get(
+                            f"{self.base_url}{endpoint}",
+                            headers=headers,
+                            params=params
+                        )
+                    elif method.lower() == "post":
+                        resp = await client.post(
+                            f"{self.base_url}{endpoint}",
+                            headers=headers,
+                            params=params,
+                            json=json_data
+                        )
+                    else:
+                        return {"error": f"Unsupported HTTP method: {method}"}
                     
-                resp.raise_for_status()
-                return resp.json()
+                    resp.raise_for_status()
+                    return resp.json()
                 
         except HTTPStatusError as e:
             status_code = e.response.status_code
@@ -158,25 +202,157 @@ class GitRepositoryService:
             "get", f"/repos/{owner}/{repo_name}/commits/{branch}", access_token
         )
 
-    async def get_blob_tree(self, owner: str, repo_name: str, branch: str, access_token: str, sha: str = "") -> Union[List[Dict[str, Any]], Dict[str, Any]]:
-        """Get the directory tree for a repository."""
+    async def check_repository_access(self, owner: str, repo_name: str, access_token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Return an error when the token cannot read the repository, None when it can.
+        Must be called before serving anything cached across users for a repository.
+        """
+        key = (hashlib.sha256((access_token or "").encode()).hexdigest(), owner.lower(), repo_name.lower())
+        cached = repository_access_cache.get(key)
+        if cached is MISSING:
+            response = await self._make_github_request("get", f"/repos/{owner}/{repo_name}", access_token)
+            cached = None if "error" in response else True
+            repository_access_cache.set(key, cached)
+        if cached is None:
+            return {"error": "Resource not found or you don't have permission to access it"}
+        return None
+
+    async def get_changed_paths(self, owner: str, repo_name: str, push: Dict[str, Any], access_token: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Paths added, modified or removed by a push event, or None when they cannot be
+        determined, e.g. for a new branch or a diff too large to list.
+        """
+        before, after = push.get("before"), push.get("after")
+        commits = push.get("commits") or []
+        if commits and len(commits) < PUSH_PAYLOAD_COMMIT_LIMIT and not push.get("forced"):
+            paths = set()
+            for commit in commits:
+                for key in ("added", "modified", "removed"):
+                    paths.update(commit.get(key) or [])
+            return sorted(paths)
+        if not before or not after or before == NULL_SHA:
+            return None
+        return await self.compare_commits(owner, repo_name, before, after, access_token)
+
+    async def compare_commits(self, owner: str, repo_name: str, base: str, head: str, access_token: Optional[str] = None) -> Optional[List[str]]:
+        """Paths changed between two commits, from the compare API or, failing that, the local clone."""
+        response = await self._make_github_request(
+            "get", f"/repos/{owner}/{repo_name}/compare/{base}...{head}", access_token
+        )
+        if "error" not in response:
+            files = response.get("files") or []
+            if len(files) >= COMPARE_FILE_LIMIT:
+                return None
+            paths = {file["filename"] for file in files}
+            paths.update(file["previous_filename"] for file in files if file.get("previous_filename"))
+            return sorted(paths)
+
+        clone_dir = f"{self.dir_base}/{owner}/{repo_name}"
+        try:
+            output = await self._run_git(["diff", "--name-only", "-z", base, head], cwd=clone_dir)
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.warning(f"Could not diff {base}..{head} for {owner}/{repo_name}: {response['error']}; {str(e)}")
+            return None
+        return sorted(path for path in output.split("\0") if path)
+
+    async def get_tree_index(self, owner: str, repo_name: str, access_token: str, sha: str = "", branch: Optional[str] = None) -> Union[RepositoryTreeIndex, Dict[str, Any]]:
+        """Get a recursive index of a repository tree, served from cache when the SHA was seen before."""
+        denied = await self.check_repository_access(owner, repo_name, access_token)
+        if denied:
+            return denied
         if not sha:
-            commits = await self.get_latest_commit(owner, repo_name, branch, access_token)
-            if "error" in commits:
-                return commits
-            commit_sha = commits.get("sha")
-            if not commit_sha:
+            if not branch:
+                return {"error": "Either a SHA or a branch is required"}
+            commit = await self.get_latest_commit(owner, repo_name, branch, access_token)
+            if "error" in commit:
+                return commit
+            sha = commit.get("sha")
+            if not sha:
                 return {"error": "No SHA found in commit data"}
-            sha = commit_sha
-            
-        tree_data = await self._make_github_request(
-            "get", f"/repos/{owner}/{repo_name}/git/trees/{sha}", access_token
+
+        index = tree_index_cache.get(owner, repo_name, sha)
+        if index is not None:
+            return index
+
+        index = await self._build_tree_index_from_clone(owner, repo_name, sha)
+        if index is None:
+            tree_data = await self._make_github_request(
+                "get", f"/repos/{owner}/{repo_name}/git/trees/{sha}", access_token, params={"recursive": 1}
+            )
+            if "error" in tree_data:
+                return tree_data
+            index = RepositoryTreeIndex.from_github_tree(tree_data)
+            if index.truncated:
+                logger.warning(f"GitHub truncated the recursive tree for {owner}/{repo_name}@{sha}")
+
+        tree_index_cache.put(owner, repo_name, index, sha)
+        logger.info(f"Indexed {len(index)} tree entries for {owner}/{repo_name}@{sha}")
+        return index
+
+    async def _build_tree_index_from_clone(self, owner: str, repo_name: str, sha: str) -> Optional[RepositoryTreeIndex]:
+        """Build a tree index with `git ls-tree` when the SHA is present in a local clone."""
+        clone_dir = f"{self.dir_base}/{owner}/{repo_name}"
+        if not os.path.isdir(os.path.join(clone_dir, ".git")):
+            return None
+        try:
+            tree_sha = (await self._run_git(["rev-parse", "--verify", "--quiet", f"{sha}^{{tree}}"], cwd=clone_dir)).strip()
+            output = await self._run_git(["ls-tree", "-r", "-t", "-l", "-z", "--full-tree", tree_sha], cwd=clone_dir)
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.info(f"Local clone of {owner}/{repo_name} cannot resolve {sha}, using GitHub API: {e}")
+            return None
+        return RepositoryTreeIndex.from_ls_tree(tree_sha, output)
+
+    async def _run_git(self, args: List[str], cwd: str) -> str:
+        """Run a git command without blocking the event loop and return its stdout."""
+        with observe_dependency("subprocess", f"git {args[0]}"):
+            process = await asyncio.create_subprocess_exec(
+                "git", *args,
+                cwd=cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, ["git", *args], stdout, stderr.decode())
+        return stdout.decode()
+
+    async def get_blob_content(self, owner: str, repo_name: str, blob_sha: str, access_token: str) -> Union[str, Dict[str, Any]]:
+        """Get the text of a blob, from the local clone when it has the object."""
+        denied = await self.check_repository_access(owner, repo_name, access_token)
+        if denied:
+            return denied
+        clone_dir = f"{self.dir_base}/{owner}/{repo_name}"
+        if os.path.isdir(os.path.join(clone_dir, ".git")):
+            try:
+                return await self._run_git(["cat-file", "blob", blob_sha], cwd=clone_dir)
+            except (subprocess.CalledProcessError, OSError, UnicodeDecodeError):
+                pass
+
+        blob = await self._make_github_request(
+            "get", f"/repos/{owner}/{repo_name}/git/blobs/{blob_sha}", access_token
         )
-        
-        if "error" in tree_data:
-            return tree_data
-            
-        return [item for item in tree_data.get("tree", []) if item.get("type") == "tree"]
+        if "error" in blob:
+            return blob
+        try:
+            return base64.b64decode(blob.get("content", "")).decode("utf-8")
+        except (ValueError, UnicodeDecodeError) as e:
+            return {"error": f"Failed to decode blob {blob_sha}: {str(e)}"}
+
+    async def get_blob_tree(self, owner: str, repo_name: str, branch: str, access_token: str, sha: str = "", path: str = "") -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get the directories directly under `path` (the repository root by default)."""
+        index = await self.get_tree_index(owner, repo_name, access_token, sha=sha, branch=branch)
+        if isinstance(index, dict):
+            return index
+        if not index.is_dir(path):
+            return {"error": f"Directory not found: {path}"}
+        return index.list_dir(path, entry_type="tree")
+
+    async def glob_tree(self, owner: str, repo_name: str, branch: str, access_token: str, pattern: str, sha: str = "") -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get every tree entry matching a glob pattern."""
+        index = await self.get_tree_index(owner, repo_name, access_token, sha=sha, branch=branch)
+        if isinstance(index, dict):
+            return index
+        return index.glob(pattern)
 
     # === Webhook Management ===
     
@@ -191,9 +367,13 @@ class GitRepositoryService:
             },
             "events": ["push"]
         }
-        return await self._make_github_request(
+        result = await self._make_github_request(
             "post", f"/repos/{owner}/{repo_name}/hooks", access_token, json_data=webhook_data
         )
+        if "error" not in result and self.workspace_service:
+            # Every push pulls into the workspace, so it must outlive idle periods
+            await self.workspace_service.retain(owner, repo_name, "webhook")
+        return result
 
     # === Local Repository Management ===
     
@@ -210,9 +390,11 @@ class GitRepositoryService:
     async def delete_repo(self, owner: str, repo_name: str) -> dict:
         """Delete a repository from the filesystem."""
         try:
+            if self.workspace_service:
+                return await self.workspace_service.delete_workspace(owner, repo_name)
             repo_path = f"{self.dir_base}/{owner}/{repo_name}"
             if os.path.exists(repo_path):
-                subprocess.run(["rm", "-rf", repo_path], check=True)
+                await asyncio.to_thread(shutil.rmtree, repo_path)
                 return {"message": "Repository deleted successfully"}
             else:
                 return {"error": "Repository not found"}
@@ -231,6 +413,14 @@ class GitRepositoryService:
 
     async def clone_repository(self, owner: str, repo_name: str, access_token: str) -> dict:
         """Clone a repository to local filesystem."""
+        try:
+            async with repository_locks.hold(owner, repo_name, "clone"):
+                return await self._clone_repository(owner, repo_name, access_token)
+        except (RepositoryLockTimeout, RepositoryLockLost) as e:
+            logger.error(f"Clone of {owner}/{repo_name} skipped: {str(e)}")
+            return {"error": str(e)}
+
+    async def _clone_repository(self, owner: str, repo_name: str, access_token: str) -> dict:
         clone_url = f"https://{access_token}@github.com/{owner}/{repo_name}.git"
         clone_dir = f"{self.dir_base}/{owner}/{repo_name}"
         
@@ -246,17 +436,14 @@ class GitRepositoryService:
                 return {"message": "Repository directory already exists", "path": clone_dir}
             
             logger.info(f"Cloning repository to {clone_dir}")
-            # Clone the repository
-            result = subprocess.run(
-                ["git", "clone", clone_url, clone_dir],
-                check=True,
-                capture_output=True,
-                text=True
-            )
+            # Clone the repository; the loop keeps running so the lock heartbeat does too
+            await self._run_git(["clone", clone_url, clone_dir], cwd=os.path.dirname(clone_dir))
             
             # Set proper permissions for the cloned repository
             os.chmod(clone_dir, 0o755)
             
+            if self.workspace_service:
+                await self.workspace_service.touch(owner, repo_name)
             logger.info(f"Successfully cloned repository to {clone_dir}")
             return {"message": "Repository cloned successfully", "path": clone_dir}
             
@@ -269,8 +456,21 @@ class GitRepositoryService:
             logger.error(error_msg)
             return {"error": error_msg}
 
+    async def get_head_sha(self, owner: str, repo_name: str) -> str:
+        """Return the commit checked out in a cloned repository."""
+        clone_dir = f"{self.dir_base}/{owner}/{repo_name}"
+        return (await self._run_git(["rev-parse", "HEAD"], cwd=clone_dir)).strip()
+
     async def pull_repository(self, owner: str, repo_name: str, access_token: Optional[str] = None) -> Dict[str, Any]:
         """Pull the latest changes for a cloned repository."""
+        try:
+            async with repository_locks.hold(owner, repo_name, "pull"):
+                return await self._pull_repository(owner, repo_name, access_token)
+        except (RepositoryLockTimeout, RepositoryLockLost) as e:
+            logger.error(f"Pull of {owner}/{repo_name} skipped: {str(e)}")
+            return {"error": str(e)}
+
+    async def _pull_repository(self, owner: str, repo_name: str, access_token: Optional[str] = None) -> Dict[str, Any]:
         clone_dir = f"{self.dir_base}/{owner}/{repo_name}"
         
         if not os.path.exists(clone_dir):
@@ -279,40 +479,17 @@ class GitRepositoryService:
             return {"error": error_msg}
         
         try:
-            original_dir = os.getcwd()
-            os.chdir(clone_dir)
-            
             # If access_token is provided, configure git credentials
             if access_token:
-                subprocess.run(
-                    ["git", "config", "credential.helper", "store"],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-                subprocess.run(
-                    ["git", "config", "credential.https://github.com.username", "x-access-token"],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-                subprocess.run(
-                    ["git", "config", "credential.https://github.com.password", access_token],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-            
-            result = subprocess.run(
-                ["git", "pull"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            os.chdir(original_dir)
+                await self._run_git(["config", "credential.helper", "store"], cwd=clone_dir)
+                await self._run_git(["config", "credential.https://github.com.username", "x-access-token"], cwd=clone_dir)
+                await self._run_git(["config", "credential.https://github.com.password", access_token], cwd=clone_dir)
+
+            output = await self._run_git(["pull"], cwd=clone_dir)
+            if self.workspace_service:
+                await self.workspace_service.touch(owner, repo_name)
             logger.info(f"Successfully pulled repository at {clone_dir}")
-            return {"message": "Repository pulled successfully", "output": result.stdout}
+            return {"message": "Repository pulled successfully", "output": output}
             
         except subprocess.CalledProcessError as e:
             error_msg = f"Pull failed: {e.stderr}"
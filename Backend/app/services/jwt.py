@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
-from jose import jwt
 from config.settings import settings
+from services.startup import lazy_import
+
+jwt = lazy_import("jose.jwt")
 
 def create_access_token(data: dict):
     expire = datetime.utcnow() + timedelta(days=30)
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+from config.settings import Settings
+from dependencies.shared_state import get_shared_state
+from interfaces.shared_state_interface import SharedStateInterface
+
+logger = logging.getLogger('api')
+
+HOSTNAME = socket.gethostname()
+# Identifies this process among every uvicorn worker and ECS task holding leases
+WORKER_ID = f"{HOSTNAME}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Every leader loop started in this process, by lease name
+leader_loops: Dict[str, "LeaderLoop"] = {}
+
+
+class LeaderLoop:
+    """
+    Run a background loop in exactly one worker across every process and replica.
+
+    Each worker competes for the named lease. The holder runs the loop and renews the lease
+    every `renew_seconds`; the others retry on the same cadence, so a new leader takes over
+    within `ttl_seconds` of one dying. When the lease cannot be renewed before it expires,
+    the loop is cancelled before another worker can start its own copy.
+    """
+
+    def __init__(self, name: str, loop: Callable[[], Awaitable], shared_state: Optional[SharedStateInterface] = None,
+                 ttl_seconds: Optional[float] = None, renew_seconds: Optional[float] = None, holder: str = WORKER_ID):
+        self.name = name
+        self.holder = holder
+        self.loop = loop
+        self.shared_state = shared_state
+        self.ttl = Settings.LEADER_LEASE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.renew_interval = Settings.LEADER_LEASE_RENEW_SECONDS if renew_seconds is None else renew_seconds
+        self.token: Optional[int] = None
+        self.terms = 0
+        leader_loops[name] = self
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None
+
+    async def run(self) -> None:
+        shared_state = self.shared_state or get_shared_state()
+        while True:
+            try:
+                token = await shared_state.acquire_lease(self.name, self.holder, self.ttl)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Could not acquire the {self.name} lease: {e}")
+                token = None
+            if token is None:
+                await asyncio.sleep(self.renew_interval)
+                continue
+            await self._lead(shared_state, token)
+
+    async def _lead(self, shared_state: SharedStateInterface, token: int) -> None:
+        self.token = token
+        self.terms += 1
+        expires = time.monotonic() + self.ttl
+        logger.info(f"Leading {self.name} with fencing token {token}")
+        task = asyncio.create_task(self.loop())
+        try:
+            while True:
+                await asyncio.wait([task], timeout=self.renew_interval)
+                if task.done():
+                    task.result()  # surfaces the error of a loop that should never return
+                    return
+                started = time.monotonic()
+                try:
+                    renewed = await shared_state.renew_lease(self.name, self.holder, token, self.ttl)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Could not renew the {self.name} lease: {e}")
+                    # Keep leading only while the lease is sure to outlast the next attempt
+                    if time.monotonic() + self.renew_interval < expires:
+                        continue
+                    renewed = False
+                if not renewed:
+                    logger.warning(f"Lost the {self.name} lease; stopping the loop")
+                    return
+                expires = started + self.ttl
+        except Exception as e:
+            logger.error(f"Leader loop {self.name} failed: {e}")
+        finally:
+            task.cancel()
+            self.token = None
+            try:
+                await asyncio.shield(shared_state.release_lease(self.name, self.holder, token))
+            except Exception:
+                pass  # it expires on its own
+
+    def stats(self) -> Dict:
+        return {"name": self.name, "leader": self.is_leader, "token": self.token, "terms": self.terms}
+
+
+def get_leader_stats() -> List[Dict]:
+    return [loop.stats() for loop in leader_loops.values()]
+
+
+class SharedSignal:
+    """
+    Wake a loop that may be running in another worker.
+
+    notify() sets a local event, which wakes a waiter in the same process at once, and bumps
+    a shared counter without waiting for the write. wait() watches both, reading the counter
+    every `poll_seconds`, so a leader in another process wakes within that time.
+    """
+
+    def __init__(self, name: str):
+        self.key = f"signal:{name}"
+        self._event = asyncio.Event()
+        self._seen: Optional[int] = None
+        self._writes = set()
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    def notify(self) -> None:
+        self._event.set()
+        try:
+            write = asyncio.get_running_loop().create_task(get_shared_state().incr(self.key))
+        except RuntimeError:
+            return  # no running loop, so no other waiter to reach from here
+        self._writes.add(write)
+        write.add_done_callback(self._written)
+
+    def _written(self, write: asyncio.Task) -> None:
+        self._writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            logger.warning(f"Could not publish {self.key}: {write.exception()}")
+
+    async def _counter(self) -> Optional[int]:
+        try:
+            return await get_shared_state().get(self.key)
+        except Exception as e:
+            logger.warning(f"Could not read {self.key}: {e}")
+            return self._seen
+
+    async def wait(self, timeout: float, poll_seconds: Optional[float] = None) -> bool:
+        """Return True when notified within `timeout` seconds, False otherwise."""
+        poll_seconds = Settings.SHARED_SIGNAL_POLL_SECONDS if poll_seconds is None else poll_seconds
+        deadline = time.monotonic() + timeout
+        if self._seen is None:
+            self._seen = await self._counter()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=min(remaining, poll_seconds))
+                self._seen = await self._counter()
+                return True
+            except asyncio.TimeoutError:
+                counter = await self._counter()
+                if counter != self._seen:
+                    self._seen = counter
+                    return True
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+import logging
+
+from config.settings import Settings
+from services.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = logging.getLogger('api')
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACK_DEPTH = 40
+# FastAPI frames whose callee is the endpoint or dependency being run
+FASTAPI_CALLERS = {"run_endpoint_function", "solve_dependencies", "_solve_generator"}
+
+
+def _is_app_file(filename: str) -> bool:
+    return filename.startswith(APP_ROOT) and "site-packages" not in filename
+
+
+class LoopWatchdog:
+    """
+    Detect callbacks that block the event loop.
+
+    A heartbeat coroutine sleeps for `interval` seconds at a time and records how late it
+    wakes up. A watchdog thread checks the heartbeat just as often; once it is more than
+    `threshold` seconds overdue the loop is still blocked, so the thread captures the loop
+    thread's stack at that moment and attributes it to the route and the endpoint or
+    dependency on it. When the heartbeat finally runs, the stall is recorded with its full
+    duration in a bounded ring. Between stalls the cost is two wakeups per interval.
+    """
+
+    def __init__(self, threshold_seconds: float, interval_seconds: float, capacity: int):
+        self.threshold = threshold_seconds
+        self.interval = interval_seconds
+        self.stalls: Deque[Dict] = deque(maxlen=capacity)
+        self.stalls_total = 0
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._due = 0.0
+        self._captured_due: Optional[float] = None
+        self._pending: Optional[Dict] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start watching the running event loop; call from a coroutine on that loop."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._due = time.monotonic() + self.interval
+        self._stop.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._heartbeat_task.cancel()
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, self._due - time.monotonic()))
+            lag = max(0.0, time.monotonic() - self._due)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self._record(lag)
+            self._due = time.monotonic() + self.interval
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            due = self._due
+            overdue = time.monotonic() - due
+            if overdue < self.threshold or self._captured_due == due:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stall = self._describe(frame, overdue)
+            del frame
+            with self._lock:
+                # The heartbeat may have run while the stack was being read
+                if self._due == due:
+                    self._captured_due = due
+                    self._pending = stall
+
+    def _record(self, lag: float) -> None:
+        with self._lock:
+            stall = self._pending or {
+                "route": None,
+                "handler": None,
+                "location": None,
+                "stack": None,  # ended before the watchdog sampled it
+            }
+            self._pending = None
+        stall["duration_ms"] = round(lag * 1000, 1)
+        stall["ended_at"] = datetime.now(timezone.utc).isoformat()
+        self.stalls.append(stall)
+        self.stalls_total += 1
+        self.max_lag = max(self.max_lag, lag)
+        EVENT_LOOP_STALLS.labels(stall["route"] or "background").inc()
+        logger.warning(
+            f"Event loop blocked for {stall['duration_ms']} ms "
+            f"in {stall['handler'] or 'unknown handler'} ({stall['route'] or 'background'}) at {stall['location'] or 'unknown location'}"
+        )
+
+    def _describe(self, frame, overdue: float) -> Dict:
+        """Attribute a stack to a route, the endpoint or dependency on it and the innermost app frame."""
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()  # outermost first
+
+        route = handler = location = None
+        for position, current in enumerate(frames):
+            code = current.f_code
+            if code.co_name == "app" and code.co_filename.endswith(os.path.join("fastapi", "routing.py")):
+                request = current.f_locals.get("request")
+                scope_route = request.scope.get("route") if request is not None else None
+                if scope_route is not None:
+                    route = f"{request.method} {scope_route.path}"
+            elif code.co_name in FASTAPI_CALLERS and position + 1 < len(frames):
+                callee = frames[position + 1].f_code
+                handler = f"{callee.co_filename.rsplit(os.sep, 1)[-1]}:{callee.co_qualname}"
+            if _is_app_file(code.co_filename):
+                location = f"{os.path.relpath(code.co_filename, APP_ROOT)}:{current.f_lineno} in {code.co_qualname}"
+
+        stack = traceback.format_list(traceback.extract_stack(frames[-1], limit=STACK_DEPTH))
+        return {
+            "route": route,
+            "handler": handler,
+            "location": location,
+            "detected_after_ms": round(overdue * 1000, 1),
+            "stack": [line.rstrip() for line in stack],
+        }
+
+    def stats(self, limit: Optional[int] = None) -> Dict:
+        recent: List[Dict] = list(self.stalls)[::-1]
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "interval_ms": self.interval * 1000,
+            "stalls_total": self.stalls_total,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "recent": recent[:limit] if limit else recent,
+        }
+
+
+loop_watchdog = LoopWatchdog(
+    Settings.LOOP_STALL_THRESHOLD_SECONDS,
+    Settings.LOOP_WATCHDOG_INTERVAL_SECONDS,
+    Settings.LOOP_STALL_RING_SIZE,
+)
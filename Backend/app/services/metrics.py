@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+
+# Metrics are scraped from /metrics; there is no exporter thread, and every hook below
+# only reads the clock and updates a counter, so the overhead per call is a few microseconds.
+
+REQUEST_LATENCY = Histogram(
+    "easy_deploy_http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+)
+DEPENDENCY_LATENCY = Histogram(
+    "easy_deploy_dependency_duration_seconds",
+    "Latency of outbound calls to GitHub, AWS, MongoDB and subprocesses",
+    ["dependency", "operation", "outcome"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+DEPENDENCY_ERRORS = Counter(
+    "easy_deploy_dependency_errors_total",
+    "Failed outbound calls by dependency and operation",
+    ["dependency", "operation"],
+)
+IN_FLIGHT_DEPLOYS = Gauge(
+    "easy_deploy_in_flight_deploys",
+    "Deploys being provisioned by this process, or whose CodeBuild build has not finished",
+    ["stage"],
+)
+WEBHOOK_REBUILDS = Gauge(
+    "easy_deploy_webhook_rebuilds",
+    "Push-triggered rebuilds waiting for a concurrency slot or running",
+    ["state"],
+)
+EVENT_LOOP_LAG = Histogram(
+    "easy_deploy_event_loop_lag_seconds",
+    "How late the event loop watchdog's heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+EVENT_LOOP_STALLS = Counter(
+    "easy_deploy_event_loop_stalls_total",
+    "Callbacks that blocked the event loop longer than LOOP_STALL_THRESHOLD_SECONDS, by route",
+    ["route"],
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serialize every metric in the Prometheus text format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def observe_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """Time an outbound call; usable around both blocking and awaited code."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        DEPENDENCY_ERRORS.labels(dependency, operation).inc()
+        raise
+    finally:
+        DEPENDENCY_LATENCY.labels(dependency, operation, outcome).observe(time.perf_counter() - started)
+
+
+def instrument_boto3_client(client):
+    """Time every API call a boto3 client makes through botocore's event hooks."""
+    service = client.meta.service_model.service_name
+
+    def before_call(model, context, **kwargs):
+        context["metrics_started"] = time.perf_counter()
+
+    def record(model, context, outcome: str) -> None:
+        started = context.pop("metrics_started", None)
+        operation = f"{service}.{model.name}"
+        if outcome == "error":
+            DEPENDENCY_ERRORS.labels("aws", operation).inc()
+        if started is not None:
+            DEPENDENCY_LATENCY.labels("aws", operation, outcome).observe(time.perf_counter() - started)
+
+    def after_call(model, context, http_response=None, **kwargs):
+        # AWS error responses arrive here too; only connection failures raise after-call-error
+        failed = http_response is not None and http_response.status_code >= 300
+        record(model, context, "error" if failed else "ok")
+
+    def after_call_error(model, context, **kwargs):
+        record(model, context, "error")
+
+    client.meta.events.register("before-call", before_call)
+    client.meta.events.register("after-call", after_call)
+    client.meta.events.register("after-call-error", after_call_error)
+    return client
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Record the latency of every MongoDB command by collection and command name."""
+
+    def __init__(self):
+        self._operations: Dict[Tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        operation = f"{collection}.{event.command_name}" if isinstance(collection, str) else event.command_name
+        with self._lock:
+            self._operations[(event.request_id, event.operation_id)] = operation
+
+    def _finish(self, event, outcome: str) -> None:
+        with self._lock:
+            operation = self._operations.pop((event.request_id, event.operation_id), event.command_name)
+        if outcome == "error":
+            DEPENDENCY_ERRORS.labels("mongodb", operation).inc()
+        DEPENDENCY_LATENCY.labels("mongodb", operation, outcome).observe(event.duration_micros / 1_000_000)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by route template, so path parameters don't explode cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
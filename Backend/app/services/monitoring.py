@@ -1,14 +1,18 @@
-import boto3
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
 
+from services.startup import lazy_import
+from services.metrics import instrument_boto3_client
+
+boto3 = lazy_import("boto3")
+
 logger = logging.getLogger('monitoring')
 
 class MonitoringService:
     def __init__(self):
-        self.cloudwatch = boto3.client('cloudwatch')
-        self.ecs = boto3.client('ecs')
+        self.cloudwatch = instrument_boto3_client(boto3.client('cloudwatch'))
+        self.ecs = instrument_boto3_client(boto3.client('ecs'))
 
     async def get_cluster_metrics(self, cluster_name: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> Dict:
         """Get metrics for an ECS cluster."""
@@ -211,12 +215,15 @@ class MonitoringService:
                 return {'error': 'Service not found'}
 
             service = response['services'][0]
+            # DescribeServices has no service-level update time; the primary deployment's is the latest change
+            deployments = service.get('deployments') or []
+            last_updated = deployments[0].get('updatedAt') if deployments else None
             return {
                 'status': service['status'],
                 'running_count': service['runningCount'],
                 'desired_count': service['desiredCount'],
                 'pending_count': service['pendingCount'],
-                'last_updated': service['lastUpdated'].isoformat(),
+                'last_updated': (last_updated or service.get('createdAt')).isoformat(),
                 'events': service.get('events', [])[:5]  # Last 5 events
             }
         except Exception as e:
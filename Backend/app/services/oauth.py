@@ -2,6 +2,8 @@ import httpx
 from config.settings import settings
 import logging
 
+logger = logging.getLogger('api')
+
 async def get_github_user(code: str):
     async with httpx.AsyncClient() as client:
         try:
@@ -21,21 +23,21 @@ async def get_github_user(code: str):
             
             # Check for HTTP error and log response for debugging
             if token_resp.status_code != 200:
-                print(f"GitHub OAuth token request failed with status {token_resp.status_code}: {token_resp.text}")
-                print(f"Request data: client_id={settings.CLIENT_ID}, redirect_uri={settings.REDIRECT_URI}")
+                logger.error(f"GitHub OAuth token request failed with status {token_resp.status_code}: {token_resp.text}")
+                logger.error(f"Request data: client_id={settings.CLIENT_ID}, redirect_uri={settings.REDIRECT_URI}")
                 return None
                 
             token_data = token_resp.json()
-            print(f"Token response: {token_data.keys()}")
+            logger.debug(f"Token response: {list(token_data.keys())}")
             
             # Check for error response from GitHub
             if "error" in token_data:
-                print(f"GitHub OAuth error: {token_data.get('error')}, {token_data.get('error_description')}")
+                logger.error(f"GitHub OAuth error: {token_data.get('error')}, {token_data.get('error_description')}")
                 return None
                 
             access_token = token_data.get("access_token")
             if not access_token:
-                print("No access token in GitHub response")
+                logger.error("No access token in GitHub response")
                 return None
 
             # Now get the user data
@@ -49,7 +51,7 @@ async def get_github_user(code: str):
             )
             
             if user_resp.status_code != 200:
-                print(f"GitHub user API request failed with status {user_resp.status_code}: {user_resp.text}")
+                logger.error(f"GitHub user API request failed with status {user_resp.status_code}: {user_resp.text}")
                 return None
                 
             user_data = user_resp.json()
@@ -58,5 +60,5 @@ async def get_github_user(code: str):
             return user_data
             
         except Exception as e:
-            print(f"Exception in get_github_user: {str(e)}")
+            logger.error(f"Exception in get_github_user: {str(e)}")
             return None
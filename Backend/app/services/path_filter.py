@@ -0,0 +1,29 @@
+from typing import Iterable, List, Optional
+
+from services.repository_tree import _compile_glob, _normalize_path
+
+
+class DeployPathFilter:
+    """
+    Decide whether a set of changed repository paths affects a deploy.
+
+    A path is relevant when it lies under the deploy's root folder or matches one of the
+    include globs, and matches none of the exclude globs. Globs are relative to the
+    repository root, with '*' staying inside one segment and '**' spanning segments.
+    """
+
+    def __init__(self, root_folder_path: str = "", include_paths: Optional[List[str]] = None, exclude_paths: Optional[List[str]] = None):
+        self.root = _normalize_path(root_folder_path)
+        self.include = [_compile_glob(pattern) for pattern in include_paths or []]
+        self.exclude = [_compile_glob(pattern) for pattern in exclude_paths or []]
+
+    def matches(self, path: str) -> bool:
+        path = _normalize_path(path)
+        in_root = not self.root or path == self.root or path.startswith(f"{self.root}/")
+        if not in_root and not any(pattern.match(path) for pattern in self.include):
+            return False
+        return not any(pattern.match(path) for pattern in self.exclude)
+
+    def first_match(self, paths: Iterable[str]) -> Optional[str]:
+        """Return the first relevant path, or None when no path touches the deploy."""
+        return next((path for path in paths if self.matches(path)), None)
@@ -0,0 +1,338 @@
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from starlette.datastructures import MutableHeaders
+
+from config.logging_config import request_id_var
+from config.settings import Settings
+from services.jwt import decode_access_token
+
+logger = logging.getLogger('api')
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB_ROOT = os.path.dirname(os.__file__)
+PROFILE_HEADER = "x-profile"
+# Innermost frames of a thread parked with nothing to do: the event loop waiting on its
+# selector, idle executor workers and threads sleeping on a condition or queue
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+FORMATS = ("collapsed", "speedscope")
+
+
+def _short_path(filename: str) -> str:
+    if "site-packages" in filename:
+        return filename.rsplit("site-packages" + os.sep, 1)[-1]
+    if filename.startswith(APP_ROOT):
+        return os.path.relpath(filename, APP_ROOT)
+    if filename.startswith(STDLIB_ROOT):
+        return os.path.relpath(filename, STDLIB_ROOT)
+    return filename
+
+
+def _thread_group(name: str) -> str:
+    # Executor workers are interchangeable, so ThreadPoolExecutor-0_3 is merged into ThreadPoolExecutor-0
+    return re.sub(r"_\d+$", "", name)
+
+
+class Profile:
+    """Stacks aggregated by a finished sampling session, exportable as collapsed stacks or speedscope JSON."""
+
+    def __init__(self, stacks: Dict[Tuple[str, Tuple[str, ...]], List[float]], frames: Dict[str, Dict],
+                 started_at: str, duration: float, ticks: int, cost: float, truncated: bool):
+        self.id = uuid.uuid4().hex
+        self.stacks = stacks
+        self.frames = frames
+        self.started_at = started_at
+        self.duration = duration
+        self.ticks = ticks
+        self.cost = cost
+        self.truncated = truncated
+        self.metadata: Dict = {}
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            **self.metadata,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1),
+            "ticks": self.ticks,
+            "samples": int(sum(count for count, _ in self.stacks.values())),
+            "effective_interval_ms": round(self.duration / self.ticks * 1000, 2) if self.ticks else None,
+            "overhead": round(self.cost / self.duration, 4) if self.duration else 0.0,
+            "truncated": self.truncated,
+        }
+
+    def collapsed(self) -> str:
+        """One `thread;outermost;...;innermost count` line per distinct stack, as flamegraph.pl and speedscope read it."""
+        lines = [
+            f"{';'.join((group,) + stack)} {int(count)}"
+            for (group, stack), (count, _) in self.stacks.items()
+        ]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def speedscope(self) -> Dict:
+        """A speedscope file with one sampled profile per thread group, weighted by wall time in seconds."""
+        frames: List[Dict] = []
+        index: Dict[str, int] = {}
+        profiles: Dict[str, Dict] = {}
+        for (group, stack), (_, seconds) in sorted(self.stacks.items()):
+            profile = profiles.setdefault(group, {
+                "type": "sampled",
+                "name": group,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": 0,
+                "samples": [],
+                "weights": [],
+            })
+            sample = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append(self.frames[label])
+                sample.append(index[label])
+            profile["samples"].append(sample)
+            profile["weights"].append(round(seconds, 6))
+            profile["endValue"] = round(profile["endValue"] + seconds, 6)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.metadata.get("name") or f"profile {self.started_at}",
+            "exporter": "easy-deploy",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stack of every thread in the process.
+
+    A daemon thread reads sys._current_frames() every `interval` seconds, so the event loop,
+    executor threads running boto3 calls or subprocess waits and any other thread are all
+    covered, with no tracing hooks installed. Each sample is weighted by the wall time since
+    the previous one. Walking the frames holds the GIL, so the thread stretches its interval
+    whenever sampling would take more than `max_overhead` of wall time, and it stops by
+    itself after `max_seconds`. Threads parked in a selector, queue or condition wait are
+    left out unless `include_idle` is set.
+    """
+
+    def __init__(self, interval_seconds: float, max_overhead: float, max_seconds: float, include_idle: bool = False):
+        self.interval = interval_seconds
+        self.max_overhead = max_overhead
+        self.max_seconds = max_seconds
+        self.include_idle = include_idle
+        self._stacks: Dict[Tuple[str, Tuple[str, ...]], List[float]] = {}
+        self._frames: Dict[str, Dict] = {}
+        self._codes: Dict = {}
+        self._names: Dict[int, str] = {}
+        self._ticks = 0
+        self._cost = 0.0
+        self._truncated = False
+        self._started = 0.0
+        self._started_at = ""
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        return Profile(
+            self._stacks, self._frames, self._started_at,
+            time.perf_counter() - self._started, self._ticks, self._cost, self._truncated,
+        )
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        deadline = self._started + self.max_seconds
+        previous = self._started - self.interval
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                self._truncated = True
+                return
+            self._sample(own, tick - previous)
+            previous = tick
+            cost = time.perf_counter() - tick
+            self._ticks += 1
+            self._cost += cost
+            # Sleeping cost * (1 - cap) / cap after a sample keeps sampling under the cap
+            wait = max(self.interval, cost / self.max_overhead - cost)
+            if self._stop.wait(min(wait, max(0.0, deadline - time.perf_counter()))):
+                return
+
+    def _code_label(self, code) -> Tuple[str, bool]:
+        cached = self._codes.get(code)
+        if cached is None:
+            path = _short_path(code.co_filename)
+            label = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+            self._frames.setdefault(label, {"name": code.co_qualname, "file": path, "line": code.co_firstlineno})
+            idle = (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+            cached = self._codes[code] = (label, idle)
+        return cached
+
+    def _sample(self, own: int, weight: float) -> None:
+        frames = sys._current_frames()
+        if frames.keys() - {own} - self._names.keys():
+            self._names = {thread.ident: _thread_group(thread.name) for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            label, idle = self._code_label(frame.f_code)
+            if idle and not self.include_idle:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._code_label(frame.f_code)[0])
+                frame = frame.f_back
+            key = (self._names.get(ident, f"thread-{ident}"), tuple(reversed(stack)))
+            entry = self._stacks.get(key)
+            if entry is None:
+                self._stacks[key] = [1, weight]
+            else:
+                entry[0] += 1
+                entry[1] += weight
+        del frames
+
+
+class ProfileSessions:
+    """
+    Admission control and storage for profiling sessions.
+
+    Every session samples the whole process, so at most `max_concurrent` may run at once,
+    whether started from the admin endpoint or by a request header; further attempts are
+    turned away rather than queued. Finished per-request profiles are kept in a bounded ring.
+    """
+
+    def __init__(self, max_concurrent: int, capacity: int):
+        self.max_concurrent = max_concurrent
+        self.profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self.capacity = capacity
+        self.rejected_total = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def try_start(self, interval_seconds: float, max_seconds: float, include_idle: bool = False) -> Optional[SamplingProfiler]:
+        """Start a profiler if a slot is free, otherwise return None."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected_total += 1
+            return None
+        try:
+            profiler = SamplingProfiler(
+                interval_seconds, Settings.PROFILER_MAX_OVERHEAD,
+                min(max_seconds, Settings.PROFILER_MAX_SECONDS), include_idle,
+            )
+            profiler.start()
+        except BaseException:
+            self._slots.release()
+            raise
+        return profiler
+
+    def finish(self, profiler: SamplingProfiler) -> Profile:
+        try:
+            return profiler.stop()
+        finally:
+            self._slots.release()
+
+    def store(self, profile: Profile) -> None:
+        with self._lock:
+            self.profiles[profile.id] = profile
+            while len(self.profiles) > self.capacity:
+                self.profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self.profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self.profiles.values())]
+
+
+def _is_admin_request(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            payload = decode_access_token(token)
+            return payload is not None and payload.get("sub") in Settings.ADMIN_GITHUB_IDS
+    return False
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware profiling a single request when an admin sends the X-Profile header.
+
+    The profile covers every thread while the request is in flight, so work from concurrent
+    requests shows up too. The response carries X-Profile-Id to fetch it from
+    /admin/profiles/{id}, or X-Profile: busy when no profiling slot was free.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not Settings.PROFILER_ENABLED
+            or not any(name == PROFILE_HEADER.encode() for name, _ in scope["headers"])
+            or not _is_admin_request(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = profile_sessions.try_start(Settings.PROFILER_INTERVAL_SECONDS, Settings.PROFILER_MAX_SECONDS)
+        profile_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_with_profile_header(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                if profiler is None:
+                    headers["X-Profile"] = "busy"
+                else:
+                    headers["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_header)
+        finally:
+            if profiler is not None:
+                profile = profile_sessions.finish(profiler)
+                profile.id = profile_id
+                route = scope.get("route")
+                profile.metadata = {
+                    "name": f"{scope['method']} {scope['path']}",
+                    "method": scope["method"],
+                    "route": getattr(route, "path", None),
+                    "path": scope["path"],
+                    "status": status,
+                    "request_id": request_id_var.get(),
+                }
+                profile_sessions.store(profile)
+                logger.info(f"Profiled {scope['method']} {scope['path']} as {profile_id}: {profile.summary()['samples']} samples")
+
+
+profile_sessions = ProfileSessions(Settings.PROFILER_MAX_CONCURRENT, Settings.PROFILER_RING_SIZE)
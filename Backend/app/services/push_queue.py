@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+import logging
+
+from dependencies.shared_state import get_shared_state
+from services.deploy import DeployService
+from services.git_repository import GitRepositoryService, PUSH_PAYLOAD_COMMIT_LIMIT
+from services.leader import WORKER_ID
+from services.repository_lock import RepositoryLockLost, RepositoryLockTimeout, repository_locks
+
+logger = logging.getLogger('deploy')
+
+# Pushes of a repository not yet pulled, by branch, merged into one range per branch
+PENDING_PUSHES_KEY = "pending-pushes:{repository}"
+# Guards the read-modify-write of the pending pushes; held for a few milliseconds
+PENDING_PUSHES_GUARD = "pending-pushes-guard:{repository}"
+PENDING_PUSHES_TTL_SECONDS = 24 * 3600
+GUARD_TTL_SECONDS = 10
+GUARD_POLL_SECONDS = 0.01
+
+# Repositories with a drain in this process still waiting for the lock; later pushes join it
+_waiting: set = set()
+_drains: set = set()
+
+
+def merge_push(pending: Optional[Dict], push: Dict) -> Dict:
+    """Fold a push into the pending range of its branch: the first push's base, the last push's head."""
+    commits = push.get("commits") or []
+    if pending is None:
+        return {
+            "before": push.get("before"),
+            "after": push.get("after"),
+            "commits": commits,
+            "forced": bool(push.get("forced")),
+        }
+    merged_commits = None
+    if pending["commits"] and commits and len(pending["commits"]) + len(commits) < PUSH_PAYLOAD_COMMIT_LIMIT:
+        merged_commits = pending["commits"] + commits
+    return {
+        "before": pending["before"],
+        "after": push.get("after"),
+        # Without the commits of every push, the paths come from comparing the whole range
+        "commits": merged_commits,
+        "forced": pending["forced"] or bool(push.get("forced")),
+    }
+
+
+class PushQueue:
+    """
+    Accept push webhooks without waiting for the repository lock. A push is recorded in shared
+    state and a drain, started in the background, pulls the repository and rebuilds its deploys
+    once the lock is free. Pushes recorded while a drain waits are merged into that drain, so a
+    burst of pushes during a deploy pulls and builds once.
+    """
+
+    def __init__(self, git_repository_service: GitRepositoryService, deploy_service: DeployService):
+        self.git_repository_service = git_repository_service
+        self.deploy_service = deploy_service
+
+    async def enqueue(self, owner: str, repo_name: str, branch: str, push: Dict) -> Optional[asyncio.Task]:
+        """Record a push and start a drain unless one in this process is already waiting; returns the new drain."""
+        repository = f"{owner}/{repo_name}".lower()
+        async with self._guard(repository) as shared_state:
+            key = PENDING_PUSHES_KEY.format(repository=repository)
+            # A list rather than a mapping by branch, whose names may contain dots
+            pending = {entry["branch"]: entry for entry in await shared_state.get(key) or []}
+            pending[branch] = {"branch": branch, **merge_push(pending.get(branch), push)}
+            await shared_state.set(key, list(pending.values()), ttl_seconds=PENDING_PUSHES_TTL_SECONDS)
+        if repository in _waiting:
+            return None
+        _waiting.add(repository)
+        task = asyncio.create_task(self.drain(owner, repo_name))
+        _drains.add(task)
+        task.add_done_callback(_drains.discard)
+        return task
+
+    async def drain(self, owner: str, repo_name: str) -> List[Dict]:
+        """Pull the repository and rebuild the deploys of every pending branch, under the repository lock."""
+        repository = f"{owner}/{repo_name}".lower()
+        try:
+            async with repository_locks.hold(owner, repo_name, "push"):
+                # Pushes recorded from here on are not taken below, so they start a drain of their own
+                _waiting.discard(repository)
+                pushes = await self._take(repository)
+                if not pushes:
+                    return []
+                result = await self.git_repository_service.pull_repository(owner=owner, repo_name=repo_name)
+                if "error" in result:
+                    logger.error(f"Failed to pull {owner}/{repo_name} for {len(pushes)} pushed branches: {result['error']}")
+                    return []
+                summaries = []
+                for branch, push in pushes.items():
+                    changed_paths = await self.git_repository_service.get_changed_paths(owner, repo_name, push)
+                    summaries += await self.deploy_service.handle_push(owner, repo_name, branch, changed_paths, push["after"])
+                logger.info(f"Processed pushes to {owner}/{repo_name} ({', '.join(pushes)}): {summaries}")
+                return summaries
+        except (RepositoryLockTimeout, RepositoryLockLost) as e:
+            # The pushes stay pending and are taken by the drain of the next push
+            logger.error(f"Pushes to {owner}/{repo_name} not processed: {str(e)}")
+            return []
+        except Exception as e:
+            logger.error(f"Processing pushes to {owner}/{repo_name} failed: {str(e)}")
+            return []
+        finally:
+            _waiting.discard(repository)
+
+    async def _take(self, repository: str) -> Dict[str, Dict]:
+        async with self._guard(repository) as shared_state:
+            key = PENDING_PUSHES_KEY.format(repository=repository)
+            pending = await shared_state.get(key) or []
+            await shared_state.delete(key)
+        return {entry["branch"]: entry for entry in pending}
+
+    @asynccontextmanager
+    async def _guard(self, repository: str) -> AsyncIterator:
+        shared_state = get_shared_state()
+        name = PENDING_PUSHES_GUARD.format(repository=repository)
+        holder = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        token = await shared_state.acquire_lease(name, holder, GUARD_TTL_SECONDS)
+        while token is None:
+            await asyncio.sleep(GUARD_POLL_SECONDS)
+            token = await shared_state.acquire_lease(name, holder, GUARD_TTL_SECONDS)
+        try:
+            yield shared_state
+        finally:
+            await shared_state.release_lease(name, holder, token)
@@ -0,0 +1,186 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Optional
+import logging
+
+from config.settings import Settings
+from dependencies.shared_state import get_shared_state
+from interfaces.shared_state_interface import SharedStateInterface
+from services.leader import WORKER_ID
+
+logger = logging.getLogger('deploy')
+
+LEASE_PREFIX = "repo:"
+
+
+class RepositoryLockTimeout(Exception):
+    """The repository stayed locked by other operations for longer than the wait timeout."""
+
+
+class RepositoryLockLost(Exception):
+    """The lease expired or was taken over while the operation still held the lock."""
+
+
+class RepositoryLock:
+    """One held repository lease: its fencing token and the heartbeat keeping it alive."""
+
+    def __init__(self, shared_state: SharedStateInterface, name: str, holder: str, token: int, purpose: str, ttl: float):
+        self.shared_state = shared_state
+        self.ttl = ttl
+        self.name = name
+        self.holder = holder
+        self.token = token
+        self.purpose = purpose
+        self.lost = False
+        self.acquired_at = time.monotonic()
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def ensure_held(self) -> None:
+        """
+        Confirm the lease still carries this lock's fencing token before a mutation;
+        a holder that stalled past its TTL finds a newer token and stops here.
+        """
+        if self.lost or not await self.shared_state.renew_lease(self.name, self.holder, self.token, self.ttl):
+            self.lost = True
+            raise RepositoryLockLost(f"Lock on {self.name[len(LEASE_PREFIX):]} was lost (fencing token {self.token})")
+
+
+class RepositoryLockService:
+    """
+    Serialize operations that mutate a repository's workspace or run its Terraform, across
+    every worker and replica, while different repositories proceed in parallel.
+
+    A lock is a lease on `repo:{owner}/{repo}` in shared state. Its holder renews it every
+    REPO_LOCK_HEARTBEAT_SECONDS, so a crashed holder releases it after REPO_LOCK_TTL_SECONDS,
+    and every takeover raises its fencing token. Waiters in one process queue in FIFO order
+    and only the head polls the lease, every REPO_LOCK_POLL_SECONDS, until it is free or
+    REPO_LOCK_WAIT_TIMEOUT_SECONDS have passed. Holds nest: an operation already holding
+    a repository's lock, including tasks it spawned, reuses it.
+    """
+
+    def __init__(self, shared_state: Optional[SharedStateInterface] = None):
+        self.shared_state = shared_state
+        self.ttl = Settings.REPO_LOCK_TTL_SECONDS
+        self.heartbeat_interval = Settings.REPO_LOCK_HEARTBEAT_SECONDS
+        self.poll_interval = Settings.REPO_LOCK_POLL_SECONDS
+        self.wait_timeout = Settings.REPO_LOCK_WAIT_TIMEOUT_SECONDS
+        # Locks held by the current task and the tasks it spawned, so nested holds of the same repository reuse them
+        self._in_context: ContextVar[Dict[str, RepositoryLock]] = ContextVar(f"repository_locks_{id(self)}", default={})
+        self._queues: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+        self.held: Dict[str, RepositoryLock] = {}
+        self.acquired = 0
+        self.timeouts = 0
+        self.lost = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @staticmethod
+    def lease_name(owner: str, repo_name: str) -> str:
+        # GitHub owner and repository names are case-insensitive
+        return f"{LEASE_PREFIX}{owner.lower()}/{repo_name.lower()}"
+
+    def current(self, owner: str, repo_name: str) -> Optional[RepositoryLock]:
+        """The lock on a repository held by the running operation, if any."""
+        return self._in_context.get().get(self.lease_name(owner, repo_name))
+
+    @asynccontextmanager
+    async def hold(self, owner: str, repo_name: str, purpose: str) -> AsyncIterator[RepositoryLock]:
+        name = self.lease_name(owner, repo_name)
+        held = self._in_context.get()
+        if name in held:
+            yield held[name]
+            return
+
+        lock = await self._acquire(name, purpose)
+        context_token = self._in_context.set({**held, name: lock})
+        try:
+            yield lock
+        finally:
+            self._in_context.reset(context_token)
+            await self._release(lock)
+
+    async def _acquire(self, name: str, purpose: str) -> RepositoryLock:
+        shared_state = self.shared_state or get_shared_state()
+        # A holder per acquisition, so two operations in one process never share a lease
+        holder = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        queue = self._queues.setdefault(name, asyncio.Lock())
+        self._waiters[name] = self._waiters.get(name, 0) + 1
+        started = time.monotonic()
+        try:
+            async with queue:
+                while True:
+                    token = await shared_state.acquire_lease(name, holder, self.ttl)
+                    if token is not None:
+                        break
+                    if time.monotonic() - started >= self.wait_timeout:
+                        self.timeouts += 1
+                        raise RepositoryLockTimeout(
+                            f"{name[len(LEASE_PREFIX):]} is busy with another operation; gave up after {self.wait_timeout}s"
+                        )
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self._waiters[name] -= 1
+            if not self._waiters[name]:
+                del self._waiters[name]
+                self._queues.pop(name, None)
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        lock = RepositoryLock(shared_state, name, holder, token, purpose, self.ttl)
+        lock._heartbeat = asyncio.create_task(self._keep_alive(lock))
+        self.held[holder] = lock
+        if waited >= self.poll_interval:
+            logger.info(f"Waited {waited:.1f}s for the lock on {name[len(LEASE_PREFIX):]} ({purpose})")
+        return lock
+
+    async def _keep_alive(self, lock: RepositoryLock) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                renewed = await lock.shared_state.renew_lease(lock.name, lock.holder, lock.token, self.ttl)
+            except Exception as e:
+                # Retried on the next beat; the TTL leaves room for a couple of failures
+                logger.warning(f"Could not renew the lock on {lock.name}: {str(e)}")
+                continue
+            if not renewed:
+                lock.lost = True
+                self.lost += 1
+                logger.error(f"Lock on {lock.name} ({lock.purpose}) expired while held; fencing token {lock.token} is stale")
+                return
+
+    async def _release(self, lock: RepositoryLock) -> None:
+        lock._heartbeat.cancel()
+        self.held.pop(lock.holder, None)
+        try:
+            await asyncio.shield(lock.shared_state.release_lease(lock.name, lock.holder, lock.token))
+        except Exception as e:
+            logger.warning(f"Could not release the lock on {lock.name}; it expires in {self.ttl}s: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "held": [
+                {
+                    "repository": lock.name[len(LEASE_PREFIX):],
+                    "purpose": lock.purpose,
+                    "token": lock.token,
+                    "held_seconds": round(time.monotonic() - lock.acquired_at, 1),
+                    "lost": lock.lost,
+                }
+                for lock in self.held.values()
+            ],
+            "waiting": {name[len(LEASE_PREFIX):]: count for name, count in self._waiters.items()},
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "lost": self.lost,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.acquired, 3) if self.acquired else None,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+        }
+
+
+repository_locks = RepositoryLockService()
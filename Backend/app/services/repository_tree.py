@@ -0,0 +1,202 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger('git')
+
+# Single-character codes keep the per-entry type column compact.
+_TYPE_CODES = {"blob": "b", "tree": "t", "commit": "c"}
+_TYPE_NAMES = {code: name for name, code in _TYPE_CODES.items()}
+
+
+def _normalize_path(path: Optional[str]) -> str:
+    """Strip leading/trailing slashes and collapse './' so lookups match tree paths."""
+    if not path:
+        return ""
+    parts = [part for part in path.strip().split("/") if part and part != "."]
+    return "/".join(parts)
+
+
+def _compile_glob(pattern: str) -> "re.Pattern[str]":
+    """Translate a glob into a regex where '*' stays inside one segment and '**' spans segments."""
+    regex = ""
+    segments = _normalize_path(pattern).split("/")
+    for index, segment in enumerate(segments):
+        is_last = index == len(segments) - 1
+        if segment == "**":
+            regex += ".*" if is_last else "(?:.*/)?"
+            continue
+        for char in segment:
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            else:
+                regex += re.escape(char)
+        if not is_last:
+            regex += "/"
+    return re.compile(f"^{regex}$")
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Return the leading directory of a glob that contains no wildcards."""
+    literal = []
+    for segment in _normalize_path(pattern).split("/")[:-1]:
+        if any(char in segment for char in "*?["):
+            break
+        literal.append(segment)
+    return "/".join(literal)
+
+
+class RepositoryTreeIndex:
+    """Immutable index of every entry in a git tree, kept as sorted parallel arrays."""
+
+    __slots__ = ("sha", "truncated", "_paths", "_types", "_shas", "_sizes")
+
+    def __init__(self, sha: str, entries: Iterable[Tuple[str, str, str, int]], truncated: bool = False):
+        self.sha = sha
+        self.truncated = truncated
+        ordered = sorted(
+            (_normalize_path(path), _TYPE_CODES.get(entry_type, "b"), entry_sha, size or 0)
+            for path, entry_type, entry_sha, size in entries
+        )
+        self._paths: List[str] = [entry[0] for entry in ordered]
+        self._types: str = "".join(entry[1] for entry in ordered)
+        self._shas: List[str] = [entry[2] for entry in ordered]
+        self._sizes: List[int] = [entry[3] for entry in ordered]
+
+    @classmethod
+    def from_github_tree(cls, tree_data: Dict) -> "RepositoryTreeIndex":
+        """Build an index from a `git/trees/{sha}?recursive=1` response."""
+        entries = (
+            (item.get("path", ""), item.get("type", "blob"), item.get("sha", ""), item.get("size", 0))
+            for item in tree_data.get("tree", [])
+        )
+        return cls(tree_data.get("sha", ""), entries, truncated=bool(tree_data.get("truncated")))
+
+    @classmethod
+    def from_ls_tree(cls, sha: str, output: str) -> "RepositoryTreeIndex":
+        """Build an index from `git ls-tree -r -t -l -z` output."""
+        entries = []
+        for record in output.split("\0"):
+            if not record:
+                continue
+            meta, _, path = record.partition("\t")
+            _mode, entry_type, entry_sha, size = meta.split()
+            entries.append((path, entry_type, entry_sha, int(size) if size.isdigit() else 0))
+        return cls(sha, entries)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def _position(self, path: str) -> int:
+        position = bisect_left(self._paths, path)
+        if position < len(self._paths) and self._paths[position] == path:
+            return position
+        return -1
+
+    def _entry(self, position: int) -> Dict:
+        path = self._paths[position]
+        return {
+            "path": path,
+            "name": path.rsplit("/", 1)[-1],
+            "type": _TYPE_NAMES[self._types[position]],
+            "sha": self._shas[position],
+            "size": self._sizes[position],
+        }
+
+    def get(self, path: str) -> Optional[Dict]:
+        """Return the entry stored at `path`, if any."""
+        position = self._position(_normalize_path(path))
+        return self._entry(position) if position >= 0 else None
+
+    def exists(self, path: str) -> bool:
+        """Check whether a file or directory exists. The empty path is the tree root."""
+        path = _normalize_path(path)
+        return path == "" or self._position(path) >= 0
+
+    def is_dir(self, path: str) -> bool:
+        path = _normalize_path(path)
+        if path == "":
+            return True
+        position = self._position(path)
+        return position >= 0 and self._types[position] == "t"
+
+    def list_dir(self, path: str = "", entry_type: Optional[str] = None) -> List[Dict]:
+        """List the direct children of a directory, optionally filtered by entry type."""
+        path = _normalize_path(path)
+        prefix = f"{path}/" if path else ""
+        type_code = _TYPE_CODES.get(entry_type) if entry_type else None
+        children = []
+        position = bisect_left(self._paths, prefix)
+        while position < len(self._paths) and self._paths[position].startswith(prefix):
+            remainder = self._paths[position][len(prefix):]
+            if "/" in remainder:
+                # '0' sorts right after '/', so this skips the rest of a grandchild subtree.
+                subtree = prefix + remainder.split("/", 1)[0]
+                position = bisect_left(self._paths, f"{subtree}0", position)
+                continue
+            if type_code is None or self._types[position] == type_code:
+                children.append(self._entry(position))
+            position += 1
+        return children
+
+    def glob(self, pattern: str, entry_type: Optional[str] = None) -> List[Dict]:
+        """Return entries matching a glob such as `services/*/requirements.txt` or `**/package.json`."""
+        matcher = _compile_glob(pattern)
+        literal = _literal_prefix(pattern)
+        prefix = f"{literal}/" if literal else ""
+        type_code = _TYPE_CODES.get(entry_type) if entry_type else None
+        matches = []
+        position = bisect_left(self._paths, prefix)
+        while position < len(self._paths) and self._paths[position].startswith(prefix):
+            if (type_code is None or self._types[position] == type_code) and matcher.match(self._paths[position]):
+                matches.append(self._entry(position))
+            position += 1
+        return matches
+
+
+class TreeIndexCache:
+    """
+    Process-wide LRU of tree indexes. Entries never expire because git SHAs are immutable.
+    Keys include the repository, so a SHA is only looked up in the repository it was fetched from.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], RepositoryTreeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(owner: str, repo_name: str, sha: str) -> Tuple[str, str]:
+        return f"{owner.lower()}/{repo_name.lower()}", sha
+
+    def get(self, owner: str, repo_name: str, sha: str) -> Optional[RepositoryTreeIndex]:
+        key = self._key(owner, repo_name, sha)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+            return index
+
+    def put(self, owner: str, repo_name: str, index: RepositoryTreeIndex, *aliases: str) -> None:
+        """Store an index under its tree SHA and any commit SHAs that resolve to it."""
+        if index.truncated:
+            logger.warning(f"Not caching truncated tree index {index.sha}")
+            return
+        with self._lock:
+            for sha in (index.sha, *aliases):
+                if not sha:
+                    continue
+                key = self._key(owner, repo_name, sha)
+                self._entries[key] = index
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
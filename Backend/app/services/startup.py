@@ -0,0 +1,179 @@
+import asyncio
+import builtins
+import importlib
+import os
+import sys
+import threading
+import time
+import types
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+from config.settings import Settings
+
+logger = logging.getLogger('api')
+
+
+def _process_age() -> float:
+    """Seconds since this process was started, read from /proc; 0 where that is unavailable."""
+    try:
+        with open("/proc/self/stat") as stat:
+            # The command name may contain spaces, so fields are counted after its closing parenthesis
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime:
+            return max(0.0, float(uptime.read().split()[0]) - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported the first time one of its attributes is read."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attribute: str):
+        module = self.__dict__["_module"]
+        if module is None:
+            # import_module holds the module's import lock, so concurrent first uses import it once
+            module = self.__dict__["_module"] = importlib.import_module(self.__name__)
+        return getattr(module, attribute)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Import `name` on first use instead of now. boto3, jose and python_terraform take
+    hundreds of milliseconds to import and most requests never touch them.
+    """
+    return LazyModule(name)
+
+
+class ImportTimer:
+    """
+    Record how long each module takes to import, like `python -X importtime`.
+
+    builtins.__import__ is wrapped while the timer is installed; only imports that load a
+    module not yet in sys.modules are timed. `self` excludes time spent importing the
+    modules it imports in turn, `cumulative` includes it.
+    """
+
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, float]] = {}
+        self._original = None
+        self._local = threading.local()
+
+    @property
+    def installed(self) -> bool:
+        return self._original is not None
+
+    def install(self) -> None:
+        if self.installed:
+            return
+        self._original = original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                cumulative = time.perf_counter() - started
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += cumulative
+                self.modules[name] = {
+                    "self_ms": round((cumulative - nested) * 1000, 2),
+                    "cumulative_ms": round(cumulative * 1000, 2),
+                }
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self) -> None:
+        if self.installed:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def slowest(self, limit: int) -> List[Dict]:
+        ranked = sorted(self.modules.items(), key=lambda item: item[1]["cumulative_ms"], reverse=True)
+        return [{"module": name, **timing} for name, timing in ranked[:limit]]
+
+
+class StartupState:
+    """
+    Startup phases of this process, timed from process start, and the warmup gating readiness.
+
+    Warmup steps run concurrently. A required step that fails is retried every
+    `retry_seconds` and keeps the process not ready; an optional one is logged and skipped.
+    """
+
+    def __init__(self, budget_seconds: float, retry_seconds: float):
+        self.budget = budget_seconds
+        self.retry = retry_seconds
+        self.started = time.perf_counter() - _process_age()
+        self.phases: Dict[str, float] = {}
+        self.steps: Dict[str, Dict] = {}
+        self.imports = ImportTimer()
+        self.ready = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, phase: str) -> None:
+        self.phases[phase] = round(self.elapsed(), 3)
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable], required: bool) -> None:
+        attempts = 0
+        while True:
+            attempts += 1
+            started = time.perf_counter()
+            try:
+                await step()
+            except Exception as e:
+                self.steps[name] = {"status": "failed", "attempts": attempts, "error": str(e)}
+                if not required:
+                    logger.warning(f"Optional warmup step {name} failed: {e}")
+                    return
+                logger.error(f"Warmup step {name} failed, retrying in {self.retry}s: {e}")
+                await asyncio.sleep(self.retry)
+                continue
+            self.steps[name] = {
+                "status": "done",
+                "attempts": attempts,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "finished_at": round(self.elapsed(), 3),
+            }
+            return
+
+    async def warm_up(self, required: Dict[str, Callable[[], Awaitable]], optional: Optional[Dict[str, Callable[[], Awaitable]]] = None) -> None:
+        """Run every step concurrently, then report ready."""
+        optional = optional or {}
+        for name in (*required, *optional):
+            self.steps[name] = {"status": "running", "attempts": 0}
+        await asyncio.gather(
+            *(self._run_step(name, step, True) for name, step in required.items()),
+            *(self._run_step(name, step, False) for name, step in optional.items()),
+        )
+        self.mark("ready")
+        self.imports.uninstall()
+        self.ready = True
+        if self.phases["ready"] > self.budget:
+            logger.warning(f"Ready {self.phases['ready']}s after process start, over the {self.budget}s startup budget")
+        else:
+            logger.info(f"Ready {self.phases['ready']}s after process start")
+
+    def stats(self, limit: int = 30) -> Dict:
+        return {
+            "ready": self.ready,
+            "budget_seconds": self.budget,
+            "uptime_seconds": round(self.elapsed(), 3),
+            "phases": self.phases,
+            "warmup": self.steps,
+            "slowest_imports": self.imports.slowest(limit),
+        }
+
+
+startup_state = StartupState(Settings.STARTUP_READY_BUDGET_SECONDS, Settings.STARTUP_WARMUP_RETRY_SECONDS)
@@ -0,0 +1,197 @@
+import asyncio
+import fcntl
+import os
+import re
+import shutil
+import subprocess
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+import logging
+
+from config.settings import Settings
+from services.metrics import observe_dependency
+from services.startup import lazy_import
+
+python_terraform = lazy_import("python_terraform")
+
+logger = logging.getLogger('deploy')
+
+TERRAFORM_MODULES_PATH = os.path.join(os.path.dirname(__file__), "..", "Pipelines", "Common", "Terraform")
+
+BACKEND_TEMPLATE = """terraform {{
+  backend "s3" {{
+    bucket         = "{bucket}"
+    key            = "{key}"
+    region         = "{region}"
+    dynamodb_table = "{lock_table}"
+    encrypt        = true
+  }}
+}}
+"""
+
+
+def run_terraform_init(command: List[str], cwd: str) -> subprocess.CompletedProcess:
+    """
+    Run a command that performs `terraform init`, sharing downloaded providers through
+    TERRAFORM_PLUGIN_CACHE_DIR when it is set.
+
+    The cache directory is passed in the subprocess environment only. Terraform does not
+    support concurrent inits writing to one plugin cache, so inits that use it hold an
+    exclusive lock on a file in the cache. The lock covers every thread, worker and process
+    on the host. Once the providers are cached, an init takes seconds, and plan, apply and
+    destroy still run in parallel.
+    """
+    cache_dir = Settings.TERRAFORM_PLUGIN_CACHE_DIR
+    if not cache_dir:
+        return subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    env = {**os.environ, "TF_PLUGIN_CACHE_DIR": cache_dir}
+    with open(os.path.join(cache_dir, ".init.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            return subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class TerraformLockManager:
+    """Serialize Terraform runs per tenant and bound the number of concurrent runs across tenants."""
+
+    def __init__(self, max_parallel: int):
+        self.max_parallel = max_parallel
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        self._tenant_locks: Dict[str, asyncio.Lock] = {}
+        self._tenant_waiters: Dict[str, int] = defaultdict(int)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def acquire(self, tenant: str) -> AsyncIterator[None]:
+        lock = self._tenant_locks.setdefault(tenant, asyncio.Lock())
+        self._tenant_waiters[tenant] += 1
+        self.queued += 1
+        waiting = True
+        started = time.monotonic()
+        try:
+            async with lock, self._semaphore:
+                waited = time.monotonic() - started
+                self.queued -= 1
+                waiting = False
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                self.running += 1
+                try:
+                    yield
+                    self.completed += 1
+                except BaseException:
+                    self.failed += 1
+                    raise
+                finally:
+                    self.running -= 1
+        finally:
+            if waiting:
+                self.queued -= 1
+            self._tenant_waiters[tenant] -= 1
+            if not self._tenant_waiters[tenant]:
+                del self._tenant_waiters[tenant]
+                self._tenant_locks.pop(tenant, None)
+
+    def stats(self) -> Dict:
+        finished = self.completed + self.failed
+        return {
+            "max_parallel": self.max_parallel,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "tenants_active": len(self._tenant_waiters),
+            "avg_wait_seconds": round(self.total_wait_seconds / finished, 3) if finished else None,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+        }
+
+
+terraform_lock_manager = TerraformLockManager(Settings.TERRAFORM_MAX_PARALLEL_RUNS)
+
+
+class TerraformRunner:
+    """
+    Run one Terraform module for many tenants, each in its own working directory.
+
+    The module's .tf files are copied into `{TERRAFORM_WORKSPACE_DIR}/{module}/{tenant}` so every
+    tenant has its own .terraform directory and state. When TERRAFORM_STATE_BUCKET is set the
+    state lives in S3 under `{module}/{tenant}/terraform.tfstate`, locked through
+    TERRAFORM_LOCK_TABLE; otherwise it stays in the tenant directory.
+    """
+
+    def __init__(self, module: str, lock_manager: TerraformLockManager = terraform_lock_manager, workspace_root: Optional[str] = None):
+        if not re.match(r'^[a-zA-Z0-9_\-]+$', module):
+            raise ValueError("Invalid Terraform module name")
+        self.module = module
+        self.module_path = os.path.join(TERRAFORM_MODULES_PATH, module)
+        self.lock_manager = lock_manager
+        self.workspace_root = os.path.join(workspace_root or Settings.TERRAFORM_WORKSPACE_DIR, module)
+
+    def workspace_path(self, tenant: str) -> str:
+        if not re.match(r'^[a-zA-Z0-9_\-]+$', tenant):
+            raise ValueError("Invalid Terraform tenant name")
+        return os.path.join(self.workspace_root, tenant)
+
+    def prepare_workspace(self, tenant: str) -> str:
+        """Copy the module into the tenant directory and write its backend configuration."""
+        path = self.workspace_path(tenant)
+        os.makedirs(path, exist_ok=True)
+        for file in os.listdir(self.module_path):
+            if file.endswith(".tf"):
+                shutil.copy(os.path.join(self.module_path, file), os.path.join(path, file))
+        if Settings.TERRAFORM_STATE_BUCKET:
+            with open(os.path.join(path, "backend.tf"), "w") as f:
+                f.write(BACKEND_TEMPLATE.format(
+                    bucket=Settings.TERRAFORM_STATE_BUCKET,
+                    key=f"{self.module}/{tenant}/terraform.tfstate",
+                    region=Settings.TERRAFORM_STATE_REGION,
+                    lock_table=Settings.TERRAFORM_LOCK_TABLE,
+                ))
+        return path
+
+    async def apply(self, tenant: str, variables: Dict) -> Dict:
+        """Apply the module for a tenant and return its outputs."""
+        async with self.lock_manager.acquire(tenant):
+            return await asyncio.to_thread(self._apply, tenant, variables)
+
+    async def destroy(self, tenant: str, variables: Dict) -> None:
+        async with self.lock_manager.acquire(tenant):
+            await asyncio.to_thread(self._destroy, tenant, variables)
+
+    def _init(self, tenant: str) -> "python_terraform.Terraform":
+        path = self.prepare_workspace(tenant)
+        with observe_dependency("subprocess", "terraform init"):
+            result = run_terraform_init(["terraform", "init", "-input=false", "-no-color", "-reconfigure"], cwd=path)
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to initialize Terraform: {result.stderr}")
+        return python_terraform.Terraform(working_dir=path)
+
+    def _apply(self, tenant: str, variables: Dict) -> Dict:
+        tf = self._init(tenant)
+        logger.info(f"Applying Terraform module {self.module} for {tenant}")
+        with observe_dependency("subprocess", "terraform apply"):
+            return_code, stdout, stderr = tf.apply(skip_plan=True, var=variables, capture_output=True)
+        if return_code != 0:
+            raise RuntimeError(f"Failed to apply Terraform configuration: {stderr}")
+        output = tf.output()
+        if not output:
+            raise RuntimeError("Failed to get Terraform output")
+        return output
+
+    def _destroy(self, tenant: str, variables: Dict) -> None:
+        tf = self._init(tenant)
+        logger.info(f"Destroying Terraform module {self.module} for {tenant}")
+        with observe_dependency("subprocess", "terraform destroy"):
+            return_code, stdout, stderr = tf.destroy(auto_approve=True, var=variables, capture_output=True)
+        if return_code != 0:
+            raise RuntimeError(f"Failed to destroy Terraform resources: {stderr}")
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import shutil
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional
+import logging
+
+from config.settings import Settings
+from models.workspace import WorkspacePin
+from repositories.workspace import WorkspaceRepository
+
+logger = logging.getLogger('git')
+
+
+def _directory_size(path: str) -> int:
+    """Sum the apparent size of every regular file below `path` without following symlinks."""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+class WorkspaceService:
+    """Tracks cloned workspaces under DIR_BASE and evicts the least recently used ones over quota."""
+
+    def __init__(self, workspace_repository: WorkspaceRepository, dir_base: Optional[str] = None):
+        self.workspace_repository = workspace_repository
+        self.dir_base = dir_base or Settings.DIR_BASE or "/tmp/mnt/repos"
+        self.quota_bytes = Settings.WORKSPACE_QUOTA_BYTES
+        self.scan_batch_size = Settings.WORKSPACE_SCAN_BATCH_SIZE
+        self.pin_ttl = timedelta(seconds=Settings.WORKSPACE_PIN_TTL_SECONDS)
+        self.min_idle = timedelta(seconds=Settings.WORKSPACE_MIN_IDLE_SECONDS)
+
+    def workspace_path(self, owner: str, repo_name: str) -> str:
+        return f"{self.dir_base}/{owner}/{repo_name}"
+
+    async def touch(self, owner: str, repo_name: str) -> None:
+        """Record a clone, pull or deploy against a workspace."""
+        await self.workspace_repository.touch(owner, repo_name, self.workspace_path(owner, repo_name))
+
+    async def retain(self, owner: str, repo_name: str, reason: str) -> None:
+        """Keep a workspace that a live deploy or webhook pulls into from being evicted."""
+        await self.workspace_repository.retain(owner, repo_name, self.workspace_path(owner, repo_name), reason)
+
+    async def release(self, owner: str, repo_name: str, reason: str) -> None:
+        await self.workspace_repository.release(owner, repo_name, reason)
+
+    @asynccontextmanager
+    async def pinned(self, owner: str, repo_name: str, reason: Optional[str] = None, timeout: float = 60.0) -> AsyncIterator[str]:
+        """Keep a workspace from being evicted while an operation uses it."""
+        pin = WorkspacePin(token=uuid.uuid4().hex, reason=reason)
+        path = self.workspace_path(owner, repo_name)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not await self.workspace_repository.add_pin(owner, repo_name, path, pin):
+            # The workspace is being evicted; wait for the eviction to finish, then pin the fresh record.
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError(f"Workspace {owner}/{repo_name} is being evicted")
+            await asyncio.sleep(0.5)
+        try:
+            yield pin.token
+        finally:
+            await self.workspace_repository.remove_pin(owner, repo_name, pin.token)
+
+    async def delete_workspace(self, owner: str, repo_name: str) -> Dict[str, str]:
+        """Delete a workspace from disk unless an active operation has it pinned."""
+        path = self.workspace_path(owner, repo_name)
+        workspace = await self.workspace_repository.get_workspace(owner, repo_name)
+        cutoff = datetime.utcnow() - self.pin_ttl
+        if workspace and any(pin.pinned_at > cutoff for pin in workspace.pins):
+            return {"error": "Repository is in use by an active deploy"}
+        if not os.path.exists(path):
+            await self.workspace_repository.delete_workspace(owner, repo_name)
+            return {"error": "Repository not found"}
+        await asyncio.to_thread(shutil.rmtree, path, ignore_errors=True)
+        await self.workspace_repository.delete_workspace(owner, repo_name)
+        logger.info(f"Deleted workspace {path}")
+        return {"message": "Repository deleted successfully"}
+
+    async def discover(self) -> int:
+        """Register workspaces that exist on disk but have no record yet."""
+        if not os.path.isdir(self.dir_base):
+            return 0
+        known = await self.workspace_repository.get_workspace_keys()
+        on_disk = await asyncio.to_thread(self._list_workspaces_on_disk)
+        missing = on_disk - known
+        for owner, repo_name in missing:
+            await self.touch(owner, repo_name)
+        return len(missing)
+
+    def _list_workspaces_on_disk(self) -> set:
+        workspaces = set()
+        for owner in os.listdir(self.dir_base):
+            owner_dir = os.path.join(self.dir_base, owner)
+            if not os.path.isdir(owner_dir):
+                continue
+            for repo_name in os.listdir(owner_dir):
+                if os.path.isdir(os.path.join(owner_dir, repo_name)):
+                    workspaces.add((owner, repo_name))
+        return workspaces
+
+    async def scan(self) -> int:
+        """Re-measure only workspaces used since their last scan."""
+        scanned = 0
+        for workspace in await self.workspace_repository.get_unscanned(self.scan_batch_size):
+            scanned_at = datetime.utcnow()
+            if not os.path.isdir(workspace.path):
+                await self.workspace_repository.delete_workspace(workspace.owner, workspace.repo_name)
+                continue
+            size_bytes = await asyncio.to_thread(_directory_size, workspace.path)
+            await self.workspace_repository.update_size(workspace.owner, workspace.repo_name, size_bytes, scanned_at)
+            scanned += 1
+        return scanned
+
+    async def enforce_quota(self) -> int:
+        """Evict least recently used, unpinned workspaces until total usage fits the quota."""
+        total = await self.workspace_repository.get_total_size()
+        evicted = 0
+        while total > self.quota_bytes:
+            now = datetime.utcnow()
+            workspace = await self.workspace_repository.claim_for_eviction(now - self.pin_ttl, now - self.min_idle)
+            if workspace is None:
+                logger.warning(f"Workspace usage {total} bytes exceeds quota {self.quota_bytes} but every workspace is pinned, retained or recently used")
+                break
+            try:
+                await asyncio.to_thread(shutil.rmtree, workspace.path, ignore_errors=True)
+            except Exception as e:
+                logger.error(f"Failed to evict workspace {workspace.path}: {str(e)}")
+                await self.workspace_repository.release_eviction(workspace.owner, workspace.repo_name)
+                break
+            await self.workspace_repository.delete_workspace(workspace.owner, workspace.repo_name)
+            total -= workspace.size_bytes
+            evicted += 1
+            logger.info(f"Evicted workspace {workspace.path} ({workspace.size_bytes} bytes, last used {workspace.last_used_at})")
+        return evicted
+
+    async def collect(self) -> Dict[str, int]:
+        """Run one discovery, incremental scan and eviction pass."""
+        discovered = await self.discover()
+        scanned = await self.scan()
+        evicted = await self.enforce_quota()
+        return {"discovered": discovered, "scanned": scanned, "evicted": evicted}
+
+    async def run_periodically(self, interval_seconds: float) -> None:
+        """Background loop that keeps workspace usage under quota."""
+        while True:
+            try:
+                result = await self.collect()
+                if any(result.values()):
+                    logger.info(f"Workspace collection pass: {result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Workspace collection failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    async def get_usage(self) -> Dict:
+        """Report workspace usage per owner against the configured quota."""
+        owners = await self.workspace_repository.get_usage_by_owner()
+        return {
+            "quota_bytes": self.quota_bytes,
+            "total_bytes": sum(owner["size_bytes"] for owner in owners),
+            "owners": owners,
+        }
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from moto import mock_aws
+
+from services import aws_credentials
+from services.aws_credentials import AWSCredentialProvider, TENANCY_STS, sts_session_cache
+
+ROLE_ARN = "arn:aws:iam::123456789012:role/easy-deploy-platform"
+
+
+def sts_provider(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    provider = AWSCredentialProvider(None, tenancy=TENANCY_STS)
+    provider.role_arn = ROLE_ARN
+    return provider
+
+
+def count_assume_role(monkeypatch):
+    calls = []
+    client = boto3.client
+
+    def counting_client(service, *args, **kwargs):
+        sts = client(service, *args, **kwargs)
+        assume_role = sts.assume_role
+
+        def counted(**params):
+            calls.append(params)
+            return assume_role(**params)
+
+        sts.assume_role = counted
+        return sts
+
+    monkeypatch.setattr(aws_credentials.boto3, "client", counting_client)
+    return calls
+
+
+@mock_aws
+def test_sessions_are_tagged_shared_and_cached(monkeypatch):
+    provider = sts_provider(monkeypatch)
+    calls = count_assume_role(monkeypatch)
+
+    async def scenario():
+        first, second = await asyncio.gather(provider.get_credentials("7"), provider.get_credentials("7"))
+        third = await provider.get_credentials("7")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert calls[0]["Tags"] == [{"Key": "github_id", "Value": "7"}]
+    assert calls[0]["RoleSessionName"] == "github-7"
+    assert first.tenancy == TENANCY_STS and first.aws_session_token
+    assert first == second == third
+    sts_session_cache.discard("7")
+
+
+@mock_aws
+def test_refresh_renews_active_sessions_and_drops_idle_ones(monkeypatch):
+    provider = sts_provider(monkeypatch)
+    calls = count_assume_role(monkeypatch)
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        active = await provider.get_credentials("8")
+        idle = await provider.get_credentials("9")
+        sts_session_cache.put("8", active.model_copy(update={"expiration": now + timedelta(minutes=1)}))
+        sts_session_cache.put("9", idle.model_copy(update={"expiration": now + timedelta(minutes=1)}), now - timedelta(days=1))
+        return await provider.refresh()
+
+    assert asyncio.run(scenario()) == 1
+    assert len(calls) == 3
+    assert sts_session_cache.get("8", now + timedelta(minutes=30)) is not None
+    assert sts_session_cache.get("9", now) is None
+    sts_session_cache.discard("8")
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from models.aws_identity import AWSIdentity
+from repositories.aws_identity_pool import AWSIdentityPoolRepository
+from repositories.aws_user import AWSUserRepository, aws_user_cache
+from services.aws_identity_pool import AWSIdentityPoolService
+from services.aws_user import AWSUserService
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+def identity(name, created_at):
+    return AWSIdentity(
+        identity_name=name,
+        iam_role_arn=f"arn:aws:iam::123456789012:role/github-{name}-role",
+        aws_access_key_id=f"AKIA{name}",
+        aws_secret_access_key="secret",
+        aws_account_id="123456789012",
+        created_at=created_at,
+    )
+
+
+def test_claims_oldest_identity_once_per_user():
+    async def scenario():
+        repository = AWSIdentityPoolRepository(FakeDatabase())
+        now = datetime.utcnow()
+        await repository.add_identity(identity("pool-new", now))
+        await repository.add_identity(identity("pool-old", now - timedelta(minutes=5)))
+
+        first = await repository.claim_identity("42")
+        again = await repository.claim_identity("42")
+        second = await repository.claim_identity("43")
+        empty = await repository.claim_identity("44")
+        return first, again, second, empty, await repository.get_stats()
+
+    first, again, second, empty, stats = asyncio.run(scenario())
+    assert first.identity_name == "pool-old" and first.assigned_github_id == "42"
+    assert again.identity_name == "pool-old"
+    assert second.identity_name == "pool-new"
+    assert empty is None
+    assert stats == {"assigned": 2}
+
+
+def test_create_user_uses_pool_and_refill_tops_it_up():
+    async def scenario():
+        db = FakeDatabase()
+        pool = AWSIdentityPoolService(AWSIdentityPoolRepository(db), pool_size=2)
+        provisioned = []
+
+        async def provision_identity(identity_name):
+            provisioned.append(identity_name)
+            return identity(identity_name, datetime.utcnow())
+
+        pool.provision_identity = provision_identity
+        assert await pool.refill() == 2
+        provisioned.clear()
+
+        service = AWSUserService(AWSUserRepository(db), pool)
+        aws_user = await service.create_user("1001")
+        refilled = await pool.refill()
+        return aws_user, provisioned, refilled, await pool.get_stats()
+
+    aws_user_cache.clear()
+    aws_user, provisioned, refilled, stats = asyncio.run(scenario())
+    assert aws_user.user_github_id == "1001"
+    assert aws_user.aws_access_key_id.startswith("AKIApool-")
+    assert refilled == 1 and len(provisioned) == 1
+    assert stats == {"pool_size": 2, "available": 2, "assigned": 1}
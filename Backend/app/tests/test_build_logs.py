@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import boto3
+from moto import mock_aws
+
+from services.aws_codebuild import AWSCodeBuild
+from services.build_logs import BuildLogTailer
+
+GROUP, STREAM = "/aws/codebuild/42-api-codebuild", "build-1"
+
+
+class FakeCodeBuildClient:
+    def __init__(self):
+        self.status = "IN_PROGRESS"
+
+    def batch_get_builds(self, ids):
+        build = {"id": ids[0], "buildStatus": self.status, "logs": {"groupName": GROUP, "streamName": STREAM}}
+        return {"builds": [build], "buildsNotFound": []}
+
+
+def put(logs, *messages):
+    logs.put_log_events(logGroupName=GROUP, logStreamName=STREAM, logEvents=[
+        {"timestamp": int(time.time() * 1000) + i, "message": message} for i, message in enumerate(messages)
+    ])
+
+
+@mock_aws
+def test_viewers_share_one_tail_and_late_joiners_replay_the_buffer(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    logs = boto3.client("logs", region_name="us-east-1")
+    logs.create_log_group(logGroupName=GROUP)
+    logs.create_log_stream(logGroupName=GROUP, logStreamName=STREAM)
+
+    codebuild = AWSCodeBuild.__new__(AWSCodeBuild)
+    codebuild.codebuild = FakeCodeBuildClient()
+    requested_tokens = []
+    get_log_events = logs.get_log_events
+
+    def tracking_get_log_events(**params):
+        requested_tokens.append(params.get("nextToken"))
+        return get_log_events(**params)
+
+    logs.get_log_events = tracking_get_log_events
+
+    async def collect(tailer, after=0):
+        return [event["message"] async for _, event in tailer.follow(after)]
+
+    async def scenario():
+        tailer = BuildLogTailer("42-api-codebuild:build-1", codebuild, logs)
+        tailer.poll_interval = 0.01
+        put(logs, "step 1", "step 2")
+        tailer.start()
+        early = asyncio.create_task(collect(tailer))
+        await asyncio.sleep(0.05)
+        put(logs, "step 3")
+        await asyncio.sleep(0.05)
+        late = asyncio.create_task(collect(tailer))
+        await asyncio.sleep(0.05)
+        codebuild.codebuild.status = "SUCCEEDED"
+        return await early, await late, tailer
+
+    early, late, tailer = asyncio.run(scenario())
+
+    assert early == ["step 1", "step 2", "step 3"]
+    assert late == early
+    assert tailer.finished and tailer.build_status == "SUCCEEDED"
+    assert requested_tokens[0] is None and all(requested_tokens[1:])
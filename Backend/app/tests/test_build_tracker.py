@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.aws_codebuild import AWSCodeBuild
+from services.build_tracker import CodeBuildStatusTracker
+
+
+class FakeDeployRepository:
+    def __init__(self, deploys):
+        self.deploys = {deploy["_id"]: deploy for deploy in deploys}
+        self.bulk_writes = []
+
+    async def get_in_flight_builds(self):
+        return [dict(deploy) for deploy in self.deploys.values() if deploy.get("build_status") == "IN_PROGRESS"]
+
+    async def apply_build_updates(self, updates):
+        if updates:
+            self.bulk_writes.append(len(updates))
+        for deploy_id, fields in updates:
+            self.deploys[deploy_id].update(fields)
+        return len(updates)
+
+
+class FakeCodeBuildClient:
+    def __init__(self):
+        self.builds = {}
+        self.calls = []
+
+    def batch_get_builds(self, ids):
+        self.calls.append(len(ids))
+        return {
+            "builds": [self.builds[build_id] for build_id in ids if build_id in self.builds],
+            "buildsNotFound": [build_id for build_id in ids if build_id not in self.builds],
+        }
+
+
+def fake_codebuild():
+    codebuild = AWSCodeBuild.__new__(AWSCodeBuild)
+    codebuild.codebuild = FakeCodeBuildClient()
+    return codebuild
+
+
+def test_polls_in_batches_and_writes_only_transitions():
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    async def scenario():
+        repository = FakeDeployRepository([
+            {"_id": i, "codebuild_build_id": f"project:{i}", "build_status": "IN_PROGRESS", "build_phase": "SUBMITTED", "status": "in_progress"}
+            for i in range(150)
+        ])
+        codebuild = fake_codebuild()
+        client = codebuild.codebuild
+        for i in range(149):
+            client.builds[f"project:{i}"] = {"id": f"project:{i}", "buildStatus": "IN_PROGRESS", "currentPhase": "SUBMITTED", "startTime": started}
+        client.builds["project:0"].update(currentPhase="BUILD")
+        client.builds["project:1"].update(buildStatus="SUCCEEDED", currentPhase="COMPLETED", endTime=started + timedelta(seconds=90))
+
+        tracker = CodeBuildStatusTracker(repository, codebuild)
+        first = await tracker.poll()
+        calls_after_first = list(client.calls)
+        second = await tracker.poll()
+        return first, calls_after_first, second, tracker, repository
+
+    first, calls, second, tracker, repository = asyncio.run(scenario())
+
+    assert calls == [100, 50]
+    assert first == 3 and second == 0
+    assert repository.bulk_writes == [3]
+    assert tracker.in_flight == 148 and tracker.api_calls == 4
+    deploys = repository.deploys
+    assert deploys[0]["build_phase"] == "BUILD" and deploys[0]["status"] == "in_progress"
+    assert deploys[1]["status"] == "success" and deploys[1]["build_duration_seconds"] == 90
+    assert deploys[149]["status"] == "failed" and deploys[149]["build_status"] == "NOT_FOUND"
+
+
+def test_interval_backs_off_while_idle_and_resets_on_change():
+    tracker = CodeBuildStatusTracker(FakeDeployRepository([]), fake_codebuild())
+    tracker.min_interval, tracker.max_interval = 5, 60
+    tracker.interval, tracker.in_flight = 5, 10
+
+    assert tracker._next_interval(changed=0) == 10
+    tracker.interval = 40
+    assert tracker._next_interval(changed=0) == 60
+    assert tracker._next_interval(changed=2) == 5
+    tracker.in_flight = 0
+    assert tracker._next_interval(changed=0) == 60
@@ -0,0 +1,73 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from services.buildspec import parse_ecr_repo_url
+from services.deploy import DeployService
+
+TESTS_DIR = Path(__file__).resolve().parent
+GOLDEN_DIR = TESTS_DIR / "golden" / "buildspec"
+FRAMEWORKS = json.loads((TESTS_DIR.parent / "services" / "frameworks.json").read_text())
+ECR_REPO_URL = "123456789012.dkr.ecr.eu-west-1.amazonaws.com/api-42"
+
+# Regenerate the golden files with UPDATE_GOLDEN=1 after an intended buildspec change.
+UPDATE_GOLDEN = os.getenv("UPDATE_GOLDEN") == "1"
+
+
+def deploy_service():
+    service = DeployService.__new__(DeployService)
+    service.framework_config = FRAMEWORKS
+    return service
+
+
+def deploy_data(framework, defaults, **overrides):
+    values = {
+        "framework": framework,
+        "ecr_repo_url": ECR_REPO_URL,
+        "absolute_path": "/mnt/repos/octocat/api/",
+        "port": defaults["port"],
+        "entry_point": defaults["entry_point"],
+    }
+    values.update(overrides)
+    return values
+
+
+@pytest.mark.parametrize("framework,defaults", [
+    (framework, defaults)
+    for frameworks in FRAMEWORKS.values()
+    for framework, defaults in frameworks.items()
+])
+def test_rendered_buildspec_matches_golden_file(framework, defaults):
+    rendered = deploy_service().render_buildspec(deploy_data(framework, defaults), "latest")
+    golden = GOLDEN_DIR / f"{framework}.yml"
+    if UPDATE_GOLDEN:
+        golden.parent.mkdir(parents=True, exist_ok=True)
+        golden.write_text(rendered)
+    assert rendered == golden.read_text()
+
+
+def test_versioned_tag_also_pushes_latest_and_quotes_workspace():
+    defaults = FRAMEWORKS["backend"]["flask"]
+    rendered = deploy_service().render_buildspec(
+        deploy_data("Flask", defaults, absolute_path="/mnt/repos/octocat/my api"), "3f2c1ab"
+    )
+    assert f"--tag {ECR_REPO_URL}:3f2c1ab --tag {ECR_REPO_URL}:latest" in rendered
+    assert "cd '/mnt/repos/octocat/my api' && docker buildx build" in rendered
+    assert "easy-deploy.framework=flask" in rendered
+
+
+def test_rejects_non_ecr_repository_url():
+    assert parse_ecr_repo_url(ECR_REPO_URL)["region"] == "eu-west-1"
+    with pytest.raises(ValueError):
+        parse_ecr_repo_url("docker.io/library/python")
+
+
+def test_snapshot_workspace_is_removed_when_the_build_ends():
+    defaults = FRAMEWORKS["backend"]["flask"]
+    snapshot = "/mnt/repos/octocat/api/.git/easy-deploy/builds/3f2c1ab-0a1b2c3d"
+    rendered = deploy_service().render_buildspec(deploy_data("Flask", defaults), "3f2c1ab", snapshot)
+    assert f"cd {snapshot} && docker buildx build" in rendered
+    assert f'  build:\n    commands:\n      - "cd {snapshot} && ' in rendered
+    assert f'    finally:\n      - "rm -rf {snapshot}"\n' in rendered
@@ -0,0 +1,86 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from repositories import cache as cache_module
+from repositories.aws_user import AWSUserRepository, aws_user_cache
+from repositories.cache import TTLCache, MISSING, get_cache_stats
+from repositories.user import User, user_cache
+
+
+def test_hits_misses_and_negative_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache("test-ttl", max_entries=10, ttl_seconds=60, negative_ttl_seconds=5)
+
+    assert cache.get("user") is MISSING
+    cache.set("user", {"login": "octocat"})
+    cache.set("ghost", None)
+    assert cache.get("user") == {"login": "octocat"}
+    assert cache.get("ghost") is None
+
+    now[0] += 10
+    assert cache.get("ghost") is MISSING
+    assert cache.get("user") == {"login": "octocat"}
+
+    now[0] += 60
+    assert cache.get("user") is MISSING
+    stats = get_cache_stats()["test-ttl"]
+    assert (stats["hits"], stats["negative_hits"], stats["misses"]) == (2, 1, 3)
+
+
+def test_lru_eviction_and_invalidation():
+    cache = TTLCache("test-lru", max_entries=2, ttl_seconds=60, negative_ttl_seconds=5)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    cache.invalidate("a")
+    assert cache.get("a") is MISSING
+    assert cache.stats()["evictions"] == 1
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+def test_user_lookup_normalizes_the_github_id_before_query_and_cache():
+    user_cache.clear()
+
+    async def scenario():
+        repository = User(FakeDatabase())
+        collection = await repository.db.get_collection("users")
+        await collection.insert_one({"github_id": "42", "name": "Octo", "login": "octocat", "email": "", "repos_urls": ""})
+        by_int = await repository.get_user_by_github_id(42)
+        by_str = await repository.get_user_by_github_id("42")
+        return by_int, by_str
+
+    by_int, by_str = asyncio.run(scenario())
+    assert by_int is not None and by_int.login == "octocat"
+    assert by_str is not None and by_str.login == "octocat"
+
+
+def test_deleting_an_aws_user_invalidates_its_github_id_entry():
+    aws_user_cache.clear()
+
+    async def scenario():
+        repository = AWSUserRepository(FakeDatabase())
+        collection = await repository.db.get_collection("aws_users")
+        await collection.insert_one({
+            "_id": "doc-1", "user_github_id": "42", "iam_role_arn": "arn:aws:iam::123456789012:role/deploy",
+            "aws_access_key_id": "AKIA", "aws_secret_access_key": "secret", "aws_user_group": "deployment-users",
+            "aws_account_id": "123456789012",
+        })
+        cached = await repository.get_user("42")
+        deleted = await repository.delete_user("doc-1")
+        return cached, deleted, await repository.get_user("42")
+
+    cached, deleted, after = asyncio.run(scenario())
+    assert cached is not None and deleted is True
+    assert after is None
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+from mongomock_motor import AsyncMongoMockClient
+
+import dependencies.shared_state
+from repositories.deploy import DeployRepository
+from repositories.shared_state import InMemorySharedState
+from schemas.aws_credentials_schema import AWSCredentialsSchema
+from schemas.user_schema import UserSchema
+from services.aws_codebuild import AWSCodeBuild
+from services.build_tracker import CodeBuildStatusTracker
+from services.deploy import DeployService
+
+REGION = "us-east-1"
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+class FakeCredentialProvider:
+    tenancy = "iam_user"
+
+    async def get_credentials(self, github_id):
+        return AWSCredentialsSchema(tenancy="iam_user", aws_access_key_id="testing", aws_secret_access_key="testing")
+
+
+class FakeGitRepositoryService:
+    workspace_service = None
+
+    async def get_head_sha(self, owner, repo_name):
+        return "0123456789abcdef0123456789abcdef01234567"
+
+
+class FakeCodeBuild:
+    def __init__(self):
+        self.started = []
+
+    def start_build(self, **params):
+        self.started.append(params)
+        return {"status": "started", "build_id": "api-codebuild:1"}
+
+
+def create_service_with_image(repository_name, image_tag="abc123"):
+    ecr = boto3.client("ecr", region_name=REGION)
+    repository_url = ecr.create_repository(repositoryName=repository_name)["repository"]["repositoryUri"]
+    manifest = json.dumps({"schemaVersion": 2, "mediaType": "application/vnd.docker.distribution.manifest.v2+json",
+                           "config": {"digest": "sha256:" + "1" * 64, "size": 1, "mediaType": "application/vnd.docker.container.image.v1+json"},
+                           "layers": []})
+    digest = ecr.put_image(repositoryName=repository_name, imageManifest=manifest, imageTag=image_tag)["image"]["imageId"]["imageDigest"]
+
+    ecs = boto3.client("ecs", region_name=REGION)
+    ecs.create_cluster(clusterName="ecs-cluster-42")
+    task_definition = ecs.register_task_definition(
+        family="my-ecs-task",
+        containerDefinitions=[{"name": "dockergs", "image": f"{repository_url}:latest", "memory": 512}],
+    )["taskDefinition"]["taskDefinitionArn"]
+    ecs.create_service(cluster="ecs-cluster-42", serviceName="ecs-service", taskDefinition=task_definition, desiredCount=1)
+    return repository_url, digest
+
+
+@pytest.fixture(autouse=True)
+def memory_shared_state(monkeypatch):
+    # Rebuilds hold the repository lock
+    monkeypatch.setattr(dependencies.shared_state, "_shared_state", InMemorySharedState())
+
+
+def use_mock_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+
+
+DEPLOY = {
+    "owner": "octocat", "repo_name": "api", "user_github_id": "42", "framework": "fastapi", "branch": "main",
+    "absolute_path": "/mnt/repos/octocat/api", "port": 8000, "entry_point": "main.py",
+    "terraform_outputs": {"ecs_cluster_name": "ecs-cluster-42", "ecs_service_name": "ecs-service", "ecs_container_name": "dockergs"},
+}
+
+
+def create_workspace(tmp_path):
+    workspace = tmp_path / "octocat" / "api"
+    (workspace / ".git").mkdir(parents=True)
+    (workspace / "main.py").write_text("print('commit A')\n")
+    (workspace / "Dockerfile").write_text("FROM python:3.11-slim\n")
+    return workspace
+
+
+async def rebuild(repository_url, db=None, workspace=None):
+    db = db or FakeDatabase()
+    collection = await db.get_collection("deploys")
+    result = await collection.insert_one({**DEPLOY, "ecr_repo_url": repository_url, **({"absolute_path": str(workspace)} if workspace else {})})
+    repository = DeployRepository(db)
+    service = DeployService(repository, None, FakeGitRepositoryService(), FakeCredentialProvider())
+    codebuild = FakeCodeBuild()
+    service.get_codebuild_service = lambda credentials: codebuild
+    deploy = await repository.get_deploy(str(result.inserted_id))
+    return await service.rebuild(deploy), codebuild
+
+
+@mock_aws
+def test_rebuild_skips_codebuild_when_commit_image_exists(monkeypatch):
+    use_mock_credentials(monkeypatch)
+    service = DeployService(None, None, FakeGitRepositoryService(), FakeCredentialProvider())
+    image_tag = service._image_tag("0123456789abcdef0123456789abcdef01234567", DEPLOY)
+    repository_url, digest = create_service_with_image("api-42", image_tag=image_tag)
+
+    deploy, codebuild = asyncio.run(rebuild(repository_url))
+
+    assert codebuild.started == []
+    assert deploy.build_cache_hit is True
+    assert deploy.status == "success"
+    assert deploy.image_tag == image_tag
+    assert deploy.image_digest == digest
+    assert deploy.task_definition_revision == 2
+
+
+@mock_aws
+def test_rebuild_starts_codebuild_for_new_commit(monkeypatch, tmp_path):
+    use_mock_credentials(monkeypatch)
+    repository_url, _ = create_service_with_image("api-42", image_tag="0123456789ab-stale")
+    workspace = create_workspace(tmp_path)
+
+    deploy, codebuild = asyncio.run(rebuild(repository_url, workspace=workspace))
+
+    assert len(codebuild.started) == 1
+    assert codebuild.started[0]["image_tag"] == deploy.image_tag
+    assert deploy.image_tag.startswith("0123456789ab-")
+    assert deploy.build_cache_hit is False
+    assert deploy.status == "in_progress"
+    assert deploy.codebuild_build_id == "api-codebuild:1"
+
+
+@mock_aws
+def test_build_reads_a_snapshot_that_later_pulls_do_not_change(monkeypatch, tmp_path):
+    use_mock_credentials(monkeypatch)
+    repository_url, _ = create_service_with_image("api-42", image_tag="0123456789ab-stale")
+    workspace = create_workspace(tmp_path)
+    (workspace / "terraform" / ".terraform").mkdir(parents=True)
+
+    deploy, codebuild = asyncio.run(rebuild(repository_url, workspace=workspace))
+    # A pull after the lock is released moves the workspace to commit B
+    (workspace / "main.py").write_text("print('commit B')\n")
+
+    snapshot = codebuild.started[0]["absolute_path"]
+    assert snapshot.startswith(str(workspace / ".git" / "easy-deploy" / "builds" / deploy.image_tag))
+    assert open(os.path.join(snapshot, "main.py")).read() == "print('commit A')\n"
+    assert sorted(os.listdir(snapshot)) == ["Dockerfile", "main.py"]
+    buildspec = codebuild.started[0]["buildspec_content"]
+    assert f"cd {snapshot} && docker buildx build" in buildspec
+    assert f"rm -rf {snapshot}" in buildspec.split("finally:")[1]
+
+
+@mock_aws
+def test_rollout_registers_revision_pinned_to_digest(monkeypatch):
+    use_mock_credentials(monkeypatch)
+    repository_url, digest = create_service_with_image("api-42")
+
+    async def scenario():
+        db = FakeDatabase()
+        repository = DeployRepository(db)
+        collection = await db.get_collection("deploys")
+        result = await collection.insert_one({
+            "owner": "octocat", "repo_name": "api", "user_github_id": "42", "ecr_repo_url": repository_url,
+            "terraform_outputs": {"ecs_cluster_name": "ecs-cluster-42", "ecs_service_name": "ecs-service", "ecs_container_name": "dockergs"},
+        })
+        service = DeployService(repository, None, None, FakeCredentialProvider())
+        return await service.rollout_image(str(result.inserted_id), UserSchema(github_id="42", login="octocat"), image_tag="abc123")
+
+    deploy = asyncio.run(scenario())
+
+    assert deploy.image_digest == digest
+    assert deploy.task_definition_revision == 2
+    ecs = boto3.client("ecs", region_name=REGION)
+    running = ecs.describe_services(cluster="ecs-cluster-42", services=["ecs-service"])["services"][0]["taskDefinition"]
+    assert running == deploy.task_definition_arn
+    image = ecs.describe_task_definition(taskDefinition=running)["taskDefinition"]["containerDefinitions"][0]["image"]
+    assert image == f"{repository_url}@{digest}"
+
+
+class UnbatchedDeployRepository(DeployRepository):
+    # mongomock cannot run pymongo's bulk UpdateOne
+    async def apply_build_updates(self, updates):
+        for deploy_id, fields in updates:
+            await self.update_deploy(str(deploy_id), fields)
+        return len(updates)
+
+
+class SucceededBuilds:
+    def batch_get_builds(self, ids):
+        return {"builds": [{"id": build_id, "buildStatus": "SUCCEEDED", "currentPhase": "COMPLETED"} for build_id in ids], "buildsNotFound": []}
+
+
+@mock_aws
+def test_tracker_rolls_out_the_built_image_when_its_build_succeeds(monkeypatch, tmp_path):
+    use_mock_credentials(monkeypatch)
+    repository_url, _ = create_service_with_image("api-42", image_tag="0123456789ab-stale")
+    workspace = create_workspace(tmp_path)
+
+    async def scenario():
+        db = FakeDatabase()
+        deploy, _ = await rebuild(repository_url, db, workspace)
+        # CodeBuild pushes the new tag
+        manifest = json.dumps({"schemaVersion": 2, "mediaType": "application/vnd.docker.distribution.manifest.v2+json",
+                               "config": {"digest": "sha256:" + "2" * 64, "size": 1, "mediaType": "application/vnd.docker.container.image.v1+json"},
+                               "layers": []})
+        ecr = boto3.client("ecr", region_name=REGION)
+        digest = ecr.put_image(repositoryName="api-42", imageManifest=manifest, imageTag=deploy.image_tag)["image"]["imageId"]["imageDigest"]
+
+        repository = UnbatchedDeployRepository(db)
+        service = DeployService(repository, None, None, FakeCredentialProvider())
+        codebuild = AWSCodeBuild.__new__(AWSCodeBuild)
+        codebuild.codebuild = SucceededBuilds()
+        tracker = CodeBuildStatusTracker(repository, codebuild, on_build_succeeded=service.rollout_built_image)
+        changed = await tracker.poll()
+        return changed, digest, await repository.get_deploy(deploy.id)
+
+    changed, digest, deploy = asyncio.run(scenario())
+
+    assert changed == 1
+    assert deploy.status == "success" and deploy.build_status == "SUCCEEDED"
+    assert deploy.image_digest == digest
+    assert deploy.task_definition_revision == 2
+    ecs = boto3.client("ecs", region_name=REGION)
+    running = ecs.describe_services(cluster="ecs-cluster-42", services=["ecs-service"])["services"][0]["taskDefinition"]
+    assert running == deploy.task_definition_arn
+    image = ecs.describe_task_definition(taskDefinition=running)["taskDefinition"]["containerDefinitions"][0]["image"]
+    assert image == f"{repository_url}@{digest}"
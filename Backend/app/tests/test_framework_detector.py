@@ -0,0 +1,87 @@
+import asyncio
+import json
+from pathlib import Path
+
+from services.framework_detector import FrameworkDetector, detection_cache
+from services.repository_tree import RepositoryTreeIndex
+
+FRAMEWORKS = json.loads((Path(__file__).resolve().parent.parent / "services" / "frameworks.json").read_text())
+
+
+class FakeGitRepositoryService:
+    def __init__(self, files, readable=True):
+        self.files = files
+        self.readable = readable
+        self.blob_reads = 0
+        self.index = RepositoryTreeIndex(
+            "tree-sha",
+            [(path, "blob", path, len(content)) for path, content in files.items()]
+            + [(directory, "tree", directory, 0) for directory in self._directories(files)],
+        )
+
+    @staticmethod
+    def _directories(files):
+        directories = set()
+        for path in files:
+            parts = path.split("/")[:-1]
+            for depth in range(1, len(parts) + 1):
+                directories.add("/".join(parts[:depth]))
+        return directories
+
+    async def check_repository_access(self, owner, repo_name, access_token):
+        return None if self.readable else {"error": "Resource not found or you don't have permission to access it"}
+
+    async def get_latest_commit(self, owner, repo_name, branch, access_token):
+        return {"sha": "commit-sha"}
+
+    async def get_tree_index(self, owner, repo_name, access_token, sha="", branch=None):
+        return self.index
+
+    async def get_blob_content(self, owner, repo_name, blob_sha, access_token):
+        self.blob_reads += 1
+        return self.files[blob_sha]
+
+
+def detect(files, root="", sha="commit-sha", readable=True):
+    service = FakeGitRepositoryService(files, readable)
+    detector = FrameworkDetector(service, FRAMEWORKS)
+    return asyncio.run(detector.detect("owner", "repo", "token", sha=sha, root_folder_path=root)), service
+
+
+def test_detects_fastapi_in_subfolder_with_entry_point():
+    result, _ = detect({
+        "api/requirements.txt": "fastapi==0.110\nuvicorn\n",
+        "api/app/main.py": "",
+        "web/package.json": json.dumps({"dependencies": {"react": "18"}}),
+    }, root="api", sha="sha-fastapi")
+    assert result["framework"] == "fastapi"
+    assert result["app_entry_point"] == "app/main.py"
+    assert result["port"] == 8000
+
+
+def test_prefers_specific_node_framework():
+    result, _ = detect({
+        "package.json": json.dumps({"dependencies": {"@nestjs/core": "10", "express": "4"}}),
+        "src/main.ts": "",
+    }, sha="sha-nest")
+    assert result["framework"] == "nestjs"
+    assert result["candidates"] == ["nestjs", "express"]
+
+
+def test_results_are_cached_per_commit_and_root():
+    detection_cache.put(("owner/repo", "sha-cached", ""), {"framework": "flask"})
+    result, service = detect({"requirements.txt": "django\n"}, sha="sha-cached")
+    assert result["framework"] == "flask"
+    assert service.blob_reads == 0
+
+
+def test_cached_results_are_not_served_to_callers_without_access():
+    detection_cache.put(("owner/repo", "sha-private", ""), {"framework": "flask"})
+    result, _ = detect({"requirements.txt": "flask\n"}, sha="sha-private", readable=False)
+    assert "error" in result and "framework" not in result
+
+
+def test_unknown_project_returns_no_framework():
+    result, _ = detect({"README.md": "hello"}, sha="sha-unknown")
+    assert result["framework"] is None
+    assert result["candidates"] == []
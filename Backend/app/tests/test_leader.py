@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import dependencies.shared_state
+from repositories.shared_state import InMemorySharedState, SharedStateRepository
+from services.leader import LeaderLoop, SharedSignal
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+BACKENDS = {
+    "memory": InMemorySharedState,
+    "mongo": lambda: SharedStateRepository(FakeDatabase()),
+}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_lease_has_one_holder_and_a_growing_fencing_token(backend):
+    async def scenario():
+        state = BACKENDS[backend]()
+        first = await state.acquire_lease("build-tracker", "worker-a", ttl_seconds=0.2)
+        taken = await state.acquire_lease("build-tracker", "worker-b", ttl_seconds=0.2)
+        again = await state.acquire_lease("build-tracker", "worker-a", ttl_seconds=0.2)
+        renewed = await state.renew_lease("build-tracker", "worker-a", first, ttl_seconds=0.2)
+
+        await asyncio.sleep(0.3)
+        takeover = await state.acquire_lease("build-tracker", "worker-b", ttl_seconds=5)
+        stale_renew = await state.renew_lease("build-tracker", "worker-a", first, ttl_seconds=5)
+        await state.release_lease("build-tracker", "worker-a", first)  # ignored: no longer the holder
+        held_by = (await state.list_leases())[0]["holder"]
+
+        await state.release_lease("build-tracker", "worker-b", takeover)
+        after_release = await state.acquire_lease("build-tracker", "worker-a", ttl_seconds=5)
+        return first, taken, again, renewed, takeover, stale_renew, held_by, after_release
+
+    first, taken, again, renewed, takeover, stale_renew, held_by, after_release = asyncio.run(scenario())
+    assert first == 1
+    assert taken is None
+    assert again == first and renewed is True
+    assert takeover == 2 and stale_renew is False
+    assert held_by == "worker-b"
+    assert after_release == 3
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_values_expire_and_counters_are_atomic(backend):
+    async def scenario():
+        state = BACKENDS[backend]()
+        await state.set("stats:build-tracker", {"in_flight": 2}, ttl_seconds=0.1)
+        fresh = await state.get("stats:build-tracker")
+        counts = await asyncio.gather(*(state.incr("signal:build-tracker") for _ in range(10)))
+        await asyncio.sleep(0.15)
+        return fresh, sorted(counts), await state.get("stats:build-tracker")
+
+    fresh, counts, expired = asyncio.run(scenario())
+    assert fresh == {"in_flight": 2}
+    assert counts == list(range(1, 11))
+    assert expired is None
+
+
+def test_background_loop_runs_in_one_worker_and_fails_over():
+    state = InMemorySharedState()
+    ticks = {"worker-a": 0, "worker-b": 0}
+
+    def loop_for(worker):
+        async def loop():
+            while True:
+                ticks[worker] += 1
+                await asyncio.sleep(0.01)
+        return loop
+
+    async def scenario():
+        workers = {
+            worker: LeaderLoop("gc", loop_for(worker), state, ttl_seconds=0.2, renew_seconds=0.05, holder=worker)
+            for worker in ticks
+        }
+        runs = {worker: asyncio.create_task(leader.run()) for worker, leader in workers.items()}
+        await asyncio.sleep(0.3)
+        leader = next(worker for worker, loop in workers.items() if loop.is_leader)
+        follower = next(worker for worker in ticks if worker != leader)
+        before = dict(ticks)
+
+        runs[leader].cancel()  # the leading worker exits
+        await asyncio.sleep(0.4)
+        for run in runs.values():
+            run.cancel()
+        await asyncio.gather(*runs.values(), return_exceptions=True)
+        return leader, follower, before, workers
+
+    leader, follower, before, workers = asyncio.run(scenario())
+    assert before[leader] > 10 and before[follower] == 0
+    assert ticks[follower] > 0
+    assert workers[follower].terms == 1
+
+
+def test_signal_wakes_a_waiter_in_another_worker(monkeypatch):
+    monkeypatch.setattr(dependencies.shared_state, "_shared_state", InMemorySharedState())
+
+    async def scenario():
+        leader_side = SharedSignal("build-tracker")
+        request_side = SharedSignal("build-tracker")  # same name in another process
+        idle = await leader_side.wait(0.1, poll_seconds=0.02)
+        waiter = asyncio.create_task(leader_side.wait(5, poll_seconds=0.02))
+        await asyncio.sleep(0.05)
+        request_side.notify()
+        return idle, await asyncio.wait_for(waiter, 1)
+
+    idle, woken = asyncio.run(scenario())
+    assert idle is False
+    assert woken is True
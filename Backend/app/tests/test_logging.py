@@ -0,0 +1,81 @@
+import gzip
+import json
+import logging
+
+from config import logging_config
+from config.logging_config import SamplingFilter, deploy_id_var, request_id_var, setup_logging, stop_logging
+from config.settings import Settings
+
+
+def read_json_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_are_written_as_json_with_correlation_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "LOG_DIR", str(tmp_path))
+    setup_logging()
+    request_token = request_id_var.set("req-1")
+    deploy_token = deploy_id_var.set("deploy-1")
+    try:
+        logging.getLogger("deploy").info("rolled out %s", "abc123")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("deploy").exception("rollout failed")
+    finally:
+        request_id_var.reset(request_token)
+        deploy_id_var.reset(deploy_token)
+        stop_logging()
+
+    records = read_json_lines(tmp_path / "app.log")
+    assert records[0]["message"] == "rolled out abc123"
+    assert records[0]["request_id"] == "req-1" and records[0]["deploy_id"] == "deploy-1"
+    assert "ValueError: boom" in records[1]["exception"]
+    assert [record["message"] for record in read_json_lines(tmp_path / "error.log")] == ["rollout failed"]
+
+
+def test_sampling_drops_noisy_info_records_but_never_warnings():
+    sampler = SamplingFilter(["uvicorn.access"], rate_per_second=0, burst=2)
+
+    def record(name, level=logging.INFO):
+        return logging.LogRecord(name, level, __file__, 1, "GET /", None, None)
+
+    assert [sampler.filter(record("uvicorn.access")) for _ in range(4)] == [True, True, False, False]
+    assert sampler.filter(record("uvicorn.access", logging.WARNING))
+    assert sampler.filter(record("deploy"))
+    assert sampler.stats() == {"uvicorn.access": 2}
+
+
+def test_uvicorn_access_records_go_through_the_sampling_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(Settings, "LOG_SAMPLED_LOGGERS", ["uvicorn.access"])
+    monkeypatch.setattr(Settings, "LOG_SAMPLE_RATE_PER_SECOND", 0)
+    monkeypatch.setattr(Settings, "LOG_SAMPLE_BURST", 2)
+    # What uvicorn's default log config leaves behind
+    access_logger = logging.getLogger("uvicorn.access")
+    own_handler = logging.StreamHandler()
+    access_logger.addHandler(own_handler)
+    access_logger.propagate = False
+
+    setup_logging()
+    try:
+        for index in range(4):
+            access_logger.info('127.0.0.1 - "GET /health HTTP/1.1" %d', 200 + index)
+    finally:
+        stop_logging()
+
+    assert own_handler not in access_logger.handlers and access_logger.propagate
+    records = read_json_lines(tmp_path / "app.log")
+    assert [record["logger"] for record in records] == ["uvicorn.access", "uvicorn.access"]
+    assert records[1]["message"].endswith("201")
+
+
+def test_rotated_files_are_gzip_compressed(tmp_path):
+    handler = logging_config.GzipRotatingFileHandler(tmp_path / "app.log", maxBytes=64, backupCount=2)
+    handler.setFormatter(logging_config.JsonFormatter())
+    for index in range(3):
+        handler.emit(logging.LogRecord("deploy", logging.INFO, __file__, 1, f"line {index}", None, None))
+    handler.close()
+
+    with gzip.open(tmp_path / "app.log.1.gz", "rt") as rotated:
+        assert json.loads(rotated.readline())["message"] == "line 1"
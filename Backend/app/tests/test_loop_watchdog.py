@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from services.loop_watchdog import LoopWatchdog
+
+
+def blocking_dependency():
+    time.sleep(0.3)
+
+
+async def async_blocking_dependency():
+    blocking_dependency()
+    return "token"
+
+
+def test_stall_is_attributed_to_route_and_dependency():
+    watchdog = LoopWatchdog(threshold_seconds=0.1, interval_seconds=0.02, capacity=10)
+    app = FastAPI()
+
+    @app.on_event("startup")
+    async def start_watchdog():
+        watchdog.start()
+
+    @app.on_event("shutdown")
+    async def stop_watchdog():
+        watchdog.stop()
+
+    @app.get("/repos/{owner}")
+    async def list_repos(owner: str, token: str = Depends(async_blocking_dependency)):
+        return {"owner": owner}
+
+    before = REGISTRY.get_sample_value("easy_deploy_event_loop_stalls_total", {"route": "GET /repos/{owner}"}) or 0
+    with TestClient(app) as client:
+        assert client.get("/repos/octocat").status_code == 200
+        time.sleep(0.1)  # let the heartbeat record the stall
+
+    stall = watchdog.stats()["recent"][0]
+    assert stall["route"] == "GET /repos/{owner}"
+    assert stall["handler"] == "test_loop_watchdog.py:async_blocking_dependency"
+    assert stall["location"].startswith("tests/test_loop_watchdog.py:")
+    assert stall["location"].endswith("in blocking_dependency")
+    assert stall["duration_ms"] >= 250
+    assert any("time.sleep(0.3)" in line for line in stall["stack"])
+    assert REGISTRY.get_sample_value("easy_deploy_event_loop_stalls_total", {"route": "GET /repos/{owner}"}) == before + 1
+
+
+def test_short_callbacks_and_awaits_are_not_stalls():
+    watchdog = LoopWatchdog(threshold_seconds=0.1, interval_seconds=0.02, capacity=2)
+
+    async def main():
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.2)
+            time.sleep(0.03)
+            await asyncio.sleep(0.1)
+        finally:
+            watchdog.stop()
+
+    asyncio.run(main())
+    assert watchdog.stats()["stalls_total"] == 0
+
+
+def test_ring_keeps_only_the_most_recent_stalls():
+    watchdog = LoopWatchdog(threshold_seconds=0.05, interval_seconds=0.01, capacity=2)
+
+    async def main():
+        watchdog.start()
+        try:
+            for _ in range(3):
+                time.sleep(0.1)
+                await asyncio.sleep(0.05)
+        finally:
+            watchdog.stop()
+
+    asyncio.run(main())
+    stats = watchdog.stats()
+    assert stats["stalls_total"] == 3
+    assert len(stats["recent"]) == 2
+    assert stats["recent"][0]["route"] is None
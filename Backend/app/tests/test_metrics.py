@@ -0,0 +1,63 @@
+import boto3
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from moto import mock_aws
+from prometheus_client import REGISTRY
+
+from services.git_repository import _github_operation
+from services.metrics import MetricsMiddleware, instrument_boto3_client, observe_dependency
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_latency_is_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"id": item_id}
+
+    name = "easy_deploy_http_request_duration_seconds_count"
+    before = sample(name, method="GET", route="/items/{item_id}", status="200")
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    assert sample(name, method="GET", route="/items/{item_id}", status="200") == before + 2
+    assert sample(name, method="GET", route="unmatched", status="404") >= 1
+
+
+def test_failed_dependency_calls_are_counted_as_errors():
+    errors = sample("easy_deploy_dependency_errors_total", dependency="subprocess", operation="git fetch")
+    with pytest.raises(RuntimeError):
+        with observe_dependency("subprocess", "git fetch"):
+            raise RuntimeError("network down")
+    assert sample("easy_deploy_dependency_errors_total", dependency="subprocess", operation="git fetch") == errors + 1
+    assert sample("easy_deploy_dependency_duration_seconds_count", dependency="subprocess", operation="git fetch", outcome="error") >= 1
+
+
+@mock_aws
+def test_boto3_calls_are_timed_per_operation(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    ecr = instrument_boto3_client(boto3.client("ecr", region_name="us-east-1"))
+    name = "easy_deploy_dependency_duration_seconds_count"
+    before = sample(name, dependency="aws", operation="ecr.DescribeRepositories", outcome="ok")
+    ecr.describe_repositories()
+    with pytest.raises(ecr.exceptions.RepositoryNotFoundException):
+        ecr.describe_images(repositoryName="missing")
+
+    assert sample(name, dependency="aws", operation="ecr.DescribeRepositories", outcome="ok") == before + 1
+    assert sample("easy_deploy_dependency_errors_total", dependency="aws", operation="ecr.DescribeImages") >= 1
+
+
+def test_github_operation_labels_drop_owner_and_repository():
+    assert _github_operation("get", "/repos/octocat/api/compare/a...b") == "GET repos/compare"
+    assert _github_operation("post", "/repos/octocat/api/hooks") == "POST repos/hooks"
+    assert _github_operation("get", "/users/octocat/repos") == "GET users/repos"
+    assert _github_operation("get", "/user") == "GET user"
@@ -0,0 +1,27 @@
+import asyncio
+
+import boto3
+from moto import mock_aws
+
+from services.monitoring import MonitoringService
+
+REGION = "us-east-1"
+
+
+def test_service_status_reports_when_the_primary_deployment_last_changed(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    with mock_aws():
+        ecs = boto3.client("ecs", region_name=REGION)
+        ecs.create_cluster(clusterName="user-cluster")
+        task_definition = ecs.register_task_definition(
+            family="api", containerDefinitions=[{"name": "api", "image": "api:1", "memory": 512}],
+        )["taskDefinition"]["taskDefinitionArn"]
+        ecs.create_service(cluster="user-cluster", serviceName="api", taskDefinition=task_definition, desiredCount=1)
+        deployment = ecs.describe_services(cluster="user-cluster", services=["api"])["services"][0]["deployments"][0]
+
+        status = asyncio.run(MonitoringService().get_service_status("user-cluster", "api"))
+
+    assert "error" not in status, status
+    assert status["status"] == "ACTIVE"
+    assert status["desired_count"] == 1
+    assert status["last_updated"] == deployment["updatedAt"].isoformat()
@@ -0,0 +1,67 @@
+import asyncio
+
+from models.deploy import Deploy
+from services.deploy import DeployService
+from services.git_repository import GitRepositoryService, PUSH_PAYLOAD_COMMIT_LIMIT
+from services.path_filter import DeployPathFilter
+
+
+def git_service(compare_response):
+    service = GitRepositoryService.__new__(GitRepositoryService)
+    service.dir_base = "/nonexistent"
+    service.compare_calls = []
+
+    async def make_github_request(method, endpoint, access_token, params=None, json_data=None):
+        service.compare_calls.append(endpoint)
+        return compare_response
+
+    service._make_github_request = make_github_request
+    return service
+
+
+def push(*commits, **fields):
+    payload = {"before": "a" * 40, "after": "b" * 40, "commits": list(commits)}
+    payload.update(fields)
+    return payload
+
+
+def test_filter_matches_root_folder_and_include_globs_minus_excludes():
+    path_filter = DeployPathFilter("/services/api/", include_paths=["libs/common/**"], exclude_paths=["**/*.md"])
+    assert path_filter.matches("services/api/main.py")
+    assert path_filter.matches("libs/common/db/session.py")
+    assert not path_filter.matches("services/api/README.md")
+    assert not path_filter.matches("services/api-gateway/main.py")
+    assert not path_filter.matches("services/web/package.json")
+
+
+def test_changed_paths_come_from_push_commits():
+    service = git_service({"error": "unused"})
+    payload = push(
+        {"added": ["services/api/new.py"], "modified": ["README.md"], "removed": []},
+        {"added": [], "modified": [], "removed": ["services/web/old.js"]},
+    )
+    paths = asyncio.run(service.get_changed_paths("octocat", "mono", payload))
+    assert paths == ["README.md", "services/api/new.py", "services/web/old.js"]
+    assert service.compare_calls == []
+
+
+def test_truncated_push_falls_back_to_compare_api():
+    service = git_service({"files": [{"filename": "services/api/app.py"}, {"filename": "services/web/a.js", "previous_filename": "web/a.js"}]})
+    payload = push(*[{"modified": ["docs/index.md"]}] * PUSH_PAYLOAD_COMMIT_LIMIT)
+    paths = asyncio.run(service.get_changed_paths("octocat", "mono", payload))
+    assert paths == ["services/api/app.py", "services/web/a.js", "web/a.js"]
+    assert service.compare_calls == [f"/repos/octocat/mono/compare/{'a' * 40}...{'b' * 40}"]
+
+
+def test_new_branch_and_undiffable_pushes_are_unknown():
+    service = git_service({"error": "Resource not found"})
+    assert asyncio.run(service.get_changed_paths("octocat", "mono", push(before="0" * 40))) is None
+    assert asyncio.run(service.get_changed_paths("octocat", "mono", push(forced=True))) is None
+
+
+def test_skip_reason_only_for_untouched_deploys():
+    deploy = Deploy(id="d1", root_folder_path="services/api", exclude_paths=["**/*.md"])
+    assert DeployService.build_skip_reason(deploy, ["services/api/main.py"]) is None
+    assert DeployService.build_skip_reason(deploy, None) is None
+    assert "root folder '/services/api'" in DeployService.build_skip_reason(deploy, ["services/web/app.js", "services/api/CHANGELOG.md"])
+    assert DeployService.build_skip_reason(deploy, []) == "push changed no files"
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import Settings
+from services.jwt import create_access_token
+from services.profiler import ProfilerMiddleware, SamplingProfiler, profile_sessions
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+def test_samples_event_loop_and_executor_threads():
+    profiler = SamplingProfiler(interval_seconds=0.005, max_overhead=0.5, max_seconds=5)
+
+    async def main():
+        profiler.start()
+        await asyncio.gather(asyncio.to_thread(blocking_call), asyncio.to_thread(spin, 0.1))
+        spin(0.1)
+        return profiler.stop()
+
+    profile = asyncio.run(main())
+    collapsed = profile.collapsed()
+    assert any(line.startswith("MainThread;") and "spin (tests/test_profiler.py:" in line for line in collapsed.splitlines())
+    assert any(line.startswith("asyncio;") and "blocking_call (tests/test_profiler.py:" in line for line in collapsed.splitlines())
+    assert "sampling-profiler" not in collapsed
+    for line in collapsed.splitlines():
+        assert int(line.rsplit(" ", 1)[1]) > 0
+
+    speedscope = profile.speedscope()
+    frames = speedscope["shared"]["frames"]
+    assert {"name": "spin", "file": "tests/test_profiler.py", "line": spin.__code__.co_firstlineno} in frames
+    for thread_profile in speedscope["profiles"]:
+        assert len(thread_profile["samples"]) == len(thread_profile["weights"])
+        assert all(index < len(frames) for sample in thread_profile["samples"] for index in sample)
+    assert profile.summary()["truncated"] is False
+
+
+def test_overhead_cap_stretches_the_interval():
+    profiler = SamplingProfiler(interval_seconds=0.001, max_overhead=0.0001, max_seconds=5)
+    profiler.start()
+    time.sleep(0.3)
+    profile = profiler.stop()
+    summary = profile.summary()
+    assert summary["ticks"] < 30
+    assert summary["overhead"] <= 0.001
+
+
+def test_sessions_stop_at_max_seconds():
+    profiler = SamplingProfiler(interval_seconds=0.005, max_overhead=0.5, max_seconds=0.05)
+    profiler.start()
+    time.sleep(0.2)
+    assert profiler._thread.is_alive() is False
+    assert profiler.stop().summary()["truncated"] is True
+
+
+def test_header_profiles_admin_requests_within_the_concurrency_limit(monkeypatch):
+    monkeypatch.setattr(Settings, "ADMIN_GITHUB_IDS", ["1"])
+    monkeypatch.setattr(Settings, "JWT_SECRET_KEY", "test-secret")
+    monkeypatch.setattr(Settings, "JWT_ALGORITHM", "HS256")
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware)
+
+    @app.get("/slow/{name}")
+    def slow(name: str):
+        spin(0.05)
+        return {"name": name}
+
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}", "X-Profile": "1"}
+    user = {"Authorization": f"Bearer {create_access_token({'sub': '2'})}", "X-Profile": "1"}
+    with TestClient(app) as client:
+        response = client.get("/slow/a", headers=admin)
+        assert response.status_code == 200
+        profile = profile_sessions.get(response.headers["X-Profile-Id"])
+        assert profile.metadata["route"] == "/slow/{name}"
+        assert "spin (tests/test_profiler.py:" in profile.collapsed()
+
+        response = client.get("/slow/b", headers=user)
+        assert "X-Profile-Id" not in response.headers
+
+        held = profile_sessions.try_start(0.01, 1)
+        try:
+            response = client.get("/slow/c", headers=admin)
+        finally:
+            profile_sessions.finish(held)
+        assert response.status_code == 200
+        assert response.headers["X-Profile"] == "busy"
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from repositories.deploy import DeployRepository
+from services.deploy import DeployService
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+class SlowRebuildDeployService(DeployService):
+    """Stands in for CodeBuild with a fixed start_build latency."""
+
+    def __init__(self, deploy_repository, latency):
+        self.deploy_repository = deploy_repository
+        self.latency = latency
+        self.rebuilt = []
+
+    async def rebuild_for_push(self, deploy, changed_paths, pushed_sha=None):
+        await asyncio.sleep(self.latency)
+        if deploy.root_folder_path == "services/broken":
+            raise ValueError("ECR repository URL is required")
+        self.rebuilt.append(deploy.root_folder_path)
+        return {"deploy_id": deploy.id, "action": "built"}
+
+
+async def seed(repository):
+    collection = await repository.db.get_collection("deploys")
+    now = datetime.now()
+    documents = [
+        {"root_folder_path": f"services/svc{index}", "branch": "main", "created_at": now} for index in range(4)
+    ] + [
+        {"root_folder_path": "services/broken", "branch": "main", "created_at": now},
+        # superseded by the newer services/svc0 record
+        {"root_folder_path": "services/svc0", "branch": "main", "created_at": now - timedelta(days=1)},
+        {"root_folder_path": "services/svc0", "branch": "develop", "created_at": now},
+    ]
+    await collection.insert_many([
+        {"owner": "octocat", "repo_name": "mono", "user_github_id": "42", **document} for document in documents
+    ])
+
+
+def test_push_rebuilds_every_active_deploy_concurrently():
+    async def scenario():
+        repository = DeployRepository(FakeDatabase())
+        await seed(repository)
+        service = SlowRebuildDeployService(repository, latency=0.2)
+        started = time.perf_counter()
+        summaries = await service.handle_push("octocat", "mono", "main", ["services/svc0/app.py"], "b" * 40)
+        return service, summaries, time.perf_counter() - started
+
+    service, summaries, elapsed = asyncio.run(scenario())
+
+    assert sorted(service.rebuilt) == [f"services/svc{index}" for index in range(4)]
+    assert len(summaries) == 5
+    failed = [summary for summary in summaries if summary["action"] == "failed"]
+    assert len(failed) == 1 and failed[0]["error"] == "ECR repository URL is required"
+    # about as long as the slowest rebuild, not the sum of five
+    assert elapsed < 0.6
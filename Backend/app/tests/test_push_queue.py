@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import dependencies.shared_state
+import routers.git_repositories
+from dependencies.services import get_push_queue
+from repositories.shared_state import InMemorySharedState
+from services.git_repository import GitRepositoryService
+from services.push_queue import PushQueue
+from services.repository_lock import repository_locks
+
+
+class FakeGitRepositoryService:
+    def __init__(self):
+        self.pulls = 0
+
+    async def pull_repository(self, owner, repo_name, access_token=None):
+        self.pulls += 1
+        return {"message": "Repository pulled successfully", "output": ""}
+
+    async def get_changed_paths(self, owner, repo_name, push, access_token=None):
+        return await GitRepositoryService.get_changed_paths(self, owner, repo_name, push, access_token)
+
+
+class FakeDeployService:
+    def __init__(self):
+        self.pushes = []
+
+    async def handle_push(self, owner, repo_name, branch, changed_paths, pushed_sha=None):
+        self.pushes.append((branch, changed_paths, pushed_sha))
+        return [{"deploy_id": "d1", "action": "built"}]
+
+
+def push(before, after, *paths, branch="main"):
+    return {
+        "ref": f"refs/heads/{branch}", "before": before, "after": after,
+        "repository": {"name": "api", "owner": {"login": "octocat"}},
+        "commits": [{"id": after, "modified": list(paths)}],
+    }
+
+
+@pytest.fixture(autouse=True)
+def memory_shared_state(monkeypatch):
+    monkeypatch.setattr(dependencies.shared_state, "_shared_state", InMemorySharedState())
+    monkeypatch.setattr(repository_locks, "poll_interval", 0.01)
+
+
+def test_pushes_during_a_deploy_are_merged_and_built_once_the_lock_is_free():
+    git, deploys = FakeGitRepositoryService(), FakeDeployService()
+    queue = PushQueue(git, deploys)
+
+    async def scenario():
+        deploy_holds_lock = asyncio.Event()
+        finish_deploy = asyncio.Event()
+
+        async def deploy():
+            async with repository_locks.hold("octocat", "api", "deploy:42"):
+                deploy_holds_lock.set()
+                await finish_deploy.wait()
+
+        deploying = asyncio.create_task(deploy())
+        await deploy_holds_lock.wait()
+        drain = await queue.enqueue("octocat", "api", "main", push("a" * 40, "b" * 40, "app.py"))
+        joined = await queue.enqueue("octocat", "api", "main", push("b" * 40, "c" * 40, "lib/util.py"))
+        await asyncio.sleep(0.05)
+        before_release = (git.pulls, list(deploys.pushes))
+        finish_deploy.set()
+        await deploying
+        summaries = await drain
+        return joined, before_release, summaries
+
+    joined, before_release, summaries = asyncio.run(scenario())
+
+    assert joined is None
+    assert before_release == (0, [])
+    assert git.pulls == 1
+    assert deploys.pushes == [("main", ["app.py", "lib/util.py"], "c" * 40)]
+    assert summaries == [{"deploy_id": "d1", "action": "built"}]
+
+
+def test_a_push_after_the_drain_took_the_pending_pushes_starts_another():
+    git, deploys = FakeGitRepositoryService(), FakeDeployService()
+    queue = PushQueue(git, deploys)
+
+    async def scenario():
+        first = await queue.enqueue("octocat", "api", "main", push("a" * 40, "b" * 40, "app.py"))
+        await first
+        second = await queue.enqueue("octocat", "api", "develop", push("0" * 40, "d" * 40, "app.py", branch="develop"))
+        await second
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first is not second and git.pulls == 2
+    assert [branch for branch, _, _ in deploys.pushes] == ["main", "develop"]
+
+
+def test_webhook_answers_202_without_waiting_for_the_repository():
+    class RecordingQueue:
+        def __init__(self):
+            self.enqueued = []
+
+        async def enqueue(self, owner, repo_name, branch, payload):
+            self.enqueued.append((owner, repo_name, branch, payload["after"]))
+
+    queue = RecordingQueue()
+    app = FastAPI()
+    app.include_router(routers.git_repositories.router)
+    app.dependency_overrides[get_push_queue] = lambda: queue
+    # Another worker is deploying the repository
+    asyncio.run(dependencies.shared_state._shared_state.acquire_lease("repo:octocat/api", "other-worker", 60))
+
+    started = time.monotonic()
+    response = TestClient(app).post("/git/repository/webhook/", json=push("a" * 40, "b" * 40, "app.py"))
+
+    assert response.status_code == 202 and response.json()["status"] == "accepted"
+    assert queue.enqueued == [("octocat", "api", "main", "b" * 40)]
+    assert time.monotonic() - started < 1
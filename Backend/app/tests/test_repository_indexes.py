@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from benchmarks.repository_scaling import github_id, login, seed
+from config.settings import settings
+from dependencies.database_connection import DatabaseConnection
+
+# mongomock ignores indexes, so the plans can only be checked against a real server
+MONGODB_TEST_URL = os.getenv("MONGODB_TEST_URL")
+SEEDED_DOCUMENTS = 2_000
+
+# The benchmarked queries with the index each one is meant to use; the statistics counts
+# on an owner alone may use either index with the owner as its prefix
+QUERIES = {
+    "get_deploys": ("deploys", {"owner": login(0), "repo_name": "repo-0"}, None, {"owner_repo_branch_created"}),
+    "get_active_deploys": ("deploys", {"owner": login(0), "repo_name": "repo-0", "branch": "main"}, {"created_at": -1}, {"owner_repo_branch_created"}),
+    "get_deploys_for_owner": ("deploys", {"owner": login(0)}, None, {"owner_status", "owner_repo_branch_created"}),
+    "get_deployment_statistics": ("deploys", {"owner": login(0), "status": "success"}, None, {"owner_status"}),
+    "get_deployment_statistics.cache_hits": ("deploys", {"owner": login(0), "build_cache_hit": True}, None, {"owner_status", "owner_repo_branch_created"}),
+    "get_user_by_github_id": ("users", {"github_id": github_id(0)}, None, {"github_id"}),
+    "aws_user.get_user": ("aws_users", {"user_github_id": github_id(0)}, None, {"user_github_id"}),
+}
+
+
+def plan_stages(plan):
+    """Every stage of a winning plan, outermost first."""
+    stages = [plan]
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages += plan_stages(child)
+    return stages
+
+
+@pytest.mark.skipif(not MONGODB_TEST_URL, reason="set MONGODB_TEST_URL to a mongod to check the query plans")
+def test_benchmarked_queries_use_the_indexes_created_at_startup(monkeypatch):
+    import main
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGODB_TEST_URL)
+    monkeypatch.setattr(settings, "DATABASE_NAME", f"easy_deploy_index_test_{int(time.time())}")
+    monkeypatch.setattr(DatabaseConnection, "_client", client)
+    db = client[settings.DATABASE_NAME]
+
+    async def winning_plans():
+        try:
+            await seed(db, SEEDED_DOCUMENTS)
+            await main.ensure_indexes()
+            plans = {}
+            for name, (collection_name, query, sort, _) in QUERIES.items():
+                command = {"find": collection_name, "filter": query, **({"sort": sort} if sort else {})}
+                result = await db.command("explain", command, verbosity="queryPlanner")
+                winning_plan = result["queryPlanner"]["winningPlan"]
+                # Servers using the slot-based engine nest the plan one level down
+                plans[name] = plan_stages(winning_plan.get("queryPlan", winning_plan))
+            return plans
+        finally:
+            await client.drop_database(settings.DATABASE_NAME)
+            client.close()
+
+    plans = asyncio.run(winning_plans())
+
+    for name, (_, _, sort, indexes) in QUERIES.items():
+        stages = plans[name]
+        scans = [stage for stage in stages if stage["stage"] == "IXSCAN"]
+        assert scans, f"{name}: {[stage['stage'] for stage in stages]}"
+        assert scans[0]["indexName"] in indexes, f"{name} used {scans[0]['indexName']}"
+        assert "COLLSCAN" not in [stage["stage"] for stage in stages], name
+        if sort:
+            # The index order serves the sort, without sorting in memory
+            assert "SORT" not in [stage["stage"] for stage in stages], name
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import subprocess
+import time
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import services.git_repository
+from repositories.shared_state import InMemorySharedState, SharedStateRepository
+from services.git_repository import GitRepositoryService
+from services.repository_lock import RepositoryLockLost, RepositoryLockService, RepositoryLockTimeout
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+BACKENDS = {
+    "memory": InMemorySharedState,
+    "mongo": lambda: SharedStateRepository(FakeDatabase()),
+}
+
+
+def lock_service(state, ttl=5.0, heartbeat=1.0, poll=0.01, wait_timeout=5.0):
+    service = RepositoryLockService(state)
+    service.ttl, service.heartbeat_interval, service.poll_interval, service.wait_timeout = ttl, heartbeat, poll, wait_timeout
+    return service
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_same_repository_serializes_across_workers_and_others_run_in_parallel(backend):
+    state = BACKENDS[backend]()
+    workers = [lock_service(state), lock_service(state)]  # two replicas sharing one lease store
+    running = {}
+    overlaps = []
+
+    async def operation(worker, owner, repo):
+        async with worker.hold(owner, repo, "deploy"):
+            key = f"{owner}/{repo}".lower()
+            running[key] = running.get(key, 0) + 1
+            if running[key] > 1:
+                overlaps.append(key)
+            await asyncio.sleep(0.05)
+            running[key] -= 1
+
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(*(operation(workers[i % 2], "octocat", "API") for i in range(4)))
+        serialized = time.monotonic() - started
+        started = time.monotonic()
+        await asyncio.gather(*(operation(workers[i % 2], "octocat", f"repo-{i}") for i in range(4)))
+        return serialized, time.monotonic() - started
+
+    serialized, parallel = asyncio.run(scenario())
+    assert overlaps == []
+    assert serialized >= 0.2
+    assert parallel < 0.15
+    assert sum(worker.acquired for worker in workers) == 8
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_heartbeat_keeps_the_lock_and_a_stalled_holder_is_fenced_off(backend):
+    state = BACKENDS[backend]()
+
+    async def scenario():
+        alive = lock_service(state, ttl=0.2, heartbeat=0.05)
+        async with alive.hold("octocat", "api", "deploy") as lock:
+            await asyncio.sleep(0.4)  # twice the TTL, kept alive by the heartbeat
+            await lock.ensure_held()
+            kept_token = lock.token
+
+        stalled = lock_service(state, ttl=0.2, heartbeat=10)  # its heartbeat never fires in time
+        other = lock_service(state, ttl=5)
+        async with stalled.hold("octocat", "api", "deploy") as stale:
+            await asyncio.sleep(0.3)
+            async with other.hold("octocat", "api", "deploy") as fresh:
+                with pytest.raises(RepositoryLockLost):
+                    await stale.ensure_held()
+                await fresh.ensure_held()
+                leases = await state.list_leases("repo:")
+        return kept_token, stale.token, fresh.token, leases
+
+    kept_token, stale_token, fresh_token, leases = asyncio.run(scenario())
+    assert stale_token == kept_token + 1
+    assert fresh_token == stale_token + 1
+    assert leases[0]["name"] == "repo:octocat/api" and leases[0]["token"] == fresh_token
+
+
+def test_nested_holds_reuse_the_lock_and_waiters_give_up_after_the_timeout():
+    state = InMemorySharedState()
+    service = lock_service(state)
+    other_worker = lock_service(state, wait_timeout=0.05)
+
+    async def child(outer):
+        async with service.hold("octocat", "api", "rebuild") as inner:
+            return inner is outer
+
+    async def scenario():
+        async with service.hold("octocat", "api", "push") as outer:
+            # Spawned tasks, like the rebuilds of a push, inherit the lock
+            reused = await asyncio.gather(child(outer), child(outer))
+            with pytest.raises(RepositoryLockTimeout):
+                async with other_worker.hold("octocat", "api", "deploy"):
+                    pass
+            stats = service.stats()
+        async with other_worker.hold("octocat", "api", "deploy"):
+            pass
+        return reused, stats
+
+    reused, stats = asyncio.run(scenario())
+    assert reused == [True, True]
+    assert service.acquired == 1 and other_worker.timeouts == 1 and other_worker.acquired == 1
+    assert stats["held"][0]["repository"] == "octocat/api" and stats["held"][0]["purpose"] == "push"
+
+
+def git(*args, cwd):
+    subprocess.run(["git", "-c", "user.name=octocat", "-c", "user.email=octocat@example.com", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def test_pull_under_the_lock_runs_git_without_blocking_the_loop_or_changing_directory(tmp_path, monkeypatch):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    git("init", "-q", "-b", "main", cwd=origin)
+    (origin / "main.py").write_text("print('A')\n")
+    git("add", ".", cwd=origin)
+    git("commit", "-q", "-m", "A", cwd=origin)
+    git("clone", "-q", str(origin), str(tmp_path / "repos" / "octocat" / "api"), cwd=tmp_path)
+    (origin / "main.py").write_text("print('B')\n")
+    git("commit", "-q", "-am", "B", cwd=origin)
+
+    monkeypatch.setattr(services.git_repository, "repository_locks", lock_service(InMemorySharedState()))
+
+    def blocking_run(*args, **kwargs):
+        raise AssertionError("subprocess.run blocks the event loop while the lock is held")
+
+    monkeypatch.setattr(services.git_repository.subprocess, "run", blocking_run)
+    service = GitRepositoryService(git_repository=None)
+    service.dir_base = str(tmp_path / "repos")
+    cwd = os.getcwd()
+
+    result = asyncio.run(service.pull_repository("octocat", "api"))
+
+    assert result["message"] == "Repository pulled successfully", result
+    assert (tmp_path / "repos" / "octocat" / "api" / "main.py").read_text() == "print('B')\n"
+    assert os.getcwd() == cwd
@@ -0,0 +1,102 @@
+import asyncio
+
+from config.settings import Settings
+from services.git_repository import GitRepositoryService, repository_access_cache, tree_index_cache
+from services.repository_tree import RepositoryTreeIndex, TreeIndexCache
+
+
+def build_index():
+    tree_data = {
+        "sha": "tree-sha",
+        "truncated": False,
+        "tree": [
+            {"path": "README.md", "type": "blob", "sha": "1", "size": 10},
+            {"path": "services", "type": "tree", "sha": "2"},
+            {"path": "services/api", "type": "tree", "sha": "3"},
+            {"path": "services/api/requirements.txt", "type": "blob", "sha": "4", "size": 20},
+            {"path": "services/api/app", "type": "tree", "sha": "5"},
+            {"path": "services/api/app/main.py", "type": "blob", "sha": "6", "size": 30},
+            {"path": "services/web", "type": "tree", "sha": "7"},
+            {"path": "services/web/package.json", "type": "blob", "sha": "8", "size": 40},
+            {"path": "services-legacy", "type": "tree", "sha": "9"},
+        ],
+    }
+    return RepositoryTreeIndex.from_github_tree(tree_data)
+
+
+def test_list_dir_returns_direct_children_only():
+    index = build_index()
+    assert [entry["path"] for entry in index.list_dir("", entry_type="tree")] == ["services", "services-legacy"]
+    assert [entry["name"] for entry in index.list_dir("/services/")] == ["api", "web"]
+    assert [entry["path"] for entry in index.list_dir("services/api")] == [
+        "services/api/app",
+        "services/api/requirements.txt",
+    ]
+
+
+def test_exists_and_is_dir():
+    index = build_index()
+    assert index.exists("services/api/app/main.py")
+    assert index.exists("")
+    assert not index.exists("services/api/missing.py")
+    assert index.is_dir("services/web")
+    assert not index.is_dir("README.md")
+
+
+def test_glob_matches_within_and_across_segments():
+    index = build_index()
+    assert [entry["path"] for entry in index.glob("services/*/requirements.txt")] == ["services/api/requirements.txt"]
+    assert [entry["path"] for entry in index.glob("**/*.py")] == ["services/api/app/main.py"]
+    assert [entry["path"] for entry in index.glob("services/*", entry_type="tree")] == ["services/api", "services/web"]
+
+
+def test_from_ls_tree_parses_null_separated_output():
+    output = (
+        "040000 tree aaa       -\tsrc\0"
+        "100644 blob bbb      12\tsrc/app.py\0"
+        "100644 blob ccc       3\tname with space.txt\0"
+    )
+    index = RepositoryTreeIndex.from_ls_tree("tree-sha", output)
+    assert index.get("src/app.py")["size"] == 12
+    assert index.exists("name with space.txt")
+    assert index.is_dir("src")
+
+
+def test_cache_is_bounded_and_resolves_aliases():
+    cache = TreeIndexCache(max_entries=2)
+    index = build_index()
+    cache.put("octocat", "api", index, "commit-sha")
+    assert cache.get("octocat", "api", "commit-sha") is index
+    assert cache.get("Octocat", "API", "tree-sha") is index
+    assert cache.get("someone", "fork", "commit-sha") is None
+    cache.put("octocat", "api", RepositoryTreeIndex("other", []))
+    assert cache.get("octocat", "api", "commit-sha") is None
+
+
+def test_cached_tree_is_only_served_to_callers_who_can_read_the_repository(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "DIR_BASE", str(tmp_path))
+    service = GitRepositoryService(git_repository=None)
+    requests = []
+
+    async def github(method, endpoint, access_token, params=None, json_data=None):
+        requests.append((endpoint, access_token))
+        if endpoint == "/repos/octocat/private":
+            return {"full_name": "octocat/private"} if access_token == "owner-token" else {"error": "Resource not found"}
+        return {"sha": "tree-sha", "truncated": False, "tree": [{"path": "secret.py", "type": "blob", "sha": "1", "size": 1}]}
+
+    service._make_github_request = github
+    tree_index_cache.clear()
+    repository_access_cache.clear()
+
+    async def scenario():
+        owner = await service.get_tree_index("octocat", "private", "owner-token", sha="commit-sha")
+        again = await service.get_tree_index("octocat", "private", "owner-token", sha="commit-sha")
+        stranger = await service.get_tree_index("octocat", "private", "stranger-token", sha="commit-sha")
+        return owner, again, stranger
+
+    owner, again, stranger = asyncio.run(scenario())
+    assert owner.exists("secret.py") and again is owner
+    assert "error" in stranger
+    # One access check per token, and the tree itself fetched once
+    assert [endpoint for endpoint, _ in requests].count("/repos/octocat/private") == 2
+    assert [endpoint for endpoint, _ in requests].count("/repos/octocat/private/git/trees/commit-sha") == 1
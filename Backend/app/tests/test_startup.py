@@ -0,0 +1,73 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from config.settings import Settings
+from services.startup import StartupState
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("boto3", "jose.jwt", "python_terraform", "motor.motor_asyncio")
+
+# Runs in a fresh interpreter so the measurement starts at process start
+START_APP = f"""
+import json, sys, time
+import main
+imported_lazily = [name for name in {LAZY_MODULES!r} if name in sys.modules]
+
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from dependencies.database_connection import DatabaseConnection
+from services.startup import startup_state
+
+DatabaseConnection().client = AsyncMongoMockClient()
+with TestClient(main.app) as client:
+    deadline = time.monotonic() + 30
+    while client.get("/").status_code != 200 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    print(json.dumps({{"imported_eagerly": imported_lazily, **startup_state.stats()}}))
+"""
+
+
+def test_process_start_to_ready_stays_within_budget(tmp_path):
+    env = {**os.environ, "LOG_CONSOLE_FORMAT": "off", "LOG_DIR": str(tmp_path / "logs")}
+    result = subprocess.run([sys.executable, "-c", START_APP], cwd=APP_ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert stats["imported_eagerly"] == []
+    assert stats["ready"] is True
+    assert stats["warmup"]["mongodb"]["status"] == "done"
+    assert stats["phases"]["imported"] <= stats["phases"]["serving"] <= stats["phases"]["ready"]
+    assert stats["phases"]["ready"] < Settings.STARTUP_READY_BUDGET_SECONDS
+    assert any(entry["module"] == "fastapi" for entry in stats["slowest_imports"])
+
+
+def test_warmup_runs_steps_concurrently_and_retries_required_ones():
+    state = StartupState(budget_seconds=10, retry_seconds=0.05)
+    attempts = {"db": 0}
+
+    async def flaky_db():
+        attempts["db"] += 1
+        if attempts["db"] < 3:
+            raise ConnectionError("not yet")
+
+    async def slow_step():
+        await asyncio.sleep(0.2)
+
+    async def broken_step():
+        raise RuntimeError("no region")
+
+    started = time.perf_counter()
+    asyncio.run(state.warm_up(
+        required={"db": flaky_db, "clients": slow_step},
+        optional={"pool": slow_step, "aws": broken_step},
+    ))
+
+    assert time.perf_counter() - started < 0.35
+    assert state.ready is True
+    assert state.steps["db"] == {**state.steps["db"], "status": "done", "attempts": 3}
+    assert state.steps["aws"]["status"] == "failed"
+    assert state.steps["aws"]["error"] == "no region"
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+from mongomock_motor import AsyncMongoMockClient
+
+import dependencies.shared_state
+import services.deploy
+from repositories.deploy import DeployRepository
+from repositories.shared_state import InMemorySharedState
+from schemas.aws_credentials_schema import AWSCredentialsSchema
+from services.deploy import DeployService
+
+ECS_CLUSTER_TEMPLATE = Path(__file__).resolve().parent.parent / "Pipelines" / "Common" / "Terraform" / "ecs_cluster"
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+def tf_vars(**overrides):
+    values = {
+        "user_github_id": "42",
+        "aws_access_key": "AKIAFIRST",
+        "aws_secret_access_key": "secret",
+        "repo_name": "api",
+        "owner": "octocat",
+        "ecs_task_container_port": 8000,
+        "ecs_task_host_port": 8000,
+        "aws_region": "us-east-1",
+        "source_branch": "main",
+    }
+    values.update(overrides)
+    return values
+
+
+def fingerprint(values, template_path=None):
+    service = DeployService.__new__(DeployService)
+    service.terraform_template_path = template_path or str(ECS_CLUSTER_TEMPLATE)
+    return service._terraform_fingerprint(values)
+
+
+def test_fingerprint_ignores_credentials_but_not_infrastructure_inputs():
+    base = fingerprint(tf_vars())
+    assert fingerprint(tf_vars(aws_access_key="AKIAROTATED", aws_session_token="token")) == base
+    assert fingerprint(tf_vars(ecs_task_container_port=5000)) != base
+    assert fingerprint(tf_vars(source_branch="develop")) != base
+
+
+def test_only_sts_sessions_are_passed_to_terraform():
+    iam_user = AWSCredentialsSchema(tenancy="iam_user", aws_access_key_id="AKIAUSER", aws_secret_access_key="secret")
+    sts = AWSCredentialsSchema(tenancy="sts", aws_access_key_id="ASIASESSION", aws_secret_access_key="secret", aws_session_token="token")
+    assert DeployService._terraform_credential_vars(iam_user) == {}
+    assert DeployService._terraform_credential_vars(sts) == {
+        "aws_access_key": "ASIASESSION", "aws_secret_access_key": "secret", "aws_session_token": "token",
+    }
+    provider = (ECS_CLUSTER_TEMPLATE / "main.tf").read_text().split('provider "aws"')[1].split("}")[0]
+    assert 'access_key = var.aws_access_key != "" ? var.aws_access_key : null' in provider
+
+
+def test_fingerprint_changes_with_the_template(tmp_path):
+    (tmp_path / "main.tf").write_text('resource "aws_ecs_cluster" "ecs_cluster" {}\n')
+    before = fingerprint(tf_vars(), str(tmp_path))
+    (tmp_path / "main.tf").write_text('resource "aws_ecs_cluster" "cluster" {}\n')
+    assert fingerprint(tf_vars(), str(tmp_path)) != before
+
+
+class RecordingTerraform:
+    """Stands in for terraform apply and destroy against one user's ecs_cluster state."""
+
+    def __init__(self):
+        self.applied = []
+        self.destroyed = 0
+        self.destroy_threads = []
+
+    def apply(self, tf_working_dir, user_github_id, values):
+        self.applied.append(values["repo_name"])
+        return {"load_balancer_dns": f"{values['repo_name']}.elb", "ecr_repo_url": f"ecr/{values['repo_name']}"}
+
+
+def deploy_service(terraform):
+    service = DeployService(DeployRepository(FakeDatabase()), None, SimpleNamespace(workspace_service=None), credential_provider=object())
+    service._run_terraform = terraform.apply
+    return service
+
+
+def provision(service, repo_name, force_terraform=False):
+    values = tf_vars(repo_name=repo_name)
+    deploy_data = {
+        "owner": "octocat", "repo_name": repo_name, "user_github_id": "42",
+        "absolute_path": f"/tmp/repos/octocat/{repo_name}", "terraform_fingerprint": fingerprint(values),
+    }
+    return service._provision_infrastructure(deploy_data, values, force_terraform)
+
+
+def test_outputs_are_reused_only_while_the_last_apply_to_the_users_state_matches(monkeypatch):
+    monkeypatch.setattr(dependencies.shared_state, "_shared_state", InMemorySharedState())
+    terraform = RecordingTerraform()
+    service = deploy_service(terraform)
+
+    async def scenario():
+        first = await provision(service, "api")
+        unchanged = await provision(service, "api")
+        # Another repository of the same user replaces the resources in the shared state
+        other = await provision(service, "web")
+        after_other = await provision(service, "api")
+        forced = await provision(service, "api", force_terraform=True)
+        return first, unchanged, other, after_other, forced
+
+    first, unchanged, other, after_other, forced = asyncio.run(scenario())
+    assert first == ({"load_balancer_dns": "api.elb", "ecr_repo_url": "ecr/api"}, False)
+    assert unchanged == (first[0], True)
+    assert other[1] is False and after_other[1] is False and forced[1] is False
+    assert terraform.applied == ["api", "web", "api", "api"]
+
+
+def test_destroy_invalidates_the_applied_state(monkeypatch):
+    monkeypatch.setattr(dependencies.shared_state, "_shared_state", InMemorySharedState())
+    terraform = RecordingTerraform()
+    service = deploy_service(terraform)
+
+    class FakeTerraform:
+        def __init__(self, working_dir):
+            pass
+
+        def destroy(self, **kwargs):
+            terraform.destroyed += 1
+            terraform.destroy_threads.append(threading.current_thread())
+            return 0, "", ""
+
+    monkeypatch.setattr(services.deploy, "python_terraform", SimpleNamespace(Terraform=FakeTerraform))
+
+    async def scenario():
+        await provision(service, "api")
+        collection = await service.deploy_repository.db.get_collection("deploys")
+        await collection.insert_one({"owner": "octocat", "repo_name": "api", "user_github_id": "42", "absolute_path": "/tmp/repos/octocat/api"})
+        await service.destroy_terraform_resources("octocat", "api")
+        return await provision(service, "api")
+
+    redeployed = asyncio.run(scenario())
+    assert terraform.destroyed == 1
+    # The repository lock heartbeat runs on the event loop, so destroy must not
+    assert terraform.destroy_threads != [threading.main_thread()]
+    assert redeployed[1] is False
+    assert terraform.applied == ["api", "api"]
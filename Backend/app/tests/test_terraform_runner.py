@@ -0,0 +1,80 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import Settings
+from services.terraform_runner import TerraformLockManager, TerraformRunner, run_terraform_init
+
+
+def test_serializes_per_tenant_and_bounds_parallel_runs():
+    manager = TerraformLockManager(max_parallel=2)
+    active = {}
+    peak = {"total": 0, "tenant-a": 0}
+    snapshot = {}
+
+    async def run(tenant):
+        async with manager.acquire(tenant):
+            active[tenant] = active.get(tenant, 0) + 1
+            peak["total"] = max(peak["total"], sum(active.values()))
+            peak["tenant-a"] = max(peak["tenant-a"], active.get("tenant-a", 0))
+            await asyncio.sleep(0.01)
+            active[tenant] -= 1
+
+    async def scenario():
+        tasks = [asyncio.create_task(run(tenant)) for tenant in ["tenant-a"] * 3 + ["tenant-b", "tenant-c", "tenant-d"]]
+        await asyncio.sleep(0.005)
+        snapshot.update(manager.stats())
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    stats = manager.stats()
+    assert peak == {"total": 2, "tenant-a": 1}
+    assert snapshot["running"] == 2 and snapshot["queued"] == 4
+    assert stats["queued"] == 0 and stats["running"] == 0
+    assert stats["completed"] == 6 and stats["tenants_active"] == 0
+
+
+def test_failed_runs_release_the_tenant():
+    manager = TerraformLockManager(max_parallel=1)
+
+    async def failing():
+        async with manager.acquire("tenant-a"):
+            raise RuntimeError("apply failed")
+
+    async def scenario():
+        try:
+            await failing()
+        except RuntimeError:
+            pass
+        async with manager.acquire("tenant-a"):
+            pass
+
+    asyncio.run(scenario())
+    assert manager.stats()["failed"] == 1 and manager.stats()["completed"] == 1
+
+
+def test_workspace_per_tenant_with_remote_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "TERRAFORM_STATE_BUCKET", "states-bucket")
+    runner = TerraformRunner("iam", workspace_root=str(tmp_path))
+
+    path = runner.prepare_workspace("pool-abc")
+
+    assert path == str(tmp_path / "iam" / "pool-abc")
+    assert (tmp_path / "iam" / "pool-abc" / "iam.tf").exists()
+    backend = (tmp_path / "iam" / "pool-abc" / "backend.tf").read_text()
+    assert 'key            = "iam/pool-abc/terraform.tfstate"' in backend
+    assert 'dynamodb_table = "terraform-locks"' in backend
+
+
+def test_inits_get_the_plugin_cache_in_their_env_only_and_run_one_at_a_time(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "plugins"
+    monkeypatch.setattr(Settings, "TERRAFORM_PLUGIN_CACHE_DIR", str(cache_dir))
+    monkeypatch.delenv("TF_PLUGIN_CACHE_DIR", raising=False)
+    # mkdir fails if another init is inside the cache at the same time
+    command = ["sh", "-c", 'mkdir "$TF_PLUGIN_CACHE_DIR/busy" && sleep 0.05 && rmdir "$TF_PLUGIN_CACHE_DIR/busy"']
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: run_terraform_init(command, cwd=str(tmp_path)), range(4)))
+
+    assert [result.returncode for result in results] == [0, 0, 0, 0]
+    assert "TF_PLUGIN_CACHE_DIR" not in os.environ
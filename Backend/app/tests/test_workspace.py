@@ -0,0 +1,129 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from repositories.workspace import WorkspaceRepository
+from services.workspace import WorkspaceService
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = AsyncMongoMockClient()
+
+    async def get_collection(self, name):
+        return self.client["easy_deploy"][name]
+
+
+def create_workspace(dir_base, owner, repo_name, size):
+    path = os.path.join(dir_base, owner, repo_name)
+    os.makedirs(path)
+    with open(os.path.join(path, "app.py"), "wb") as f:
+        f.write(b"x" * size)
+
+
+async def service_with_workspaces(dir_base, workspaces, quota_bytes):
+    """Register workspaces on disk, the first one the least recently used."""
+    repository = WorkspaceRepository(FakeDatabase())
+    service = WorkspaceService(repository, dir_base=str(dir_base))
+    service.quota_bytes = quota_bytes
+    service.min_idle = timedelta(0)
+    collection = await repository.db.get_collection("workspaces")
+    for age, (owner, repo_name, size) in enumerate(reversed(workspaces)):
+        create_workspace(dir_base, owner, repo_name, size)
+        await service.touch(owner, repo_name)
+        await collection.update_one(
+            {"owner": owner, "repo_name": repo_name},
+            {"$set": {"last_used_at": datetime.utcnow() - timedelta(hours=age + 1)}},
+        )
+    return service
+
+
+def test_quota_evicts_the_least_recently_used_unpinned_workspace(tmp_path):
+    async def scenario():
+        service = await service_with_workspaces(tmp_path, [
+            ("octocat", "oldest", 400),
+            ("octocat", "older", 400),
+            ("hubot", "recent", 400),
+        ], quota_bytes=900)
+        collection = await service.workspace_repository.db.get_collection("workspaces")
+        async with service.pinned("octocat", "oldest", reason="deploy:42"):
+            # Still the least recently used, so only the pin keeps it
+            await collection.update_one({"repo_name": "oldest"}, {"$set": {"last_used_at": datetime.utcnow() - timedelta(days=1)}})
+            result = await service.collect()
+            pinned_during_collect = await service.workspace_repository.get_workspace("octocat", "oldest")
+        return service, result, pinned_during_collect
+
+    service, result, pinned = asyncio.run(scenario())
+    assert result == {"discovered": 0, "scanned": 3, "evicted": 1}
+    assert pinned is not None and os.path.isdir(tmp_path / "octocat" / "oldest")
+    assert not os.path.exists(tmp_path / "octocat" / "older")
+    assert os.path.isdir(tmp_path / "hubot" / "recent")
+
+
+def test_every_workspace_pinned_leaves_usage_over_quota(tmp_path):
+    async def scenario():
+        service = await service_with_workspaces(tmp_path, [("octocat", "api", 500)], quota_bytes=100)
+        async with service.pinned("octocat", "api", reason="deploy:42"):
+            return await service.collect()
+
+    assert asyncio.run(scenario())["evicted"] == 0
+    assert os.path.isdir(tmp_path / "octocat" / "api")
+
+
+def test_scan_only_measures_workspaces_used_since_their_last_scan(tmp_path):
+    async def scenario():
+        service = await service_with_workspaces(tmp_path, [
+            ("octocat", "api", 100),
+            ("octocat", "web", 200),
+            ("hubot", "docs", 300),
+        ], quota_bytes=10_000)
+        first = await service.scan()
+        idle = await service.scan()
+        # Mongo keeps milliseconds, so a touch within the scan's millisecond would not count as newer
+        await asyncio.sleep(0.01)
+        with open(tmp_path / "octocat" / "web" / "extra.bin", "wb") as f:
+            f.write(b"y" * 50)
+        await service.touch("octocat", "web")
+        after_pull = await service.scan()
+        return first, idle, after_pull, await service.get_usage()
+
+    first, idle, after_pull, usage = asyncio.run(scenario())
+    assert (first, idle, after_pull) == (3, 0, 1)
+    assert usage["total_bytes"] == 650
+    assert [(owner["owner"], owner["workspaces"], owner["size_bytes"]) for owner in usage["owners"]] == [
+        ("octocat", 2, 350),
+        ("hubot", 1, 300),
+    ]
+
+
+def test_workspaces_of_live_deploys_and_webhooks_outlive_idle_periods(tmp_path):
+    async def scenario():
+        service = await service_with_workspaces(tmp_path, [
+            ("octocat", "deployed", 400),
+            ("octocat", "hooked", 400),
+            ("octocat", "scratch", 400),
+            ("hubot", "recent", 400),
+        ], quota_bytes=700)
+        await service.retain("octocat", "deployed", "deploy")
+        await service.retain("octocat", "hooked", "webhook")
+        collection = await service.workspace_repository.db.get_collection("workspaces")
+        # Idle far longer than WORKSPACE_MIN_IDLE_SECONDS, and the least recently used
+        await collection.update_many(
+            {"repo_name": {"$in": ["deployed", "hooked"]}}, {"$set": {"last_used_at": datetime.utcnow() - timedelta(days=30)}}
+        )
+        over_quota = await service.collect()
+        usage = await service.get_usage()
+        # Destroying the deploy releases it
+        await service.release("octocat", "deployed", "deploy")
+        await service.scan()
+        after_destroy = await service.collect()
+        return over_quota, usage, after_destroy
+
+    over_quota, usage, after_destroy = asyncio.run(scenario())
+    assert over_quota["evicted"] == 2
+    assert [owner["retained"] for owner in usage["owners"] if owner["owner"] == "octocat"] == [2]
+    assert after_destroy["evicted"] == 1
+    assert not os.path.exists(tmp_path / "octocat" / "deployed")
+    assert os.path.isdir(tmp_path / "octocat" / "hooked")